@@ -1,43 +1,179 @@
 import numpy as np
 
+
+def _flip_signs(U):
+    """Dấu của vector riêng là tuỳ ý: cố định để phần tử có |giá trị| lớn nhất luôn dương."""
+    signs = np.sign(U[np.argmax(np.abs(U), axis=0), np.arange(U.shape[1])])
+    signs[signs == 0] = 1
+    return U * signs
+
+
 class PCA:
-    def __init__(self, n_components):
+    def __init__(self, n_components, svd_solver="auto", n_oversamples=10, n_iter="auto", random_state=None):
+        """
+        svd_solver:
+          "full"       : covariance d x d + np.linalg.eigh, O(N d^2 + d^3), chính xác, có đủ d trị riêng
+          "randomized" : range-finder ngẫu nhiên + power iteration trên dữ liệu đã center (Halko et al.),
+                         O(N d k), chỉ tính k thành phần đầu (eigvals_sorted chỉ có k giá trị)
+          "auto"       : "full" nếu d <= 1000 (eigh rẻ, vd. MNIST 784) hoặc k >= 80% min(N, d),
+                         ngược lại "randomized"
+        """
         self.n_components = n_components
+        self.svd_solver = svd_solver
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.random_state = random_state
         self.U_m = None
         self.mu = None
         self.eigvals_sorted = None
+        self.total_variance = None
+        self.solver_used = None
+        # thống kê cộng dồn cho partial_fit
+        self.n_samples_seen = 0
+        self._scatter = None
+        self._stale = False   # đã partial_fit thêm dữ liệu nhưng chưa eigen decomposition
 
     def fit(self, X):
         """
         X: (N, d) numpy
         """
-        X = X.astype(np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        N, d = X.shape
+        solver = self._choose_solver(N, d)
+        self.solver_used = solver
 
         # 1) mean center and normalize
         self.mu = X.mean(axis=0)
+        self._stale = False
+        if solver == "randomized":
+            self._fit_randomized(X)
+            self.n_samples_seen = N
+            # không có covariance -> không partial_fit tiếp được
+            self._scatter = None
+            return self
         Xc = X - self.mu
 
         # 2) covariance
-        N = X.shape[0]
-        C = (Xc.T @ Xc) / N
+        scatter = Xc.T @ Xc
+        C = scatter / N
+
+        # 3-5) eigen decomposition, sort descending, take top m
+        self._solve(C)
+        self.n_samples_seen = N
+        # giữ scatter để partial_fit cộng dồn tiếp từ dữ liệu của fit()
+        self._scatter = scatter
+        return self
+
+    def partial_fit(self, X, solve=False):
+        """
+        Cộng dồn 1 chunk X (N_chunk, d) vào mean và ma trận scatter (gộp kiểu Chan et al.,
+        không cần giữ dữ liệu cũ), bộ nhớ O(d^2) bất kể tổng số mẫu.
+        Eigen decomposition chạy 1 lần, lúc finalize() / transform() đầu tiên sau đó
+        (solve=True: chạy ngay).
+        Sau fit(svd_solver "full") thì cộng dồn tiếp vào dữ liệu của fit().
+        """
+        if self.n_samples_seen > 0 and self._scatter is None:
+            raise ValueError("partial_fit() cannot continue a randomized fit(); call fit() with svd_solver='full'.")
+        X = X.astype(np.float64)
+        n = X.shape[0]
+        if n == 0:
+            return self
+        mu_chunk = X.mean(axis=0)
+        Xc = X - mu_chunk
+        scatter_chunk = Xc.T @ Xc
+
+        if self.n_samples_seen == 0 or self._scatter is None:
+            self.mu = mu_chunk
+            self._scatter = scatter_chunk
+            self.n_samples_seen = n
+        else:
+            n_old = self.n_samples_seen
+            total = n_old + n
+            delta = mu_chunk - self.mu
+            self._scatter += scatter_chunk + np.outer(delta, delta) * (n_old * n / total)
+            self.mu = self.mu + delta * (n / total)
+            self.n_samples_seen = total
 
-        # 3) eigen decomposition
+        self._stale = True
+        if solve:
+            self.finalize()
+        return self
+
+    def finalize(self):
+        """Eigen decomposition trên scatter đã cộng dồn bởi partial_fit (no-op nếu không có gì mới)."""
+        if self._stale:
+            self.solver_used = "full"
+            self._solve(self._scatter / self.n_samples_seen)
+            self._stale = False
+        return self
+
+    def _choose_solver(self, N, d):
+        if self.svd_solver in ("full", "randomized"):
+            return self.svd_solver
+        if self.svd_solver != "auto":
+            raise ValueError(f"Unknown svd_solver: {self.svd_solver}")
+        if d <= 1000 or self.n_components >= 0.8 * min(N, d):
+            return "full"
+        return "randomized"
+
+    def _solve(self, C):
         eigvals, eigvecs = np.linalg.eigh(C)
 
-        # 4) sort descending
         idx = np.argsort(eigvals)[::-1]
         self.eigvals_sorted = eigvals[idx]
-        eigvecs_sorted = eigvecs[:, idx]
+        self.total_variance = float(np.sum(eigvals))
+        self.U_m = _flip_signs(eigvecs[:, idx[:self.n_components]])
 
-        # 5) take top m
-        self.U_m = eigvecs_sorted[:, :self.n_components]
+    def _fit_randomized(self, X):
+        """
+        Top-k thành phần từ Xc = X - mu mà không tạo Xc hay covariance:
+        Xc @ Q = X @ Q - mu @ Q, Xc.T @ P = X.T @ P - outer(mu, sum(P)).
+        """
+        N, d = X.shape
+        k = self.n_components
+        n_random = min(k + self.n_oversamples, N, d)
+        n_iter = self.n_iter
+        if n_iter == "auto":
+            # phổ tắt chậm (k nhỏ so với d) cần nhiều vòng power iteration hơn
+            n_iter = 7 if k < 0.1 * min(N, d) else 4
+        mu = self.mu
 
-        return self
+        def right(Q):   # Xc @ Q
+            return X @ Q - mu @ Q
+
+        def left(P):    # Xc.T @ P
+            return X.T @ P - np.outer(mu, P.sum(axis=0))
+
+        rng = np.random.default_rng(self.random_state)
+        Q = rng.standard_normal((d, n_random))
+        # power iteration, trực chuẩn hoá (QR) mỗi bước để không mất các hướng nhỏ
+        for _ in range(n_iter):
+            Q, _ = np.linalg.qr(right(Q))
+            Q, _ = np.linalg.qr(left(Q))
+        Q, _ = np.linalg.qr(right(Q))
+
+        # SVD của B = Q.T @ Xc (n_random x d) nhỏ
+        B = left(Q).T
+        _, S, Vt = np.linalg.svd(B, full_matrices=False)
+
+        self.eigvals_sorted = S[:k] ** 2 / N
+        # tổng phương sai = trace(C), không cần C
+        self.total_variance = float(np.einsum("ij,ij->", X, X) / N - mu @ mu)
+        self.U_m = _flip_signs(Vt[:k].T)
+
+    @property
+    def explained_variance_ratio(self):
+        """Tỉ lệ phương sai giải thích được của n_components thành phần đầu."""
+        self.finalize()
+        if self.eigvals_sorted is None:
+            raise ValueError("PCA must be fitted first.")
+        return self.eigvals_sorted[:self.n_components] / self.total_variance
 
     def transform(self, X):
         """
         X: (N, d) numpy
         """
+        self.finalize()
         if self.U_m is None or self.mu is None:
             raise ValueError("PCA must be fitted before calling transform().")
 
@@ -47,4 +183,4 @@ class PCA:
 
     def fit_transform(self, X):
         self.fit(X)
-        return self.transform(X)
\ No newline at end of file
+        return self.transform(X)
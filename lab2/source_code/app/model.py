@@ -1,12 +1,45 @@
+import time
+
 import numpy as np
+
+
 class SoftmaxRegression:
-    def __init__(self, lr=0.1, epochs=1000, n_classes=10):
+    def __init__(self, lr=0.1, epochs=1000, n_classes=10,
+                 optimizer="gd", batch_size=128, momentum=0.9,
+                 beta1=0.9, beta2=0.999, eps=1e-8,
+                 lr_schedule="constant", lr_decay=0.5, lr_step=10,
+                 early_stopping=False, validation_fraction=0.1, patience=5, tol=1e-4,
+                 random_state=None, verbose=True):
+        """
+        optimizer: "gd" (full-batch, như cũ), "sgd" (mini-batch + momentum) hoặc "adam"
+        lr_schedule: "constant", "step" (nhân lr_decay mỗi lr_step epoch),
+                     "exponential" (nhân lr_decay mỗi epoch), "cosine" (giảm về 0 ở epoch cuối)
+        early_stopping: dừng khi val accuracy không tăng quá tol trong `patience` epoch,
+                        khôi phục W, b tốt nhất (val set = X_val/y_val hoặc tách validation_fraction)
+        """
         self.lr = lr
         self.epochs = epochs
         self.n_classes = n_classes
+        self.optimizer = optimizer
+        self.batch_size = batch_size
+        self.momentum = momentum
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.lr_schedule = lr_schedule
+        self.lr_decay = lr_decay
+        self.lr_step = lr_step
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.tol = tol
+        self.random_state = random_state
+        self.verbose = verbose
         self.W = None
         self.b = None
         self.losses = []
+        self.history = []
+        self.best_epoch = None
 
     def one_hot_encode(self, y):
         one_hot = np.zeros((len(y), self.n_classes))
@@ -18,33 +51,165 @@ class SoftmaxRegression:
         exp_z = np.exp(z)
         return exp_z / np.sum(exp_z, axis=1, keepdims=True)
 
-    def fit(self, X, y):
+    def learning_rate(self, epoch):
+        """lr của epoch (đếm từ 0) theo lr_schedule."""
+        if self.lr_schedule == "constant":
+            return self.lr
+        if self.lr_schedule == "step":
+            return self.lr * self.lr_decay ** (epoch // self.lr_step)
+        if self.lr_schedule == "exponential":
+            return self.lr * self.lr_decay ** epoch
+        if self.lr_schedule == "cosine":
+            return 0.5 * self.lr * (1 + np.cos(np.pi * epoch / max(1, self.epochs)))
+        raise ValueError(f"Unknown lr_schedule: {self.lr_schedule}")
+
+    def fit(self, X, y, X_val=None, y_val=None):
+        y = np.asarray(y)
+        if self.optimizer not in ("gd", "sgd", "adam"):
+            raise ValueError(f"Unknown optimizer: {self.optimizer}")
+        rng = np.random.default_rng(self.random_state)
+
+        if self.early_stopping and X_val is None:
+            idx = rng.permutation(len(X))
+            n_val = max(1, int(len(X) * self.validation_fraction))
+            X_val, y_val = X[idx[:n_val]], y[idx[:n_val]]
+            X, y = X[idx[n_val:]], y[idx[n_val:]]
+
         n_samples, n_features = X.shape
+        self.init_params(n_features)
+
+        for i in range(self.epochs):
+            lr = self.learning_rate(i)
+            if self.optimizer == "gd":
+                dW, db, loss_sum = self.gradient(X, y)
+                self.apply_gradient(dW / n_samples, db / n_samples, lr)
+                loss = loss_sum / n_samples
+            else:
+                loss = self.run_batches(X, y, rng.permutation(n_samples), lr) / n_samples
+            if self.end_epoch(i, loss, lr, X_val, y_val):
+                break
+
+        self.restore_best()
+        return self
+
+    def partial_fit(self, X, y, epoch=0):
+        """
+        Học tiếp trên 1 chunk (X, y) mà không cần toàn bộ dữ liệu trong RAM:
+        sgd / adam: 1 lượt mini-batch (xáo trộn trong chunk) qua chunk; gd: 1 bước trên cả chunk.
+        Trạng thái optimizer được giữ giữa các lần gọi. Trả về loss trung bình trên chunk.
+        """
+        y = np.asarray(y)
+        if self.W is None:
+            self.init_params(X.shape[1])
+        lr = self.learning_rate(epoch)
+        if self.optimizer == "gd":
+            dW, db, loss_sum = self.gradient(X, y)
+            self.apply_gradient(dW / len(y), db / len(y), lr)
+        else:
+            loss_sum = self.run_batches(X, y, self._rng.permutation(len(y)), lr)
+        return loss_sum / len(y)
+
+    # ---- các bước dùng chung cho fit / partial_fit / train_streaming.py ----
+
+    def init_params(self, n_features):
         self.W = np.zeros((n_features, self.n_classes), dtype=np.float32)
         self.b = np.zeros((self.n_classes,), dtype=np.float32)
-        y_encoded = self.one_hot_encode(y)
+        self.losses = []
+        self.history = []
+        self.best_epoch = None
+        # trạng thái optimizer: velocity (sgd) / moment 1, 2 (adam)
+        self._state = {
+            "mW": np.zeros_like(self.W), "mb": np.zeros_like(self.b),
+            "vW": np.zeros_like(self.W), "vb": np.zeros_like(self.b), "t": 0,
+        }
+        self._best = (-np.inf, None, None)
+        self._bad_epochs = 0
+        self._start = time.perf_counter()
+        self._rng = np.random.default_rng(self.random_state)
 
-        for i in range(self.epochs):
-            z = X @ self.W + self.b
-            y_pred = self.softmax(z)
+    def gradient(self, X, y):
+        """Tổng (không chia N) gradient theo W, b và tổng loss cross-entropy trên (X, y)."""
+        rows = np.arange(len(y))
+        probs = self.softmax(X @ self.W + self.b)
+        loss_sum = -np.sum(np.log(probs[rows, y] + 1e-8))
 
-            loss = -np.mean(np.sum(y_encoded * np.log(y_pred + 1e-8), axis=1))
-            self.losses.append(loss)
+        # gradient của cross-entropy theo logits: probs - one_hot(y)
+        probs[rows, y] -= 1.0
+        return X.T @ probs, probs.sum(axis=0), float(loss_sum)
 
-            dW = (1 / n_samples) * (X.T @ (y_pred - y_encoded))
-            db = (1 / n_samples) * np.sum(y_pred - y_encoded, axis=0)
+    def apply_gradient(self, dW, db, lr):
+        dW = dW.astype(self.W.dtype, copy=False)
+        db = db.astype(self.b.dtype, copy=False)
+        state = self._state
+        if self.optimizer == "gd":
+            self.W -= lr * dW
+            self.b -= lr * db
+        elif self.optimizer == "sgd":
+            state["mW"] *= self.momentum
+            state["mW"] -= lr * dW
+            state["mb"] *= self.momentum
+            state["mb"] -= lr * db
+            self.W += state["mW"]
+            self.b += state["mb"]
+        else:
+            state["t"] += 1
+            t = state["t"]
+            for p, g, m, v in ((self.W, dW, state["mW"], state["vW"]), (self.b, db, state["mb"], state["vb"])):
+                m *= self.beta1
+                m += (1 - self.beta1) * g
+                v *= self.beta2
+                v += (1 - self.beta2) * g * g
+                m_hat = m / (1 - self.beta1 ** t)
+                v_hat = v / (1 - self.beta2 ** t)
+                p -= lr * m_hat / (np.sqrt(v_hat) + self.eps)
 
-            self.W -= self.lr * dW
-            self.b -= self.lr * db
+    def run_batches(self, X, y, order, lr):
+        """Cập nhật theo từng mini-batch `batch_size` hàng theo thứ tự `order`, trả về tổng loss."""
+        loss_sum = 0.0
+        for s in range(0, len(order), self.batch_size):
+            batch = order[s:s + self.batch_size]
+            dW, db, batch_loss = self.gradient(X[batch], y[batch])
+            self.apply_gradient(dW / len(batch), db / len(batch), lr)
+            loss_sum += batch_loss
+        return loss_sum
 
-            if (i + 1) % 100 == 0:
-                print(f"Epoch {i+1}, Loss: {loss:.4f}")
+    def end_epoch(self, epoch, loss, lr, X_val=None, y_val=None):
+        """Ghi history / log của epoch (đếm từ 0); trả về True nếu early stopping yêu cầu dừng."""
+        self.losses.append(loss)
+        val_acc = float(np.mean(self.predict(X_val) == y_val)) if X_val is not None else None
+        self.history.append({
+            "epoch": epoch + 1, "loss": float(loss), "lr": float(lr),
+            "val_acc": val_acc, "time_s": time.perf_counter() - self._start,
+        })
+
+        if self.verbose and (self.optimizer != "gd" or (epoch + 1) % 100 == 0):
+            val_text = f", Val acc: {val_acc:.4f}" if val_acc is not None else ""
+            print(f"Epoch {epoch+1}, Loss: {loss:.4f}{val_text}")
+
+        if not self.early_stopping or val_acc is None:
+            return False
+        if val_acc > self._best[0] + self.tol:
+            self._best = (val_acc, self.W.copy(), self.b.copy())
+            self.best_epoch = epoch + 1
+            self._bad_epochs = 0
+            return False
+        self._bad_epochs += 1
+        if self._bad_epochs < self.patience:
+            return False
+        if self.verbose:
+            print(f"Early stopping at epoch {epoch+1}, best epoch {self.best_epoch} "
+                  f"(val acc {self._best[0]:.4f})")
+        return True
+
+    def restore_best(self):
+        if self.early_stopping and self._best[1] is not None:
+            self.W, self.b = self._best[1], self._best[2]
 
     def predict(self, X):
         z = X @ self.W + self.b
         y_pred = self.softmax(z)
         return np.argmax(y_pred, axis=1)
-    
+
     def predict_proba(self, X):
         """Trả về xác suất của từng lớp (N, n_classes)"""
         z = X @ self.W + self.b
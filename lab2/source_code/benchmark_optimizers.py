@@ -0,0 +1,129 @@
+"""
+So sánh thời gian huấn luyện SoftmaxRegression (app/model.py) tới khi đạt accuracy mục tiêu:
+full-batch GD (fit cũ) vs mini-batch SGD + momentum vs Adam, có early stopping.
+
+    python benchmark_optimizers.py                      # MNIST trong data/ (idx3-ubyte / .gz)
+    python benchmark_optimizers.py --target 0.91 --gd-epochs 2000
+    python benchmark_optimizers.py --synthetic --target 0.8   # khi chưa có file ảnh MNIST
+
+Accuracy mục tiêu đo trên tập validation (10k ảnh cuối của tập train), thời gian tính cả
+bước đánh giá validation mỗi epoch cho mọi optimizer.
+"""
+import argparse
+import gzip
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from model import SoftmaxRegression  # noqa: E402
+
+
+def read_idx(path):
+    path = Path(path)
+    if not path.exists() and Path(str(path) + ".gz").exists():
+        path = Path(str(path) + ".gz")
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        magic = struct.unpack(">I", f.read(4))[0]
+        ndim = magic & 0xFF
+        shape = struct.unpack(">" + "I" * ndim, f.read(4 * ndim))
+        return np.frombuffer(f.read(), dtype=np.uint8).reshape(shape)
+
+
+def load_mnist(data_dir):
+    X_train = read_idx(data_dir / "train-images.idx3-ubyte").reshape(-1, 784).astype(np.float32) / 255.0
+    y_train = read_idx(data_dir / "train-labels.idx1-ubyte").astype(np.int64)
+    X_test = read_idx(data_dir / "t10k-images.idx3-ubyte").reshape(-1, 784).astype(np.float32) / 255.0
+    y_test = read_idx(data_dir / "t10k-labels.idx1-ubyte").astype(np.int64)
+    return X_train, y_train, X_test, y_test
+
+
+def make_synthetic(n_train=60000, n_test=10000, d=784, n_classes=10, flip=0.43, seed=0):
+    """10 "mẫu nét" nhị phân, lật ngẫu nhiên `flip` số pixel + đổi độ đậm: giá trị trong [0, 1] như MNIST."""
+    rng = np.random.default_rng(seed)
+    prototypes = (rng.random((n_classes, d)) < 0.15).astype(np.float32)
+
+    def sample(n):
+        y = rng.integers(0, n_classes, n)
+        X = prototypes[y]
+        mask = rng.random((n, d)) < flip
+        X[mask] = 1.0 - X[mask]
+        X *= rng.uniform(0.5, 1.0, (n, 1)).astype(np.float32)
+        return X, y
+
+    X_train, y_train = sample(n_train)
+    X_test, y_test = sample(n_test)
+    return X_train, y_train, X_test, y_test
+
+
+def time_to_target(model, target):
+    for h in model.history:
+        if h["val_acc"] is not None and h["val_acc"] >= target:
+            return h["time_s"], h["epoch"]
+    return None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--target", type=float, default=0.90, help="val accuracy mục tiêu")
+    parser.add_argument("--gd-epochs", type=int, default=1000)
+    parser.add_argument("--gd-lr", type=float, default=0.1)
+    parser.add_argument("--epochs", type=int, default=30, help="số epoch tối đa cho sgd / adam")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        X_train, y_train, X_test, y_test = make_synthetic(seed=args.seed)
+        source = "synthetic"
+    else:
+        try:
+            X_train, y_train, X_test, y_test = load_mnist(args.data_dir)
+        except FileNotFoundError as e:
+            sys.exit(f"Không tìm thấy MNIST ({e.filename}); tải vào {args.data_dir} hoặc chạy với --synthetic")
+        source = "mnist"
+    X_tr, y_tr = X_train[:-10000], y_train[:-10000]
+    X_val, y_val = X_train[-10000:], y_train[-10000:]
+    print(f"data={source} train={X_tr.shape} val={X_val.shape} test={X_test.shape} target={args.target}")
+
+    configs = [
+        ("gd (fit cũ)", dict(optimizer="gd", lr=args.gd_lr, epochs=args.gd_epochs)),
+        ("sgd momentum", dict(optimizer="sgd", lr=0.01, momentum=0.9, epochs=args.epochs,
+                              batch_size=args.batch_size, lr_schedule="step", lr_step=10, lr_decay=0.5,
+                              early_stopping=True, patience=4)),
+        ("adam", dict(optimizer="adam", lr=1e-3, epochs=args.epochs, batch_size=args.batch_size,
+                      lr_schedule="cosine", early_stopping=True, patience=4)),
+    ]
+
+    rows = []
+    for name, params in configs:
+        model = SoftmaxRegression(n_classes=10, random_state=args.seed, verbose=False, **params)
+        t0 = time.perf_counter()
+        model.fit(X_tr, y_tr, X_val=X_val, y_val=y_val)
+        total = time.perf_counter() - t0
+        t_target, e_target = time_to_target(model, args.target)
+        test_acc = float(np.mean(model.predict(X_test) == y_test))
+        best_val = max(h["val_acc"] for h in model.history)
+        rows.append((name, t_target, e_target, len(model.history), total, best_val, test_acc))
+
+    print(f"\n{'optimizer':<14} {'t->target':>10} {'epoch':>6} {'epochs':>7} {'total':>8} {'best val':>9} {'test':>7}")
+    base = rows[0][1]
+    for name, t_target, e_target, epochs, total, best_val, test_acc in rows:
+        t_text = f"{t_target:9.2f}s" if t_target is not None else "     n/a  "
+        e_text = f"{e_target:6d}" if e_target is not None else "   n/a"
+        print(f"{name:<14} {t_text} {e_text} {epochs:7d} {total:7.2f}s {best_val:9.4f} {test_acc:7.4f}")
+    for name, t_target, *_ in rows[1:]:
+        if base is not None and t_target is not None:
+            print(f"speedup tới {args.target:.2f} ({name} vs gd): {base / t_target:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
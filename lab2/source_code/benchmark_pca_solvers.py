@@ -0,0 +1,92 @@
+"""
+So sánh PCA svd_solver="full" (covariance + eigh) và "randomized" (PCA/PCA.py) theo số chiều d:
+thời gian fit, tổng explained variance ratio của k thành phần, sai số trị riêng và độ trùng
+không gian con (||U_full.T @ U_rand||_F^2 / k, 1.0 = trùng).
+
+    python benchmark_pca_solvers.py                          # d = 784, 4096, 16384; N = 4000, k = 100
+    python benchmark_pca_solvers.py --dims 784,4096 --n 10000 --k 50
+    python benchmark_pca_solvers.py --full-max-dim 16384     # chạy cả eigh 16384x16384 (rất lâu)
+
+Với d > --full-max-dim, eigh d x d được thay bằng nghiệm chính xác qua ma trận Gram N x N
+(cùng trị riêng khác 0 khi N < d); speedup so với "full" khi đó là ước lượng O(d^3) từ d
+lớn nhất đã đo (đánh dấu ~).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+from PCA.PCA import PCA, _flip_signs  # noqa: E402
+
+
+def make_images(n, d, rank=200, seed=0):
+    """Dữ liệu giống ảnh: hạng thấp với phổ giảm dần + nhiễu, giá trị kiểu pixel [0, 1]."""
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((n, rank)) * (1.0 / np.arange(1, rank + 1) ** 0.7)
+    basis = rng.standard_normal((rank, d)) / np.sqrt(d)
+    X = 0.5 + 0.15 * (latent @ basis) * np.sqrt(d) / 4 + 0.02 * rng.standard_normal((n, d))
+    return np.clip(X, 0.0, 1.0)
+
+
+def exact_via_gram(X, k):
+    """Top-k trị riêng / vector của covariance qua Xc @ Xc.T (N x N) khi N < d."""
+    N = X.shape[0]
+    Xc = X - X.mean(axis=0)
+    eigvals, V = np.linalg.eigh(Xc @ Xc.T / N)
+    idx = np.argsort(eigvals)[::-1][:k]
+    U = Xc.T @ V[:, idx]
+    U /= np.linalg.norm(U, axis=0)
+    return eigvals[idx], _flip_signs(U), float(np.einsum("ij,ij->", Xc, Xc) / N)
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", default="784,4096,16384")
+    parser.add_argument("--n", type=int, default=4000, help="số mẫu")
+    parser.add_argument("--k", type=int, default=100, help="n_components")
+    parser.add_argument("--full-max-dim", type=int, default=8192, help="d lớn nhất chạy eigh d x d")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"N={args.n} k={args.k}")
+    print(f"{'d':>6} {'solver':<11} {'time':>9} {'EVR sum':>9} {'max rel dλ':>11} {'subspace':>9} {'speedup':>8}")
+    last_full = None   # (d, giây) để ước lượng full khi bỏ qua
+    for d in [int(x) for x in args.dims.split(",")]:
+        X = make_images(args.n, d, seed=args.seed)
+
+        if d <= args.full_max_dim:
+            full, t_ref = timed(lambda: PCA(args.k, svd_solver="full").fit(X))
+            ref_vals, ref_U, ref_total = full.eigvals_sorted[:args.k], full.U_m, full.total_variance
+            ref_name, t_full, est = "full", t_ref, ""
+            last_full = (d, t_ref)
+        else:
+            (ref_vals, ref_U, ref_total), t_ref = timed(lambda: exact_via_gram(X, args.k))
+            ref_name = "exact(gram)"
+            t_full = last_full[1] * (d / last_full[0]) ** 3 if last_full else None
+            est = "~"
+        print(f"{d:>6} {ref_name:<11} {t_ref:8.2f}s {ref_vals.sum() / ref_total:9.4f} {'-':>11} {'-':>9} {'-':>8}")
+
+        for solver in ("randomized", "auto"):
+            pca, t = timed(lambda: PCA(args.k, svd_solver=solver, random_state=args.seed).fit(X))
+            vals = pca.eigvals_sorted[:args.k]
+            rel = np.max(np.abs(vals - ref_vals) / ref_vals)
+            overlap = np.linalg.norm(ref_U.T @ pca.U_m) ** 2 / args.k
+            speedup = f"{est}{t_full / t:.1f}x" if t_full else "n/a"
+            name = solver if solver != "auto" else f"auto:{pca.solver_used[:4]}"
+            print(f"{d:>6} {name:<11} {t:8.2f}s {pca.explained_variance_ratio.sum():9.4f} "
+                  f"{rel:11.2e} {overlap:9.6f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Huấn luyện PCA + SoftmaxRegression ngoài bộ nhớ (out-of-core): dữ liệu được memory-map
+từ file .npy hoặc IDX (train-images.idx3-ubyte...) và đọc từng chunk `chunk_rows` hàng,
+không bao giờ tạo ma trận (N, d) đầy đủ trong RAM.
+
+- fit_pca_streaming: PCA.partial_fit theo từng chunk, eigen decomposition 1 lần ở cuối
+- train_softmax_streaming: cùng thứ tự mini-batch với SoftmaxRegression.fit (cùng
+  random_state, chunk_rows là bội của batch_size) nên kết quả khớp đường in-memory
+  (gd: cộng dồn gradient của các chunk rồi mới cập nhật 1 lần / epoch)
+- sau mỗi chunk, trang của file đã map được trả lại cho OS (madvise DONTNEED) để
+  RSS không tăng theo kích thước file
+
+    python train_streaming.py --images data/train-images.idx3-ubyte --labels data/train-labels.idx1-ubyte \
+        --pca 100 --optimizer adam --epochs 10 --out para_model/model_stream.npz
+    python train_streaming.py --synthetic 200000 --dim 4096 --pca 100 --compare   # file giả lập + so với in-memory
+"""
+import argparse
+import mmap
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "app"))
+sys.path.insert(0, str(ROOT))
+
+from model import SoftmaxRegression  # noqa: E402
+from PCA.PCA import PCA  # noqa: E402
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+_IDX_DTYPES = {0x08: np.uint8, 0x09: np.int8, 0x0B: ">i2", 0x0C: ">i4", 0x0D: ">f4", 0x0E: ">f8"}
+
+
+def open_idx(path):
+    """Memory-map 1 file IDX (chưa nén) -> np.memmap shape (N, ...)."""
+    with open(path, "rb") as f:
+        zero, dtype_code, ndim = struct.unpack(">HBB", f.read(4))
+        if zero != 0 or dtype_code not in _IDX_DTYPES:
+            raise ValueError(f"{path}: không phải file IDX (giải nén .gz trước khi memory-map)")
+        shape = struct.unpack(">" + "I" * ndim, f.read(4 * ndim))
+    return np.memmap(path, dtype=_IDX_DTYPES[dtype_code], mode="r", offset=4 + 4 * ndim, shape=shape)
+
+
+def open_array(path):
+    """.npy -> np.load(mmap_mode="r"), còn lại coi là IDX."""
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r")
+    return open_idx(path)
+
+
+def release_pages(X):
+    """Trả các trang đã đọc của memmap cho OS (dữ liệu vẫn nằm trong page cache)."""
+    mm = getattr(X, "_mmap", None)
+    if mm is None and isinstance(getattr(X, "base", None), mmap.mmap):
+        mm = X.base
+    if mm is not None and hasattr(mm, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+        mm.madvise(mmap.MADV_DONTNEED)
+
+
+def load_rows(X, rows, scale=1.0, transform=None):
+    """Đọc các hàng `rows` (slice hoặc mảng chỉ số) -> float32 (n, d) (+ transform, vd. PCA)."""
+    chunk = np.asarray(X[rows]).reshape(-1, int(np.prod(X.shape[1:])))
+    chunk = chunk.astype(np.float32) * np.float32(scale)
+    release_pages(X)
+    return transform(chunk) if transform is not None else chunk
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def fit_pca_streaming(pca, X, chunk_rows=8192, scale=1.0):
+    n = X.shape[0]
+    for s in range(0, n, chunk_rows):
+        pca.partial_fit(load_rows(X, slice(s, min(n, s + chunk_rows)), scale))
+    return pca.finalize()
+
+
+def train_softmax_streaming(model, X, y, chunk_rows=8192, X_val=None, y_val=None, scale=1.0, transform=None):
+    """
+    Giống model.fit(X * scale (đã transform), y, X_val, y_val) nhưng đọc X theo chunk.
+    X_val / y_val (đã scale + transform) nằm trong RAM; early stopping cần X_val.
+    """
+    if model.optimizer not in ("gd", "sgd", "adam"):
+        raise ValueError(f"Unknown optimizer: {model.optimizer}")
+    y = np.asarray(y)
+    n = X.shape[0]
+    # chunk là bội của batch_size -> mini-batch trùng với fit()
+    chunk_rows = max(model.batch_size, chunk_rows // model.batch_size * model.batch_size)
+    rng = np.random.default_rng(model.random_state)
+
+    first = load_rows(X, slice(0, 1), scale, transform)
+    model.init_params(first.shape[1])
+
+    for i in range(model.epochs):
+        lr = model.learning_rate(i)
+        loss_sum = 0.0
+        if model.optimizer == "gd":
+            dW = np.zeros_like(model.W, dtype=np.float64)
+            db = np.zeros_like(model.b, dtype=np.float64)
+            for s in range(0, n, chunk_rows):
+                e = min(n, s + chunk_rows)
+                g_W, g_b, chunk_loss = model.gradient(load_rows(X, slice(s, e), scale, transform), y[s:e])
+                dW += g_W
+                db += g_b
+                loss_sum += chunk_loss
+            model.apply_gradient(dW / n, db / n, lr)
+        else:
+            order = rng.permutation(n)
+            for s in range(0, n, chunk_rows):
+                rows = order[s:s + chunk_rows]
+                Xc = load_rows(X, rows, scale, transform)
+                loss_sum += model.run_batches(Xc, y[rows], np.arange(len(rows)), lr)
+        if model.end_epoch(i, loss_sum / n, lr, X_val, y_val):
+            break
+
+    model.restore_best()
+    return model
+
+
+def write_synthetic(path_prefix, rows, dim, n_classes=10, chunk_rows=8192, seed=0):
+    """Ghi (rows, dim) uint8 + nhãn ra .npy theo chunk (không tạo cả mảng trong RAM)."""
+    rng = np.random.default_rng(seed)
+    prototypes = rng.random((n_classes, dim)) < 0.15
+    X = np.lib.format.open_memmap(f"{path_prefix}_X.npy", mode="w+", dtype=np.uint8, shape=(rows, dim))
+    y = np.lib.format.open_memmap(f"{path_prefix}_y.npy", mode="w+", dtype=np.uint8, shape=(rows,))
+    for s in range(0, rows, chunk_rows):
+        e = min(rows, s + chunk_rows)
+        labels = rng.integers(0, n_classes, e - s)
+        ink = prototypes[labels] ^ (rng.random((e - s, dim)) < 0.43)
+        X[s:e] = np.where(ink, rng.integers(128, 256, (e - s, 1), dtype=np.uint8), np.uint8(0))
+        y[s:e] = labels
+        X.flush()
+        release_pages(X)
+    del X, y
+    return Path(f"{path_prefix}_X.npy"), Path(f"{path_prefix}_y.npy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=Path, help=".npy hoặc IDX (N, ...) ")
+    parser.add_argument("--labels", type=Path)
+    parser.add_argument("--synthetic", type=int, default=0, help="tạo dữ liệu giả lập N hàng trong data/")
+    parser.add_argument("--dim", type=int, default=784, help="số chiều dữ liệu giả lập")
+    parser.add_argument("--scale", type=float, default=1 / 255.0)
+    parser.add_argument("--val-rows", type=int, default=10000, help="số hàng cuối dùng làm validation")
+    parser.add_argument("--pca", type=int, default=0, help="số thành phần PCA (0 = không dùng)")
+    parser.add_argument("--optimizer", default="adam", choices=["gd", "sgd", "adam"])
+    parser.add_argument("--lr", type=float, default=None)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--chunk-rows", type=int, default=8192)
+    parser.add_argument("--early-stopping", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", action="store_true", help="chạy thêm đường in-memory và so kết quả")
+    parser.add_argument("--out", type=Path, help="lưu W, b, mu, U_m (.npz) như para_model/")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        prefix = ROOT / "data" / f"synthetic_{args.synthetic}x{args.dim}"
+        if not Path(f"{prefix}_X.npy").exists():
+            print(f"Ghi dữ liệu giả lập {args.synthetic}x{args.dim} -> {prefix}_X.npy")
+            write_synthetic(prefix, args.synthetic, args.dim, chunk_rows=args.chunk_rows, seed=args.seed)
+        args.images, args.labels = Path(f"{prefix}_X.npy"), Path(f"{prefix}_y.npy")
+    if args.images is None or args.labels is None:
+        parser.error("cần --images và --labels (hoặc --synthetic N)")
+
+    X = open_array(args.images)
+    y_all = np.asarray(open_array(args.labels)).astype(np.int64)
+    n = X.shape[0] - args.val_rows
+    X_train, y_train = X[:n], y_all[:n]
+    print(f"data={args.images.name} shape={X.shape} train={n} val={args.val_rows} chunk_rows={args.chunk_rows}")
+
+    t0 = time.perf_counter()
+    pca = None
+    transform = None
+    if args.pca:
+        pca = fit_pca_streaming(PCA(args.pca), X_train, args.chunk_rows, args.scale)
+        transform = lambda chunk: pca.transform(chunk).astype(np.float32)  # noqa: E731
+        print(f"PCA {args.pca}: {time.perf_counter() - t0:.1f}s")
+    X_val = load_rows(X, slice(n, X.shape[0]), args.scale, transform) if args.val_rows else None
+    y_val = y_all[n:] if args.val_rows else None
+
+    lr = args.lr if args.lr is not None else {"gd": 0.1, "sgd": 0.01, "adam": 1e-3}[args.optimizer]
+    params = dict(lr=lr, epochs=args.epochs, n_classes=int(y_all.max()) + 1, optimizer=args.optimizer,
+                  batch_size=args.batch_size, early_stopping=args.early_stopping,
+                  random_state=args.seed, verbose=True)
+    model = train_softmax_streaming(SoftmaxRegression(**params), X_train, y_train, args.chunk_rows,
+                                    X_val, y_val, args.scale, transform)
+    elapsed = time.perf_counter() - t0
+    val_acc = float(np.mean(model.predict(X_val) == y_val)) if X_val is not None else float("nan")
+    print(f"streaming: {elapsed:.1f}s, val acc {val_acc:.4f}, peak RSS {peak_rss_mb():.0f} MB")
+
+    if args.out:
+        extra = {"mu": pca.mu, "U_m": pca.U_m} if pca is not None else {}
+        np.savez(args.out, W=model.W, b=model.b, **extra)
+        print(f"Đã lưu {args.out}")
+
+    if args.compare:
+        # in-memory: cùng phép scale, cùng tham số
+        X_mem = np.asarray(X_train).reshape(n, -1).astype(np.float32) * np.float32(args.scale)
+        if args.pca:
+            pca_mem = PCA(args.pca).fit(X_mem)
+            print(f"PCA |mu diff| {np.abs(pca_mem.mu - pca.mu).max():.2e}, "
+                  f"|U_m diff| {np.abs(pca_mem.U_m - pca.U_m).max():.2e}")
+            X_mem = pca_mem.transform(X_mem).astype(np.float32)
+        mem = SoftmaxRegression(**{**params, "verbose": False}).fit(X_mem, y_train, X_val, y_val)
+        print(f"in-memory: val acc {np.mean(mem.predict(X_val) == y_val):.4f}, "
+              f"|W diff| {np.abs(mem.W - model.W).max():.2e}, peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 from flask import Flask
 from flask_cors import CORS
 
-from .routes.ocr import ocr_bp
+from .routes.health import health_bp
+from .routes.ocr import ocr_bp, init_ocr
 from .routes.llm import llm_bp
 from .routes.practice import practice_bp
+from .routes.admin import admin_bp
+from .services.metrics import init_metrics
+from .services.practice_service import ca_dao_bank, curriculum_bank
 
 
 def create_app() -> Flask:
@@ -12,9 +16,21 @@ def create_app() -> Flask:
     # Enable CORS for Node.js backend requests
     CORS(app)
 
+    # Đo thời gian từng request / stage (GET /metrics, header Server-Timing)
+    init_metrics(app)
+
     # Register blueprints
+    app.register_blueprint(health_bp)
     app.register_blueprint(ocr_bp)
     app.register_blueprint(llm_bp)
     app.register_blueprint(practice_bp)
+    app.register_blueprint(admin_bp)
+
+    # Nạp question bank 1 lần lúc khởi động (tự nạp lại khi file đổi)
+    ca_dao_bank.get()
+    curriculum_bank.get()
+
+    # Load VietOCR ở background, /readyz báo khi sẵn sàng
+    init_ocr()
 
     return app
@@ -0,0 +1,102 @@
+# coding: utf-8
+"""
+Admin Routes - profile CPU / bộ nhớ của process đang chạy (chỉ cho admin)
+
+Cần header `X-Admin-Token: <ADMIN_TOKEN>`; không đặt ADMIN_TOKEN thì mọi route /admin trả 404.
+"""
+import hmac
+import os
+import time
+
+from flask import Blueprint, Response, g, jsonify, request
+
+from ..services.profiler import ProfilerBusy, current_rss_bytes, memory_tracker, profiler
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "").strip()
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+
+
+@admin_bp.before_request
+def require_admin():
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Forbidden"}), 403
+
+
+# RSS theo endpoint: chỉ đọc /proc khi đang bật theo dõi bộ nhớ
+@admin_bp.before_app_request
+def _rss_before():
+    if memory_tracker.enabled:
+        g._rss_before = current_rss_bytes()
+
+
+@admin_bp.after_app_request
+def _rss_after(response):
+    if memory_tracker.enabled and "_rss_before" in g:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        memory_tracker.record(endpoint, g._rss_before, current_rss_bytes())
+    return response
+
+
+@admin_bp.route("/profile", methods=["GET", "POST"])
+def profile():
+    """
+    Lấy mẫu stack mọi thread trong `seconds` giây (mặc định 10), trả file collapsed stacks
+    (flamegraph.pl, speedscope.app). Request chờ hết thời gian profile.
+
+    Query: seconds, interval_ms (mặc định 5), idle=1 để giữ cả thread đang chờ.
+    """
+    try:
+        seconds = min(PROFILE_MAX_SECONDS, max(0.1, float(request.args.get("seconds", "10"))))
+        interval_s = max(0.001, float(request.args.get("interval_ms", "5")) / 1000.0)
+    except ValueError:
+        return jsonify({"error": "seconds / interval_ms phải là số"}), 400
+    include_idle = request.args.get("idle", "0") in ("1", "true")
+
+    try:
+        collapsed = profiler.profile(seconds, interval_s, include_idle)
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+
+    filename = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed"
+    response = Response(collapsed, mimetype="text/plain")
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Profile-Samples"] = str(profiler.last_run["samples"])
+    return response
+
+
+@admin_bp.post("/memory/start")
+def memory_start():
+    """Bật tracemalloc (frames = số frame traceback, mặc định 1) + RSS theo endpoint."""
+    try:
+        frames = max(1, int(request.args.get("frames", "1")))
+    except ValueError:
+        return jsonify({"error": "frames phải là số nguyên"}), 400
+    memory_tracker.start(frames)
+    return jsonify({"success": True, "tracking": True, "frames": frames})
+
+
+@admin_bp.post("/memory/stop")
+def memory_stop():
+    memory_tracker.stop()
+    return jsonify({"success": True, "tracking": False})
+
+
+@admin_bp.get("/memory")
+def memory():
+    """
+    Top dòng code cấp phát (tracemalloc, key=lineno|traceback|filename, limit mặc định 20),
+    RSS hiện tại / đỉnh của process và RSS đỉnh / tăng lớn nhất sau 1 request theo endpoint.
+    """
+    key_type = request.args.get("key", "lineno")
+    if key_type not in ("lineno", "traceback", "filename"):
+        return jsonify({"error": "key phải là lineno, traceback hoặc filename"}), 400
+    try:
+        limit = max(1, int(request.args.get("limit", "20")))
+    except ValueError:
+        return jsonify({"error": "limit phải là số nguyên"}), 400
+    return jsonify(memory_tracker.snapshot(limit, key_type))
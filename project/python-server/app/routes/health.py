@@ -0,0 +1,36 @@
+# coding: utf-8
+"""
+Health Routes - liveness / readiness cho load balancer và Node.js backend
+"""
+from flask import Blueprint, Response, jsonify
+
+from ..services.bulkhead import bulkhead_stats
+from ..services.metrics import registry
+from ..services.models import is_ready, model_status
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.get("/healthz")
+def healthz():
+    """Liveness: process còn sống và nhận request."""
+    return jsonify({"status": "ok"})
+
+
+@health_bp.get("/readyz")
+def readyz():
+    """Readiness: VietOCR đã load xong và đã chạy 1 lần warm-up inference."""
+    status = model_status()
+    return jsonify({
+        "status": "ready" if is_ready() else "starting",
+        "ocr": status,
+        "bulkheads": bulkhead_stats(),
+    }), (
+        200 if is_ready() else 503
+    )
+
+
+@health_bp.get("/metrics")
+def metrics():
+    """Histogram độ trễ theo stage / endpoint, định dạng text của Prometheus."""
+    return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -2,18 +2,65 @@
 """
 LLM Routes - Xử lý các request từ Node.js backend cho VinaLLaMA model
 """
-from flask import Blueprint, jsonify, request
-from ..services.vinallama_service import generate_response, get_model_info, init_vinallama
+import json
+
+from flask import Blueprint, Response, jsonify, request
+from ..services.vinallama_service import generate_response, get_model_info, init_vinallama, stream_response
 
 llm_bp = Blueprint("llm", __name__, url_prefix="/llm")
 
 
+def _stream_mode(data: dict):
+    """
+    "stream": true | "sse" -> Server-Sent Events, "ndjson" -> NDJSON; mặc định không stream.
+    """
+    mode = data.get("stream", request.args.get("stream"))
+    if mode in (True, "true", "1", "sse"):
+        return "sse"
+    if mode == "ndjson":
+        return "ndjson"
+    return None
+
+
+def _streaming_response(mode: str, **kwargs):
+    """
+    Forward từng đoạn text của Gemini ngay khi nhận được.
+    SSE:    data: {"delta": "..."}  ...  event: done / data: {"ttfb_ms", "total_ms", "chunks"}
+    NDJSON: {"delta": "..."}        ...  {"done": true, "ttfb_ms", "total_ms", "chunks"}
+    """
+    def encode(obj, event=None):
+        line = json.dumps(obj, ensure_ascii=False)
+        if mode == "ndjson":
+            return line + "\n"
+        return (f"event: {event}\n" if event else "") + f"data: {line}\n\n"
+
+    def generate():
+        timings = {}
+        try:
+            for text in stream_response(timings=timings, **kwargs):
+                yield encode({"delta": text})
+        except Exception as e:
+            yield encode({"error": str(e)}, event="error")
+            return
+        done = {
+            "ttfb_ms": timings.get("ttfb_ms"),
+            "total_ms": timings.get("total_ms"),
+            "chunks": timings.get("chunks", 0),
+            "model_id": "vilm/vinallama-7b-chat",
+        }
+        yield encode({"done": True, **done} if mode == "ndjson" else done, event="done")
+
+    mimetype = "application/x-ndjson" if mode == "ndjson" else "text/event-stream"
+    return Response(generate(), mimetype=mimetype, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @llm_bp.get("/")
 def home():
     return jsonify({
         "message": "VinaLLaMA-7B-Chat API",
         "endpoints": {
-            "POST /llm/generate": "Sinh response từ prompt",
+            "POST /llm/generate": "Sinh response từ prompt (\"stream\": true | \"ndjson\" để stream)",
+            "POST /llm/chat": "Chat format (hỗ trợ \"stream\" như /llm/generate)",
             "GET /llm/info": "Lấy thông tin model",
             "POST /llm/init": "Khởi tạo model (pre-load)"
         }
@@ -60,7 +107,8 @@ def generate():
         "max_new_tokens": 256,      // optional, default 256
         "do_sample": true,          // optional, default true
         "temperature": 0.7,         // optional, default 0.7
-        "top_p": 0.9                // optional, default 0.9
+        "top_p": 0.9,               // optional, default 0.9
+        "stream": true              // optional: true/"sse" (text/event-stream) hoặc "ndjson"
     }
     
     Response:
@@ -93,6 +141,17 @@ def generate():
         if max_new_tokens > 2048:
             max_new_tokens = 2048  # Giới hạn max tokens
         
+        mode = _stream_mode(data)
+        if mode:
+            return _streaming_response(
+                mode,
+                prompt=prompt,
+                max_new_tokens=max_new_tokens,
+                do_sample=do_sample,
+                temperature=temperature,
+                top_p=top_p
+            )
+
         # Generate response
         response = generate_response(
             prompt=prompt,
@@ -124,7 +183,8 @@ def chat():
             {"role": "user", "content": "Xin chào!"}
         ],
         "max_new_tokens": 256,
-        "temperature": 0.7
+        "temperature": 0.7,
+        "stream": true          // optional, giống /llm/generate
     }
     """
     try:
@@ -159,6 +219,17 @@ def chat():
         max_new_tokens = data.get("max_new_tokens", 256)
         temperature = data.get("temperature", 0.7)
         
+        mode = _stream_mode(data)
+        if mode:
+            return _streaming_response(
+                mode,
+                prompt=prompt,
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+                temperature=temperature,
+                top_p=0.9
+            )
+        
         response = generate_response(
             prompt=prompt,
             max_new_tokens=max_new_tokens,
@@ -1,15 +1,51 @@
 #from pyexpat import model
+import os
+import json
 from pathlib import Path
-from flask import Blueprint, jsonify, request
-from PIL import Image
-import io
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
-from ..services.vietocr_service import run_vietocr
-from ..services.models import init_model
+from ..services.vietocr_service import decode_stats, preprocess_image, run_vietocr_batch
+from ..services.models import OCR_WORKERS, get_model, get_worker_pool, is_loaded, start_warmup
+from ..services.batcher import MicroBatcher
+from ..services.ocr_cache import OCRResultCache, image_cache_key
+from ..services.bulkhead import bulkhead
+from ..services.metrics import stage
 ocr_bp = Blueprint("ocr", __name__)
 #path_model = str(Path(__file__).parent.parent / "weight_model" / "best_model.pth")
 path_model = None
-model = init_model(path_model)
+
+
+def init_ocr():
+    """Bắt đầu load VietOCR ở background (không block create_app)."""
+    start_warmup(path_model)
+
+
+def _run_ocr_batch(imgs):
+    # chạy ở thread của batcher: chỉ vào histogram, không vào Server-Timing
+    with stage("ocr_forward"):
+        pool = get_worker_pool()
+        if pool is not None:
+            return pool.run_batch(imgs)
+        return run_vietocr_batch(get_model(), imgs)
+
+
+# Gom các request đồng thời thành 1 batch forward
+# (ở chế độ worker pool: mỗi worker process có 1 batch đang chạy)
+batcher = MicroBatcher(
+    _run_ocr_batch,
+    max_batch_size=int(os.environ.get("OCR_MAX_BATCH_SIZE", "16")),
+    max_wait_ms=float(os.environ.get("OCR_MAX_WAIT_MS", "10")),
+    concurrency=max(1, OCR_WORKERS),
+).start()
+
+# Số ảnh tối đa trong 1 request /predict/batch
+MAX_BATCH_IMAGES = int(os.environ.get("MAX_BATCH_IMAGES", "64"))
+
+# Cache kết quả theo nội dung ảnh (retry, double-click, vẽ lại cùng 1 từ)
+ocr_cache = OCRResultCache(
+    max_entries=int(os.environ.get("OCR_CACHE_MAX_ENTRIES", "2048")),
+    ttl_s=float(os.environ.get("OCR_CACHE_TTL_S", "3600")),
+)
 
 @ocr_bp.get("/")
 def home():
@@ -17,26 +53,103 @@ def home():
 
 
 @ocr_bp.post("/predict")
+@bulkhead("ocr")
 def predict():
     if "image" not in request.files:
         return jsonify({"error": "No image part in the request"}), 400
 
+    if not is_loaded():
+        return jsonify({"error": "OCR model is still loading, retry shortly"}), 503
+
     file = request.files["image"]
 
     try:
         img_bytes = file.read()
-        pil_img = Image.open(io.BytesIO(img_bytes))
+        pil_img = preprocess_image(get_model(), img_bytes)
 
         # Fallback VietOCR (Vietnamese printed)
         
-        ocr_text = run_vietocr(model, pil_img)
+        cache_key = image_cache_key(pil_img)
+        # inference = chờ trong batcher + forward (hoặc cache hit)
+        with stage("inference"):
+            ocr_text, cache_status = ocr_cache.get_or_compute(
+                cache_key, lambda: batcher.predict(pil_img)
+            )
         model_used = "vietocr_fallback"
 
         return jsonify({
             "message": "OK",
             "model_used": model_used,
             "ocr_text": ocr_text,
+            "cache": cache_status,
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@ocr_bp.post("/predict/batch")
+@bulkhead("ocr")
+def predict_batch():
+    """
+    Nhận N ảnh trong 1 request multipart (key `images`, lặp lại nhiều lần)
+    và stream kết quả dạng NDJSON, mỗi dòng 1 ảnh, ngay khi batch chứa ảnh đó xong.
+
+    Mỗi dòng:
+    {"index": 0, "filename": "blank_1.png", "ocr_text": "..."}
+    hoặc {"index": 3, "filename": "...", "error": "..."}
+    """
+    files = request.files.getlist("images") or request.files.getlist("image")
+    if not files:
+        return jsonify({"error": "No images part in the request"}), 400
+    if len(files) > MAX_BATCH_IMAGES:
+        return jsonify({"error": f"Too many images: {len(files)} > {MAX_BATCH_IMAGES}"}), 413
+    if not is_loaded():
+        return jsonify({"error": "OCR model is still loading, retry shortly"}), 503
+
+    # Chỉ đọc bytes ở đây: file upload bị đóng khi view return, trước khi generator chạy
+    uploads = [(file.filename, file.read()) for file in files]
+    model = get_model()
+
+    def line_for(index, filename, fut, error):
+        line = {"index": index, "filename": filename}
+        if fut is not None:
+            try:
+                line["ocr_text"] = fut.result()
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            line["error"] = error
+        return json.dumps(line, ensure_ascii=False) + "\n"
+
+    def generate():
+        # Decode + đẩy từng ảnh vào batcher lần lượt (batcher vẫn gom thành batch thật),
+        # và trả các dòng đầu đã xong trong lúc decode ảnh sau, theo đúng thứ tự index.
+        pending = []
+        for index, (filename, img_bytes) in enumerate(uploads):
+            try:
+                pil_img = preprocess_image(model, img_bytes)
+                pending.append((index, filename, batcher.submit(pil_img), None))
+            except Exception as e:
+                pending.append((index, filename, None, str(e)))
+            while pending and (pending[0][2] is None or pending[0][2].done()):
+                yield line_for(*pending.pop(0))
+        for job in pending:
+            yield line_for(*job)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@ocr_bp.get("/predict/stats")
+def predict_stats():
+    """
+    Thống kê micro-batching (throughput, kích thước batch, thời gian chờ trong queue)
+    và OCR cache (hit / miss / coalesced).
+    """
+    pool = get_worker_pool()
+    return jsonify({
+        "batcher": batcher.stats(),
+        "cache": ocr_cache.stats(),
+        "decoder": decode_stats(),
+        "worker_pool": pool.stats() if pool is not None else None,
+    })
@@ -2,13 +2,26 @@
 """
 Practice Routes - API endpoints cho tính năng Practice
 """
-from flask import Blueprint, jsonify, request
+import json
+import time
+from contextlib import nullcontext
+from concurrent.futures import TimeoutError as FuturesTimeout, as_completed
+
+from flask import Blueprint, Response, jsonify, request
 from ..services.practice_service import (
     generate_practice_questions,
     check_answer,
     check_ca_dao_answer,
-    check_daily_life_answers_batch_with_llm
+    check_daily_life_answers_batch_with_llm,
+    resolve_verdict,
+    submit_daily_life_answers,
+    grading_batcher,
+    LLM_COALESCE_TIMEOUT_S,
+    verdict_store,
+    ca_dao_bank,
+    curriculum_bank
 )
+from ..services.metrics import stage
 
 practice_bp = Blueprint("practice", __name__, url_prefix="/practice")
 
@@ -22,7 +35,11 @@ def home():
         "message": "Practice API - Vietnamese Learning App",
         "endpoints": {
             "GET /practice/questions": "Lấy 10 câu hỏi (5 ca dao + 5 đời thường)",
-            "POST /practice/check-answer": "Kiểm tra câu trả lời"
+            "POST /practice/check-answer": "Kiểm tra câu trả lời",
+            "POST /practice/check-batch": "Kiểm tra nhiều câu trả lời cùng lúc",
+            "GET /practice/curriculum": "Lộ trình học (curriculum.json)",
+            "GET /practice/curriculum/<topic_id>/<lesson_id>": "1 bài học trong lộ trình",
+            "GET /practice/stats": "Thống kê verdict store / gom lời gọi LLM / question bank"
         }
     })
 
@@ -88,6 +105,46 @@ def get_questions():
         }), 500
 
 
+@practice_bp.get("/stats")
+def stats():
+    """
+    GET /practice/stats - hit rate của verdict store (câu đời thường đã chấm)
+    và số câu trung bình mỗi lần gọi LLM của grading_batcher.
+    """
+    return jsonify({
+        "verdict_store": verdict_store.stats(),
+        "llm_grader": grading_batcher.stats(),
+        "question_bank": {
+            "ca_dao": ca_dao_bank.stats(),
+            "curriculum": curriculum_bank.stats(),
+        },
+    })
+
+
+@practice_bp.get("/curriculum")
+def get_curriculum():
+    """
+    GET /practice/curriculum - lộ trình học (roadmap) từ curriculum.json, giữ trong RAM.
+    """
+    bank = curriculum_bank.get()
+    return jsonify({
+        "success": True,
+        "curriculum": bank.data.get("curriculum", {}),
+        "roadmap": bank.roadmap()
+    })
+
+
+@practice_bp.get("/curriculum/<int:topic_id>/<int:lesson_id>")
+def get_lesson(topic_id: int, lesson_id: int):
+    lesson = curriculum_bank.get().lesson(topic_id, lesson_id)
+    if lesson is None:
+        return jsonify({
+            "success": False,
+            "error": f"Không tìm thấy bài {lesson_id} của chủ đề {topic_id}"
+        }), 404
+    return jsonify({"success": True, "lesson": lesson})
+
+
 @practice_bp.post("/check-answer")
 def check_answer_route():
     """
@@ -143,13 +200,15 @@ def check_answer_route():
                 "error": f"Invalid question type: {question_type}"
             }), 400
         
-        # Kiểm tra câu trả lời
-        result = check_answer(
-            question_type=question_type,
-            question=question,
-            user_answer=user_answer,
-            correct_answer=correct_answer
-        )
+        # Kiểm tra câu trả lời. llm_grading = doi_thuong chờ grading batcher (verdict store / Gemini);
+        # chi tiết Gemini ở /metrics
+        with (stage("llm_grading") if question_type == "doi_thuong" else nullcontext()):
+            result = check_answer(
+                question_type=question_type,
+                question=question,
+                user_answer=user_answer,
+                correct_answer=correct_answer
+            )
         
         return jsonify({
             "success": True,
@@ -200,6 +259,10 @@ def check_batch_route():
         "score": 8,
         "total": 10
     }
+
+    Với "stream": true (hoặc ?stream=ndjson): trả NDJSON, mỗi dòng là kết quả của 1 câu
+    ({"question_id", "is_correct", "explanation"}) ngay khi chấm xong (ca dao / câu đã có
+    verdict trước, câu cần LLM theo thứ tự LLM trả về), dòng cuối {"done": true, "score", "total"}.
     """
     try:
         data = request.get_json()
@@ -212,6 +275,9 @@ def check_batch_route():
         
         answers = data["answers"]
         
+        if data.get("stream", request.args.get("stream")) in (True, "true", "1", "ndjson"):
+            return _check_batch_stream(answers)
+        
         # Tách câu hỏi thành 2 nhóm: ca_dao và doi_thuong
         ca_dao_answers = []
         doi_thuong_answers = []
@@ -248,7 +314,8 @@ def check_batch_route():
                 for item in doi_thuong_answers
             ]
             
-            llm_results = check_daily_life_answers_batch_with_llm(batch_data)
+            with stage("llm_grading"):
+                llm_results = check_daily_life_answers_batch_with_llm(batch_data)
             
             for result in llm_results:
                 doi_thuong_results[result["id"]] = {
@@ -295,3 +362,57 @@ def check_batch_route():
             "success": False,
             "error": str(e)
         }), 500
+
+
+def _check_batch_stream(answers):
+    """NDJSON cho /practice/check-batch: kết quả từng câu ngay khi có."""
+    doi_thuong = [a for a in answers if a.get("type") == "doi_thuong"]
+    futures = submit_daily_life_answers([
+        {"id": a.get("id"), "question": a.get("question"), "user_answer": a.get("user_answer", "")}
+        for a in doi_thuong
+    ])
+
+    def line(obj):
+        return json.dumps(obj, ensure_ascii=False) + "\n"
+
+    def generate():
+        score = 0
+        for answer_data in answers:
+            question_type = answer_data.get("type")
+            if question_type == "doi_thuong":
+                continue
+            if question_type == "ca_dao":
+                correct_answer = answer_data.get("correct_answer", "")
+                is_correct, explanation = check_ca_dao_answer(correct_answer, answer_data.get("user_answer", ""))
+                result = {"is_correct": is_correct, "explanation": explanation, "correct_answer": correct_answer}
+            else:
+                result = {"is_correct": False, "explanation": "Không thể kiểm tra câu trả lời này."}
+            score += int(bool(result["is_correct"]))
+            yield line({"question_id": answer_data.get("id"), **result})
+
+        # các câu trùng cặp (câu hỏi, câu trả lời) dùng chung 1 Future
+        by_future = {}
+        for answer_data, fut in zip(doi_thuong, futures):
+            by_future.setdefault(fut, []).append(answer_data)
+        deadline = time.monotonic() + LLM_COALESCE_TIMEOUT_S
+        done = set()
+        try:
+            for fut in as_completed(by_future, timeout=LLM_COALESCE_TIMEOUT_S):
+                done.add(fut)
+                verdict = resolve_verdict(fut, timeout=0)
+                for answer_data in by_future[fut]:
+                    score += int(bool(verdict["is_correct"]))
+                    yield line({"question_id": answer_data.get("id"), **verdict})
+        except FuturesTimeout:
+            pass
+        for fut, group in by_future.items():
+            if fut in done:
+                continue
+            verdict = resolve_verdict(fut, timeout=max(0.0, deadline - time.monotonic()))
+            for answer_data in group:
+                score += int(bool(verdict["is_correct"]))
+                yield line({"question_id": answer_data.get("id"), **verdict})
+
+        yield line({"done": True, "success": True, "score": score, "total": len(answers)})
+
+    return Response(generate(), mimetype="application/x-ndjson")
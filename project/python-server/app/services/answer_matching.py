@@ -0,0 +1,132 @@
+# coding: utf-8
+"""
+So khớp đáp án tiếng Việt nhanh, có chấp nhận lỗi gõ.
+
+- strip_diacritics: 1 lần str.translate với bảng dịch tính sẵn (mọi chữ có dấu
+  tiếng Việt / Latin -> chữ gốc, đ -> d, dấu tổ hợp NFD bị xoá) thay vì NFD + 8 lần replace
+- AnswerKey: dạng chuẩn hoá (NFC, lower, gộp khoảng trắng) và dạng bỏ dấu của đáp án,
+  tính 1 lần khi nạp câu hỏi
+- bounded_levenshtein: khoảng cách sửa có ngưỡng k (Ukkonen): chỉ tính dải 2k+1 quanh
+  đường chéo và dừng ngay khi cả hàng đã vượt k -> O(k * n) thay vì O(n * m)
+
+match_answer trả về 1 trong: "exact", "no_diacritics", "typo", "wrong".
+"""
+import re
+import sys
+import unicodedata
+from typing import NamedTuple, Optional
+
+
+def _build_diacritic_table() -> dict:
+    table = {}
+    for cp in range(0x00C0, 0x1F00):
+        ch = chr(cp)
+        if unicodedata.combining(ch):
+            table[cp] = None
+            continue
+        base = "".join(c for c in unicodedata.normalize("NFD", ch) if not unicodedata.combining(c))
+        if base != ch and base.isascii():
+            table[cp] = base
+    table[ord("đ")] = "d"
+    table[ord("Đ")] = "D"
+    return table
+
+
+_DIACRITIC_TABLE = _build_diacritic_table()
+_SPACES = re.compile(r"\s+")
+
+
+def strip_diacritics(text: str) -> str:
+    return text.translate(_DIACRITIC_TABLE)
+
+
+def normalize(text: str) -> str:
+    """NFC + lower + bỏ khoảng trắng thừa (NFC để chữ gõ bằng dấu tổ hợp khớp chữ dựng sẵn)."""
+    if not text:
+        return ""
+    if not unicodedata.is_normalized("NFC", text):
+        text = unicodedata.normalize("NFC", text)
+    return _SPACES.sub(" ", text.lower().strip())
+
+
+def bounded_levenshtein(a: str, b: str, k: int) -> int:
+    """Khoảng cách Levenshtein nếu <= k, ngược lại trả về k + 1."""
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > k:
+        return k + 1
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    if la == 0:
+        return lb if lb <= k else k + 1
+
+    over = k + 1
+    prev = [j if j <= k else over for j in range(lb + 1)]
+    for i in range(1, la + 1):
+        lo, hi = max(1, i - k), min(lb, i + k)
+        cur = [over] * (lb + 1)
+        cur[0] = i if i <= k else over
+        ca = a[i - 1]
+        row_min = cur[0] if lo == 1 else over
+        for j in range(lo, hi + 1):
+            v = prev[j - 1] + (ca != b[j - 1])
+            if prev[j] + 1 < v:
+                v = prev[j] + 1
+            if cur[j - 1] + 1 < v:
+                v = cur[j - 1] + 1
+            if v > over:
+                v = over
+            cur[j] = v
+            if v < row_min:
+                row_min = v
+        if row_min > k:
+            return over
+        prev = cur
+    return prev[lb] if prev[lb] <= k else over
+
+
+class AnswerKey(NamedTuple):
+    raw: str
+    norm: str
+    plain: str
+
+    @classmethod
+    def build(cls, answer: str) -> "AnswerKey":
+        norm = normalize(answer)
+        return cls(answer, sys.intern(norm), sys.intern(strip_diacritics(norm)))
+
+
+class MatchResult(NamedTuple):
+    kind: str                 # "exact" | "no_diacritics" | "typo" | "wrong"
+    distance: Optional[int]   # số lỗi sửa (trên dạng bỏ dấu) khi kind == "typo"
+
+    @property
+    def is_correct(self) -> bool:
+        return self.kind != "wrong"
+
+
+def match_answer(
+    key: AnswerKey,
+    user_answer: str,
+    allow_no_diacritics: bool = True,
+    max_typos: int = 0,
+    typo_min_length: int = 4,
+) -> MatchResult:
+    """
+    max_typos > 0: chấp nhận thêm tối đa `max_typos` lỗi sửa (trên dạng bỏ dấu) khi
+    đáp án có ít nhất `typo_min_length` ký tự (đáp án ngắn như "ăn" thì không).
+    """
+    norm = normalize(user_answer)
+    if norm == key.norm:
+        return MatchResult("exact", 0)
+    if not allow_no_diacritics:
+        return MatchResult("wrong", None)
+    plain = strip_diacritics(norm)
+    if plain == key.plain:
+        return MatchResult("no_diacritics", 0)
+    if max_typos > 0 and len(key.plain) >= typo_min_length:
+        d = bounded_levenshtein(plain, key.plain, max_typos)
+        if d <= max_typos:
+            return MatchResult("typo", d)
+    return MatchResult("wrong", None)
@@ -0,0 +1,153 @@
+# coding: utf-8
+"""
+Micro-batching scheduler - gom các request /predict đồng thời thành 1 batch
+để chạy 1 lần forward qua VietOCR thay vì N lần (cũng dùng để gom các câu
+đời thường cần LLM chấm thành 1 prompt).
+
+Mỗi caller nhận về Future của riêng mình; worker thread gom tối đa
+`max_batch_size` ảnh hoặc chờ tối đa `max_wait_ms` kể từ ảnh đầu tiên.
+`concurrency` > 1 cho phép nhiều batch chạy song song (dùng với worker pool).
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        name: str = "ocr-batcher",
+        concurrency: int = 1,
+    ):
+        """
+        run_batch: hàm nhận list input, trả về list kết quả cùng thứ tự.
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._workers = []
+
+        # Thống kê
+        self._total_items = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._busy_time = 0.0
+        self._queue_waits = deque(maxlen=1024)
+        self._batch_sizes = deque(maxlen=1024)
+
+    # =========================
+    # Public APIs
+    # =========================
+
+    def start(self):
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.concurrency:
+                worker = threading.Thread(
+                    target=self._loop, name=f"{self.name}-{len(self._workers)}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        return self
+
+    def submit(self, item: Any) -> Future:
+        """Đưa 1 input vào hàng đợi, trả về Future chứa kết quả của riêng nó."""
+        if not self._workers:
+            self.start()
+        fut = Future()
+        self._queue.put((time.perf_counter(), item, fut))
+        return fut
+
+    def predict(self, item: Any, timeout: float = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._queue_waits)
+            sizes = list(self._batch_sizes)
+            uptime = time.perf_counter() - self._started_at
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "concurrency": self.concurrency,
+                "queue_depth": self._queue.qsize(),
+                "total_items": self._total_items,
+                "total_batches": self._total_batches,
+                "total_errors": self._total_errors,
+                "avg_batch_size": (sum(sizes) / len(sizes)) if sizes else 0.0,
+                "throughput_items_per_s": self._total_items / uptime if uptime > 0 else 0.0,
+                "busy_throughput_items_per_s": (
+                    self._total_items / self._busy_time if self._busy_time > 0 else 0.0
+                ),
+                "queue_wait_ms": {
+                    "avg": (sum(waits) / len(waits) * 1000.0) if waits else 0.0,
+                    "p50": _percentile(waits, 50) * 1000.0,
+                    "p95": _percentile(waits, 95) * 1000.0,
+                    "max": (waits[-1] * 1000.0) if waits else 0.0,
+                },
+            }
+
+    # =========================
+    # Worker
+    # =========================
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            t0 = time.perf_counter()
+            items = [item for _, item, _ in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"run_batch trả về {len(results)} kết quả cho {len(items)} input"
+                    )
+                for (_, _, fut), res in zip(batch, results):
+                    fut.set_result(res)
+                failed = False
+            except Exception as e:
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                failed = True
+
+            t1 = time.perf_counter()
+            with self._lock:
+                self._total_items += len(batch)
+                self._total_batches += 1
+                self._total_errors += len(batch) if failed else 0
+                self._busy_time += t1 - t0
+                self._batch_sizes.append(len(batch))
+                self._queue_waits.extend(t0 - enq for enq, _, _ in batch)
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
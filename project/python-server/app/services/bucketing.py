@@ -0,0 +1,65 @@
+# coding: utf-8
+"""
+Bucketing theo chiều rộng ảnh (đã resize về chiều cao model) để batch OCR.
+
+Ảnh chữ viết tay có tỉ lệ khung hình rất khác nhau (0.48 -> 3.2 theo
+lab3/eda2/summary.json). Gom theo đúng chiều rộng thì batch rất nhỏ, còn pad
+tất cả về ảnh rộng nhất thì phần lớn compute của CNN là nền trắng.
+Ở đây ảnh được xếp theo chiều rộng, chia vào các bucket rộng `bucket_width` px,
+rồi chỉ pad (nền trắng) tới ảnh rộng nhất trong cùng batch.
+
+Pad làm thay đổi output của CNN ở mép phải ảnh (receptive field nhìn thấy nền pad),
+nên kết quả có thể khác chạy từng ảnh dù encoder / cross-attention đã mask phần pad
+(fast_decode.translate_incremental(widths=...)). bucket_width <= 0 (mặc định của
+OCR_BUCKET_WIDTH) chỉ gom các ảnh cùng chiều rộng: không pad, output giống hệt.
+
+padding efficiency = pixel thật / pixel sau khi pad (1.0 = không lãng phí).
+"""
+import math
+from typing import List, Sequence, Tuple
+
+
+def plan_buckets(widths: Sequence[int], bucket_width: int = 32, max_batch_size: int = 16) -> List[List[int]]:
+    """
+    Trả về danh sách batch, mỗi batch là list index vào `widths`.
+    Ảnh trong cùng batch thuộc cùng 1 bucket chiều rộng (bucket_width <= 0: cùng chiều rộng).
+    """
+    bucket_width = int(bucket_width)
+    max_batch_size = max(1, int(max_batch_size))
+
+    buckets = {}
+    for i in sorted(range(len(widths)), key=lambda k: widths[k]):
+        key = widths[i] if bucket_width <= 0 else math.ceil(widths[i] / bucket_width)
+        buckets.setdefault(key, []).append(i)
+
+    batches = []
+    for key in sorted(buckets):
+        idx = buckets[key]
+        for start in range(0, len(idx), max_batch_size):
+            batches.append(idx[start:start + max_batch_size])
+    return batches
+
+
+def padding_efficiency(widths: Sequence[int]) -> float:
+    """Pixel thật / pixel sau khi pad về ảnh rộng nhất (cùng chiều cao)."""
+    if not widths:
+        return 1.0
+    return sum(widths) / float(len(widths) * max(widths))
+
+
+def pad_batch(tensors, pad_value: float = 1.0) -> Tuple["object", float]:
+    """
+    tensors: list (1, C, H, W_i) -> (N, C, H, max W), pad bên phải bằng nền trắng.
+    Trả về (batch, padding_efficiency). Truyền [W_i] cho translate_incremental(widths=...)
+    để mask phần pad.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    widths = [t.shape[-1] for t in tensors]
+    max_w = max(widths)
+    padded = [
+        t if t.shape[-1] == max_w else F.pad(t, (0, max_w - t.shape[-1]), value=pad_value)
+        for t in tensors
+    ]
+    return torch.cat(padded, 0), padding_efficiency(widths)
@@ -0,0 +1,132 @@
+# coding: utf-8
+"""
+Bulkhead - giới hạn số request đồng thời theo từng loại công việc.
+
+Một request /practice/check-batch có thể chờ Gemini tới 30s; nếu không giới
+hạn, các request LLM chậm sẽ chiếm hết thread của server và /predict phải
+xếp hàng phía sau. Mỗi loại ("ocr", "llm") có số slot riêng; khi hết slot
+request chờ tối đa `max_wait_s` rồi trả 503 + Retry-After thay vì giữ thread.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import jsonify, make_response
+
+
+class BulkheadFull(Exception):
+    def __init__(self, name: str, retry_after_s: float):
+        super().__init__(f"{name} bulkhead is full")
+        self.name = name
+        self.retry_after_s = retry_after_s
+
+
+class Bulkhead:
+    def __init__(self, name: str, max_concurrent: int, max_wait_s: float = 0.0):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self._sem = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+
+    def acquire(self, timeout: float = None):
+        """Chờ tối đa `timeout` (mặc định max_wait_s) để lấy 1 slot; raise BulkheadFull nếu hết slot."""
+        timeout = self.max_wait_s if timeout is None else max(0.0, float(timeout))
+        t0 = time.perf_counter()
+        if not self._sem.acquire(timeout=timeout):
+            with self._lock:
+                self._rejected += 1
+            raise BulkheadFull(self.name, max(1.0, self.max_wait_s))
+        with self._lock:
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+            self._admitted += 1
+            self._wait_total += time.perf_counter() - t0
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._sem.release()
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_wait_s": self.max_wait_s,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_total * 1000.0 / self._admitted if self._admitted else 0.0,
+            }
+
+
+BULKHEADS = {
+    "ocr": Bulkhead(
+        "ocr",
+        int(os.environ.get("OCR_MAX_CONCURRENT", "64")),
+        float(os.environ.get("OCR_MAX_WAIT_S", "5")),
+    ),
+    "llm": Bulkhead(
+        "llm",
+        int(os.environ.get("LLM_MAX_CONCURRENT", "8")),
+        float(os.environ.get("LLM_MAX_WAIT_S", "0.5")),
+    ),
+}
+
+
+def busy_response(e: BulkheadFull):
+    response = jsonify({
+        "success": False,
+        "error": f"Server đang bận ({e.name}), vui lòng thử lại sau.",
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(int(round(e.retry_after_s)))
+    return response
+
+
+def bulkhead(name: str):
+    """
+    Decorator cho Flask view: chạy view trong 1 slot của bulkhead `name`,
+    trả 503 nếu hết slot. Với response streaming (NDJSON / SSE), slot chỉ được trả
+    khi stream kết thúc.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            b = BULKHEADS[name]
+            try:
+                b.acquire()
+            except BulkheadFull as e:
+                return busy_response(e)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                b.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(b.release)
+            else:
+                b.release()
+            return response
+        return wrapper
+    return decorator
+
+
+def bulkhead_stats() -> dict:
+    return {name: b.stats() for name, b in BULKHEADS.items()}
@@ -0,0 +1,236 @@
+# coding: utf-8
+"""
+Greedy decoding có KV-cache cho VietOCR (seq_modeling = transformer).
+
+vietocr.tool.translate.translate chạy lại toàn bộ decoder trên cả prefix ở mỗi
+bước (O(T^2)). Ở đây mỗi bước chỉ tính cho token mới nhất:
+- key/value của self-attention được cache theo từng layer
+- key/value của cross-attention trên encoder memory được tính 1 lần
+- sequence nào sinh EOS thì bị loại khỏi batch ngay (các sequence khác chạy tiếp)
+
+Kết quả (token ids) giống translate() cho tới EOS; phần sau EOS được điền pad.
+
+Batch đã pad (bucketing.pad_batch): truyền widths (chiều rộng thật của từng ảnh) để
+các vị trí encoder thuộc phần pad bị mask trong self-attention của encoder và trong
+cross-attention của decoder (key padding mask).
+"""
+import math
+import time
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+def _split_heads(x, num_heads: int):
+    # (N, T, E) -> (N, H, T, E/H)
+    n, t, e = x.shape
+    return x.view(n, t, num_heads, e // num_heads).transpose(1, 2)
+
+
+def _merge_heads(x):
+    # (N, H, T, D) -> (N, T, H*D)
+    n, h, t, d = x.shape
+    return x.transpose(1, 2).reshape(n, t, h * d)
+
+
+def _in_proj(attn, x, start: int, end: int):
+    import torch.nn.functional as F
+
+    e = attn.embed_dim
+    w = attn.in_proj_weight[start * e:end * e]
+    b = attn.in_proj_bias[start * e:end * e] if attn.in_proj_bias is not None else None
+    return F.linear(x, w, b)
+
+
+def _attend(attn, q, k, v, mask=None):
+    import torch.nn.functional as F
+
+    out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+    return F.linear(_merge_heads(out), attn.out_proj.weight, attn.out_proj.bias)
+
+
+class _LayerCache:
+    __slots__ = ("self_k", "self_v", "mem_k", "mem_v")
+
+    def __init__(self, mem_k, mem_v):
+        self.self_k = None
+        self.self_v = None
+        self.mem_k = mem_k
+        self.mem_v = mem_v
+
+    def select(self, idx):
+        self.self_k = self.self_k.index_select(0, idx)
+        self.self_v = self.self_v.index_select(0, idx)
+        self.mem_k = self.mem_k.index_select(0, idx)
+        self.mem_v = self.mem_v.index_select(0, idx)
+
+
+def _width_stride(cnn) -> int:
+    """Hệ số giảm chiều rộng của backbone CNN (tích stride theo chiều ngang của conv / pool)."""
+    import torch.nn as nn
+
+    stride = 1
+    for m in cnn.modules():
+        if isinstance(m, (nn.Conv2d, nn.MaxPool2d, nn.AvgPool2d)):
+            s = m.stride
+            stride *= int(s[-1] if isinstance(s, (tuple, list)) else s)
+    return stride
+
+
+def _key_padding_mask(src, img_width: int, widths: Sequence[int], stride: int):
+    """
+    src: (S, N, E) output của CNN, S = W' * H' (thứ tự w rồi h, như backbone của vietocr).
+    Trả về bool (N, S), True = vị trí thuộc phần pad; None nếu không suy ra được layout.
+    """
+    import torch
+
+    cols = img_width // stride
+    if cols <= 0 or src.shape[0] % cols:
+        return None
+    rows = src.shape[0] // cols
+    col_of = torch.arange(src.shape[0], device=src.device) // rows
+    valid = torch.tensor([max(1, w // stride) for w in widths], device=src.device)
+    return col_of.unsqueeze(0) >= valid.unsqueeze(1)
+
+
+def _layer_step(layer, x, cache: _LayerCache, mem_mask=None):
+    """1 bước của nn.TransformerDecoderLayer cho token mới nhất. x: (N, 1, E)."""
+    import torch
+    import torch.nn.functional as F
+
+    sa, ca = layer.self_attn, layer.multihead_attn
+    heads = sa.num_heads
+    activation = getattr(layer, "activation", F.relu)
+
+    def sa_block(h):
+        qkv = _in_proj(sa, h, 0, 3)
+        q, k, v = (_split_heads(t, heads) for t in qkv.chunk(3, dim=-1))
+        if cache.self_k is None:
+            cache.self_k, cache.self_v = k, v
+        else:
+            cache.self_k = torch.cat([cache.self_k, k], dim=2)
+            cache.self_v = torch.cat([cache.self_v, v], dim=2)
+        return _attend(sa, q, cache.self_k, cache.self_v)
+
+    def ca_block(h):
+        q = _split_heads(_in_proj(ca, h, 0, 1), heads)
+        return _attend(ca, q, cache.mem_k, cache.mem_v, mem_mask)
+
+    def ff_block(h):
+        return layer.linear2(activation(layer.linear1(h)))
+
+    if layer.norm_first:
+        x = x + sa_block(layer.norm1(x))
+        x = x + ca_block(layer.norm2(x))
+        x = x + ff_block(layer.norm3(x))
+    else:
+        x = layer.norm1(x + sa_block(x))
+        x = layer.norm2(x + ca_block(x))
+        x = layer.norm3(x + ff_block(x))
+    return x
+
+
+def translate_incremental(
+    img,
+    model,
+    max_seq_length: int = 128,
+    sos_token: int = 1,
+    eos_token: int = 2,
+    pad_token: int = 0,
+    stats: Optional[dict] = None,
+    widths: Optional[Sequence[int]] = None,
+):
+    """
+    img: (N, C, H, W). Trả về (translated_sentence (N, T), char_probs (N,))
+    cùng định dạng với vietocr.tool.translate.translate.
+
+    widths: chiều rộng thật (px) của từng ảnh nếu batch đã được pad bên phải.
+
+    stats (nếu truyền vào) được cộng thêm: steps, tokens, decode_s.
+    """
+    import torch
+    from torch.nn.functional import softmax
+
+    model.eval()
+    lang = model.transformer
+    decoder = lang.transformer.decoder
+    scale = math.sqrt(lang.d_model)
+
+    with torch.no_grad():
+        src = model.cnn(img)
+        pad_mask = None
+        if widths is not None and min(widths) < img.shape[-1]:
+            pad_mask = _key_padding_mask(src, img.shape[-1], widths, _width_stride(model.cnn))
+        if pad_mask is None:
+            memory = lang.forward_encoder(src)
+        else:
+            memory = lang.transformer.encoder(
+                lang.pos_enc(src * scale), src_key_padding_mask=pad_mask
+            )
+        memory = memory.transpose(0, 1)  # (N, S, E)
+        # SDPA: True = được attend; (N, 1 head, 1 query, S)
+        mem_mask = None if pad_mask is None else (~pad_mask)[:, None, None, :]
+
+        n = memory.shape[0]
+        caches = []
+        for layer in decoder.layers:
+            ca = layer.multihead_attn
+            kv = _in_proj(ca, memory, 1, 3)
+            k, v = (_split_heads(t, ca.num_heads) for t in kv.chunk(2, dim=-1))
+            caches.append(_LayerCache(k, v))
+
+        tokens = np.full((n, max_seq_length + 2), pad_token, dtype=np.int64)
+        probs = np.zeros((n, max_seq_length + 2), dtype=np.float64)
+        tokens[:, 0] = sos_token
+        probs[:, 0] = 1.0
+
+        active = torch.arange(n)
+        last = torch.full((n,), sos_token, dtype=torch.long, device=memory.device)
+        steps = 0
+        t0 = time.perf_counter()
+        produced = 0
+
+        # Giống translate(): tối đa max_seq_length + 1 token mới
+        for pos in range(max_seq_length + 1):
+            x = lang.embed_tgt(last).unsqueeze(1) * scale + lang.pos_enc.pe[pos].unsqueeze(0)
+            for layer, cache in zip(decoder.layers, caches):
+                x = _layer_step(layer, x, cache, mem_mask)
+            if decoder.norm is not None:
+                x = decoder.norm(x)
+
+            output = softmax(lang.fc(x[:, -1]), dim=-1).to("cpu")
+            values, indices = torch.topk(output, 1)
+            values, indices = values[:, 0], indices[:, 0]
+            idx_np = active.numpy()
+            tokens[idx_np, pos + 1] = indices.numpy()
+            probs[idx_np, pos + 1] = values.numpy()
+            steps += 1
+            produced += len(idx_np)
+
+            keep = indices != eos_token
+            if not bool(keep.any()):
+                break
+            if not bool(keep.all()):
+                keep_idx = keep.nonzero(as_tuple=True)[0]
+                active = active[keep_idx]
+                keep_dev = keep_idx.to(memory.device)
+                for cache in caches:
+                    cache.select(keep_dev)
+                if mem_mask is not None:
+                    mem_mask = mem_mask.index_select(0, keep_dev)
+                indices = indices[keep_idx]
+            last = indices.to(memory.device)
+
+        elapsed = time.perf_counter() - t0
+
+    tokens = tokens[:, : steps + 1]
+    probs = probs[:, : steps + 1]
+    char_probs = np.multiply(probs, tokens > 3)
+    char_probs = np.sum(char_probs, axis=-1) / np.maximum((char_probs > 0).sum(-1), 1)
+
+    if stats is not None:
+        stats["steps"] = stats.get("steps", 0) + steps
+        stats["tokens"] = stats.get("tokens", 0) + produced
+        stats["decode_s"] = stats.get("decode_s", 0.0) + elapsed
+
+    return tokens, char_probs
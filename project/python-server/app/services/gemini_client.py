@@ -0,0 +1,217 @@
+# coding: utf-8
+"""
+HTTP client dùng chung cho Gemini REST.
+
+- 1 requests.Session với connection pool keep-alive (không bắt tay TCP/TLS lại mỗi lần gọi)
+- retry khi 429 / 5xx / lỗi kết nối: exponential backoff có jitter, ưu tiên header
+  Retry-After, nhưng không bao giờ vượt quá tổng thời gian `budget_s` của 1 lần gọi
+- đo thời gian từng lần gọi: connect (0 nếu dùng lại connection), TTFB, total
+
+Endpoint cấu hình được (GEMINI_ENDPOINT) nên có thể chạy thử với 1 HTTP server giả lập
+ở local (xem benchmarks/).
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# thời gian connect của request hiện tại (theo thread) - được ghi bởi connection bên dưới
+_local = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        super().connect()
+        _local.connect_s = getattr(_local, "connect_s", 0.0) + time.perf_counter() - t0
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        super().connect()
+        _local.connect_s = getattr(_local, "connect_s", 0.0) + time.perf_counter() - t0
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _retry_after_s(res) -> Optional[float]:
+    value = res.headers.get("Retry-After") if res is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GeminiHTTPClient:
+    def __init__(
+        self,
+        pool_size: int = 16,
+        max_retries: int = 4,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 8.0,
+        budget_s: float = 20.0,
+        timeout_s: float = 30.0,
+        on_throttled: Optional[Callable[[Optional[float]], None]] = None,
+    ):
+        """on_throttled(retry_after_s): được gọi mỗi lần Gemini trả 429 (vd. báo cho rate limiter)."""
+        self.pool_size = max(1, int(pool_size))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = float(backoff_base_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self.budget_s = float(budget_s)
+        self.timeout_s = float(timeout_s)
+        self.on_throttled = on_throttled
+
+        self.session = requests.Session()
+        adapter = _TimedAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._attempts = 0
+        self._retries = 0
+        self._failures = 0
+        self._new_connections = 0
+        self._connect_s = 0.0
+        self._ttfb_s = 0.0
+        self._total_s = 0.0
+        self._last = None
+
+    def _backoff_s(self, attempt: int, res) -> float:
+        """Full jitter: uniform(0, min(max, base * 2^attempt)); Retry-After nếu server gửi."""
+        retry_after = _retry_after_s(res)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.backoff_base_s)
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+
+    def post_json(
+        self,
+        url: str,
+        payload: dict,
+        headers: Optional[dict] = None,
+        stream: bool = False,
+        before_retry: Optional[Callable[[float], bool]] = None,
+    ) -> Tuple[requests.Response, dict]:
+        """
+        POST có retry trong giới hạn `budget_s`.
+        Trả về (response cuối cùng, timings). Raise requests.RequestException nếu
+        lần thử cuối lỗi kết nối / timeout.
+
+        stream=True: chỉ retry trước khi nhận được response thành công; body của response
+        2xx chưa được đọc (caller đọc dần qua iter_lines và phải đóng response).
+
+        before_retry(remaining_s): gọi trước mỗi lần thử lại (vd. lấy lại quota từ rate
+        limiter, chờ tối đa phần budget còn lại); trả về False -> dừng retry.
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget_s
+        timings = {"attempts": 0, "connect_ms": 0.0, "ttfb_ms": 0.0, "total_ms": 0.0, "backoff_ms": 0.0}
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.perf_counter()
+            _local.connect_s = 0.0
+            res, error = None, None
+            t0 = time.perf_counter()
+            try:
+                res = self.session.post(
+                    url, headers=headers, json=payload,
+                    timeout=max(0.1, min(self.timeout_s, remaining)),
+                    stream=stream,
+                )
+                ttfb = res.elapsed.total_seconds()
+                if not stream or res.status_code >= 400:
+                    _ = res.content  # đọc hết body trước khi trả connection về pool
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                ttfb = 0.0
+            connect = _local.connect_s
+
+            timings["attempts"] += 1
+            timings["connect_ms"] += connect * 1000.0
+            timings["ttfb_ms"] = ttfb * 1000.0
+            with self._lock:
+                self._attempts += 1
+                if connect > 0:
+                    self._new_connections += 1
+                self._connect_s += connect
+                self._ttfb_s += ttfb
+
+            if res is not None and res.status_code == 429 and self.on_throttled is not None:
+                self.on_throttled(_retry_after_s(res))
+
+            retryable = error is not None or res.status_code in RETRY_STATUS
+            if not retryable or attempt >= self.max_retries:
+                break
+            wait = self._backoff_s(attempt, res)
+            if time.perf_counter() + wait >= deadline:
+                break
+            print(f"🔁 Gemini retry {attempt + 1}/{self.max_retries} sau {wait:.2f}s "
+                  f"({error or res.status_code})")
+            time.sleep(wait)
+            timings["backoff_ms"] += wait * 1000.0
+            if before_retry is not None and not before_retry(deadline - time.perf_counter()):
+                break
+            attempt += 1
+            with self._lock:
+                self._retries += 1
+
+        timings["total_ms"] = (time.perf_counter() - start) * 1000.0
+        timings["status"] = res.status_code if res is not None else None
+        with self._lock:
+            self._calls += 1
+            self._total_s += timings["total_ms"] / 1000.0
+            if error is not None or res.status_code >= 400:
+                self._failures += 1
+            self._last = timings
+
+        if error is not None:
+            raise error
+        return res, timings
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "calls": self._calls,
+                "attempts": self._attempts,
+                "retries": self._retries,
+                "failures": self._failures,
+                "new_connections": self._new_connections,
+                "connection_reuse_rate": 1.0 - self._new_connections / self._attempts if self._attempts else 0.0,
+                "avg_connect_ms": self._connect_s * 1000.0 / self._new_connections if self._new_connections else 0.0,
+                "avg_ttfb_ms": self._ttfb_s * 1000.0 / self._attempts if self._attempts else 0.0,
+                "avg_total_ms": self._total_s * 1000.0 / self._calls if self._calls else 0.0,
+                "last": self._last,
+            }
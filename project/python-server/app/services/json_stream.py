@@ -0,0 +1,78 @@
+# coding: utf-8
+"""
+Parser JSON tăng dần cho output dạng array của LLM: [{...}, {...}, ...]
+
+feed() nhận từng đoạn text (streaming) và trả về các object {...} cấp 1 đã đóng
+đủ ngoặc, nên có thể dùng kết quả trước khi LLM trả xong. Output bị cắt giữa chừng
+vẫn giữ được mọi object đã hoàn chỉnh. Mọi thứ trước dấu "[" đầu tiên (```json,
+lời dẫn...) bị bỏ qua.
+"""
+import json
+from typing import List
+
+
+class IncrementalJSONArrayParser:
+    def __init__(self):
+        self._buf = []          # ký tự của object đang đọc dở
+        self._started = False   # đã gặp "[" mở array
+        self._finished = False  # đã gặp "]" đóng array
+        self._depth = 0         # độ sâu tính từ trong array (0 = giữa các phần tử)
+        self._in_string = False
+        self._escape = False
+        self.items = 0
+        self.skipped = 0
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, text: str) -> List[dict]:
+        out = []
+        for ch in text:
+            if self._finished:
+                break
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = ["{"]
+                elif ch == "]":
+                    self._finished = True
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads("".join(self._buf))
+                    except json.JSONDecodeError:
+                        obj = None
+                    self._buf = []
+                    if isinstance(obj, dict):
+                        self.items += 1
+                        out.append(obj)
+                    else:
+                        self.skipped += 1
+        return out
@@ -0,0 +1,169 @@
+# coding: utf-8
+"""
+LLM response cache - cache câu trả lời của Gemini cho các lời gọi deterministic
+(do_sample=False, ví dụ chấm đáp án đời thường).
+
+- key = hash(model, prompt, generationConfig)
+- tier 1: LRU trong RAM
+- tier 2: SQLite trên đĩa (TTL + giới hạn số entry), giữ cache qua các lần restart
+- không cache câu trả lời fallback (lỗi / hết quota) - việc đó do vinallama_service quyết định
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def llm_cache_key(model: str, prompt: str, generation_config: dict) -> str:
+    raw = json.dumps([model, prompt, generation_config], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: Optional[str],
+        max_memory_entries: int = 1024,
+        max_disk_entries: int = 50000,
+        ttl_s: float = 7 * 24 * 3600.0,
+    ):
+        self.path = path or None
+        self.max_memory_entries = max(0, int(max_memory_entries))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+        self.ttl_s = float(ttl_s)
+
+        self._lock = threading.Lock()
+        # key -> (expires_at (wall clock), text, latency_ms của lần gọi gốc)
+        self._memory: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+        self._db = None
+        self._puts_since_trim = 0
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._saved_ms = 0.0
+
+        if self.path and self.max_disk_entries > 0:
+            try:
+                self._open_db()
+            except sqlite3.Error as e:
+                print(f"⚠️ Không mở được LLM cache SQLite ({self.path}): {e}")
+                self._db = None
+
+    def _open_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " latency_ms REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        self._db = db
+
+    def _remember(self, key: str, entry: Tuple[float, str, float]):
+        # gọi khi đang giữ self._lock
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._memory.move_to_end(key)
+                    self._memory_hits += 1
+                    self._saved_ms += entry[2]
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, latency_ms, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None and row[2] >= now:
+                        self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._remember(key, (row[2], row[0], row[1]))
+                        self._disk_hits += 1
+                        self._saved_ms += row[1]
+                        return row[0]
+                except sqlite3.Error as e:
+                    print(f"⚠️ LLM cache SQLite lỗi khi đọc: {e}")
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, response: str, latency_ms: float):
+        now = time.time()
+        entry = (now + self.ttl_s, response, float(latency_ms))
+        with self._lock:
+            self._remember(key, entry)
+            self._stores += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, latency_ms, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, response, entry[2], entry[0], now),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 100:
+                    self._trim_disk(now)
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache SQLite lỗi khi ghi: {e}")
+
+    def _trim_disk(self, now: float):
+        # gọi khi đang giữ self._lock: xoá entry hết hạn rồi cắt bớt entry ít dùng nhất
+        self._puts_since_trim = 0
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+            self._evictions += count - self.max_disk_entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            disk_entries = None
+            if self._db is not None:
+                try:
+                    (disk_entries,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+                except sqlite3.Error:
+                    pass
+            return {
+                "path": self.path if self._db is not None else None,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "saved_latency_ms": self._saved_ms,
+            }
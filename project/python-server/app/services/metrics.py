@@ -0,0 +1,182 @@
+# coding: utf-8
+"""
+Metrics - histogram độ trễ theo từng stage + theo endpoint.
+
+- stage("decode") / observe("llm_ttfb", s): ghi vào histogram (bucket cố định, bisect
+  + 1 lock -> ~1-2 µs mỗi lần) và, nếu đang trong 1 request Flask, cộng dồn vào
+  header Server-Timing của response đó
+- stage chạy ở thread nền (micro-batcher, grading batcher) chỉ vào histogram
+- GET /metrics xuất định dạng text của Prometheus (app_stage_duration_seconds,
+  app_http_request_duration_seconds, app_http_requests_total)
+
+Stage hiện có: decode, preprocess, inference, ocr_forward, json_encode, json_parse,
+llm_queue, llm_connect, llm_ttfb, llm_total, llm_grading.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") not in ("0", "false", "")
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "1") not in ("0", "false", "")
+
+# giây; từ 0.5 ms (decode ảnh nhỏ) tới 30 s (Gemini chậm / retry)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # ô cuối = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        # gọi khi đang giữ lock của registry
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def snapshot(self) -> Tuple[list, float, int]:
+        return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._requests: Dict[Tuple[str, str], Histogram] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+
+    def observe_stage(self, name: str, seconds: float):
+        with self._lock:
+            hist = self._stages.get(name)
+            if hist is None:
+                hist = self._stages[name] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float):
+        with self._lock:
+            hist = self._requests.get((endpoint, method))
+            if hist is None:
+                hist = self._requests[(endpoint, method)] = Histogram(self.buckets)
+            hist.observe(seconds)
+            key = (endpoint, method, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def _histogram_lines(self, name: str, series: Dict[str, Histogram]) -> list:
+        lines = []
+        for labels, hist in sorted(series.items()):
+            counts, total, count = hist.snapshot()
+            cumulative = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le_text = "+Inf" if le == float("inf") else repr(le)
+                lines.append(f'{name}_bucket{{{labels},le="{le_text}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stages = {f'stage="{_escape(k)}"': _copy(hist) for k, hist in self._stages.items()}
+            requests_ = {
+                f'endpoint="{_escape(e)}",method="{m}"': _copy(hist) for (e, m), hist in self._requests.items()
+            }
+            responses = dict(self._responses)
+
+        lines = [
+            "# HELP app_stage_duration_seconds Time spent in each processing stage.",
+            "# TYPE app_stage_duration_seconds histogram",
+            *self._histogram_lines("app_stage_duration_seconds", stages),
+            "# HELP app_http_request_duration_seconds Request duration until the response is closed.",
+            "# TYPE app_http_request_duration_seconds histogram",
+            *self._histogram_lines("app_http_request_duration_seconds", requests_),
+            "# HELP app_http_requests_total Responses by endpoint, method and status code.",
+            "# TYPE app_http_requests_total counter",
+        ]
+        for (e, m, status), c in sorted(responses.items()):
+            lines.append(f'app_http_requests_total{{endpoint="{_escape(e)}",method="{m}",status="{status}"}} {c}')
+        return "\n".join(lines) + "\n"
+
+
+def _copy(hist: Histogram) -> Histogram:
+    clone = Histogram(hist.buckets)
+    clone.counts, clone.sum, clone.count = hist.snapshot()
+    return clone
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+def observe(name: str, seconds: float):
+    """Ghi 1 lần đo của stage `name` (histogram + Server-Timing của request hiện tại)."""
+    if not METRICS_ENABLED:
+        return
+    registry.observe_stage(name, seconds)
+    if SERVER_TIMING_ENABLED and has_request_context():
+        timings = g.setdefault("_server_timing", {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0)
+
+
+def server_timing_header(timings: Dict[str, float], total_s: float) -> str:
+    parts = [f"{name};dur={seconds * 1000.0:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total_s * 1000.0:.2f}")
+    return ", ".join(parts)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify() như mặc định, đo thêm stage json_encode."""
+
+    def dumps(self, obj, **kwargs):
+        with stage("json_encode"):
+            return super().dumps(obj, **kwargs)
+
+
+def init_metrics(app):
+    """Gắn đo thời gian request + header Server-Timing cho mọi blueprint."""
+    if not METRICS_ENABLED:
+        return
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _start_timer():
+        g._request_t0 = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        t0 = g.get("_request_t0")
+        if t0 is None:
+            return response
+        if SERVER_TIMING_ENABLED:
+            # response stream: "total" là thời gian tới lúc gửi header
+            response.headers["Server-Timing"] = server_timing_header(
+                g.get("_server_timing", {}), time.perf_counter() - t0
+            )
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        method, status = request.method, response.status_code
+        response.call_on_close(
+            lambda: registry.observe_request(endpoint, method, status, time.perf_counter() - t0)
+        )
+        return response
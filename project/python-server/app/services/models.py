@@ -1,12 +1,49 @@
-import torch
-from paddleocr import PaddleOCR
-from vietocr.tool.predictor import Predictor
-from vietocr.tool.config import Cfg
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+# coding: utf-8
+"""
+Model registry cho VietOCR.
+
+Các thư viện nặng (torch, vietocr) chỉ được import khi thực sự dựng model,
+và việc dựng model chạy trong background thread (start_warmup) để
+create_app() trả về ngay, các blueprint /llm và /practice dùng được liền.
+
+OCR_WORKERS > 1 bật chế độ worker pool: weights load 1 lần rồi fork N process
+inference (xem worker_pool.py).
+
+OCR_ENGINE chọn engine inference: eager | torchscript | int8 | torchscript_int8
+(xem ocr_engines.py).
+"""
+import os
+import threading
+import time
+
+from PIL import Image
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "0"))
+OCR_THREADS_PER_WORKER = int(os.environ.get("OCR_THREADS_PER_WORKER", "0")) or None
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "eager")
+# Worker pool: timeout mỗi batch, số lần fork lại worker chết trước khi báo unhealthy
+OCR_TASK_TIMEOUT_S = float(os.environ.get("OCR_TASK_TIMEOUT_S", "60"))
+OCR_MAX_RESPAWNS = int(os.environ.get("OCR_MAX_RESPAWNS", "3"))
+OCR_POOL_READY_TIMEOUT_S = float(os.environ.get("OCR_POOL_READY_TIMEOUT_S", "120"))
+
+_lock = threading.Lock()
+_loaded = threading.Event()
+_ready = threading.Event()
+_warmup_thread = None
+_model = None
+_pool = None
+_error = None
+_timings = {}
 
 
 # Device selection
-def init_model(use_weighted: str = None):
+def init_model(use_weighted: str = None, engine: str = None):
+    import torch
+    from vietocr.tool.predictor import Predictor
+    from vietocr.tool.config import Cfg
+
+    from .ocr_engines import apply_engine
+
     device = "cuda" if torch.cuda.is_available() else "cpu"
 
     vietocr_cfg = Cfg.load_config_from_name("vgg_transformer")
@@ -18,4 +55,98 @@ def init_model(use_weighted: str = None):
         vietocr_cfg["weights"] = use_weighted
 
     vietocr_predictor = Predictor(vietocr_cfg)
-    return vietocr_predictor
+    return apply_engine(vietocr_predictor, engine or OCR_ENGINE)
+
+
+# =========================
+# Background warm-up
+# =========================
+
+def _warmup(use_weighted: str = None):
+    global _model, _pool, _error
+    try:
+        t0 = time.perf_counter()
+        model = init_model(use_weighted)
+        t1 = time.perf_counter()
+        _timings["load_s"] = t1 - t0
+        print(f"✅ VietOCR loaded in {t1 - t0:.2f}s", flush=True)
+
+        # Fork pool trước khi process cha chạy inference lần nào
+        if OCR_WORKERS > 1:
+            from .worker_pool import OCRWorkerPool
+
+            _pool = OCRWorkerPool(
+                model, OCR_WORKERS, OCR_THREADS_PER_WORKER,
+                task_timeout_s=OCR_TASK_TIMEOUT_S, max_respawns=OCR_MAX_RESPAWNS,
+            )
+            if not _pool.wait_ready(OCR_POOL_READY_TIMEOUT_S):
+                raise RuntimeError(f"OCR worker pool chưa sẵn sàng sau {OCR_POOL_READY_TIMEOUT_S:g}s: "
+                                   f"{_pool.stats()['error'] or 'timeout'}")
+            print(f"✅ OCR worker pool: {_pool.num_workers} workers x "
+                  f"{_pool.threads_per_worker} threads", flush=True)
+
+        _model = model
+        _loaded.set()
+
+        # 1 lần inference giả để khởi tạo kernel / allocator trước request thật
+        # (worker pool: mỗi worker đã tự warm-up trước khi báo ready)
+        if _pool is None:
+            model.predict(Image.new("RGB", (128, 32), (255, 255, 255)))
+        _timings["warmup_s"] = time.perf_counter() - t1
+        _ready.set()
+        print(f"✅ VietOCR warm-up done in {_timings['warmup_s']:.2f}s", flush=True)
+    except Exception as e:
+        _error = str(e)
+        print(f"❌ Lỗi khởi tạo VietOCR: {e}", flush=True)
+
+
+def start_warmup(use_weighted: str = None) -> threading.Thread:
+    """
+    Dựng model trong background thread (gọi nhiều lần chỉ chạy 1 lần).
+    """
+    global _warmup_thread, _error
+    with _lock:
+        if _warmup_thread is None or (_error is not None and not _warmup_thread.is_alive()):
+            _error = None
+            _warmup_thread = threading.Thread(
+                target=_warmup, args=(use_weighted,), name="vietocr-warmup", daemon=True
+            )
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def get_model(timeout: float = None):
+    """
+    Trả về Predictor đã load; chờ tối đa `timeout` giây nếu đang warm-up.
+    """
+    if not _loaded.is_set():
+        if _warmup_thread is None:
+            start_warmup()
+        _loaded.wait(timeout)
+    if _model is None:
+        raise RuntimeError(_error or "VietOCR model chưa sẵn sàng")
+    return _model
+
+
+def is_loaded() -> bool:
+    return _loaded.is_set()
+
+
+def is_ready() -> bool:
+    # worker pool hết lượt fork lại worker chết -> không nhận traffic nữa
+    return _ready.is_set() and (_pool is None or _pool.healthy())
+
+
+def model_status() -> dict:
+    return {
+        "engine": OCR_ENGINE,
+        "loaded": _loaded.is_set(),
+        "ready": is_ready(),
+        "error": _error or (_pool.stats()["error"] if _pool is not None else None),
+        **{k: round(v, 3) for k, v in _timings.items()},
+    }
+
+
+def get_worker_pool():
+    """OCRWorkerPool nếu đang chạy ở chế độ multi-process, ngược lại None."""
+    return _pool
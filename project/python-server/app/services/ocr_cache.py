@@ -0,0 +1,109 @@
+# coding: utf-8
+"""
+OCR result cache - cache kết quả theo hash nội dung ảnh (sau preprocess).
+
+- LRU có giới hạn số entry + TTL
+- single-flight: các request giống hệt nhau đến cùng lúc chỉ chạy 1 lần inference
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Tuple
+
+from PIL import Image
+
+
+def image_cache_key(pil_img: Image.Image) -> str:
+    """
+    Hash nội dung ảnh đã qua preprocess (nền trắng, crop theo mực, resize về
+    kích thước model), nên 2 canvas chỉ khác lề trắng sẽ cho cùng key.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{pil_img.mode}:{pil_img.size[0]}x{pil_img.size[1]}:".encode())
+    h.update(pil_img.tobytes())
+    return h.hexdigest()
+
+
+class OCRResultCache:
+    def __init__(self, max_entries: int = 2048, ttl_s: float = 3600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_s = float(ttl_s)
+
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expired = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """
+        Trả về (value, status) với status là "hit", "miss" hoặc "coalesced".
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value, "hit"
+                del self._data[key]
+                self._expired += 1
+
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self._coalesced += 1
+                owner = False
+            else:
+                fut = Future()
+                self._inflight[key] = fut
+                self._misses += 1
+                owner = True
+
+        if not owner:
+            return fut.result(), "coalesced"
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self.max_entries > 0:
+                self._data[key] = (time.monotonic() + self.ttl_s, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+                    self._evictions += 1
+        fut.set_result(value)
+        return value, "miss"
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "inflight": len(self._inflight),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "hit_rate": (self._hits + self._coalesced) / lookups if lookups else 0.0,
+            }
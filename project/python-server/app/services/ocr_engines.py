@@ -0,0 +1,67 @@
+# coding: utf-8
+"""
+Inference engine cho VietOCR vgg_transformer trên CPU.
+
+- "eager":       model PyTorch float32 như cũ (mặc định)
+- "torchscript": CNN được trace + freeze, encoder/decoder được script
+- "int8":        dynamic INT8 quantization cho các lớp nn.Linear
+                 (FFN của encoder/decoder + lớp fc sinh ký tự)
+- "torchscript_int8": CNN trace + freeze, encoder/decoder INT8 (eager, vì
+                 TorchScript không script được các layer đã quantize)
+
+Các projection bên trong nn.MultiheadAttention không phải nn.Linear nên
+quantize_dynamic của PyTorch giữ chúng ở float32.
+"""
+from typing import Tuple
+
+ENGINES = ("eager", "torchscript", "int8", "torchscript_int8")
+
+
+def _quantize_int8(model):
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _export_torchscript(model, example_size: Tuple[int, int] = (32, 128), script_transformer: bool = True):
+    import torch
+
+    h, w = example_size
+    example = torch.rand(1, 3, h, w, device=next(model.parameters()).device)
+    with torch.no_grad():
+        traced_cnn = torch.jit.trace(model.cnn, example)
+    model.cnn = torch.jit.freeze(traced_cnn.eval())
+
+    if not script_transformer:
+        return model
+    seq = model.transformer.transformer
+    seq.encoder = torch.jit.script(seq.encoder)
+    seq.decoder = torch.jit.script(seq.decoder)
+    return model
+
+
+def apply_engine(predictor, engine: str = "eager"):
+    """
+    Biến đổi predictor.model tại chỗ theo engine được chọn, trả về predictor.
+    """
+    engine = (engine or "eager").lower()
+    if engine not in ENGINES:
+        raise ValueError(f"OCR engine không hợp lệ: {engine} (chọn một trong {ENGINES})")
+    if engine == "eager":
+        return predictor
+
+    model = predictor.model.eval()
+    if engine in ("int8", "torchscript_int8"):
+        if predictor.device != "cpu":
+            raise ValueError("INT8 dynamic quantization chỉ chạy trên CPU")
+        model = _quantize_int8(model)
+    if engine in ("torchscript", "torchscript_int8"):
+        dataset = predictor.config["dataset"]
+        model = _export_torchscript(
+            model, (dataset["image_height"], 128), script_transformer=(engine == "torchscript")
+        )
+
+    predictor.model = model
+    predictor.config["engine"] = engine
+    return predictor
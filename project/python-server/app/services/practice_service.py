@@ -2,61 +2,31 @@
 """
 Practice Service - Xử lý câu hỏi điền khuyết cho ứng dụng học tiếng Việt
 """
-import csv
+import os
 import random
 import re
-import json
-import unicodedata
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import Future
+from typing import Callable, List, Dict, Optional, Tuple
 
-from .vinallama_service import generate_response, init_vinallama
-
-# =========================
-# JSON rescue parser (QUAN TRỌNG)
-# =========================
-
-def robust_json_loads(text: str):
-    """
-    Parse JSON an toàn từ LLM output:
-    - bỏ ```json
-    - chịu được output bị cắt
-    """
-    if not text:
-        raise ValueError("Empty LLM response")
-
-    s = text.strip()
-
-    # 1) Bỏ code fence
-    s = re.sub(r"^\s*```(?:json)?\s*", "", s, flags=re.IGNORECASE)
-    s = re.sub(r"\s*```\s*$", "", s)
-
-    # 2) Tìm JSON bắt đầu từ [ hoặc {
-    start_candidates = [i for i in (s.find("["), s.find("{")) if i != -1]
-    if not start_candidates:
-        raise json.JSONDecodeError("No JSON found", s, 0)
-
-    s = s[min(start_candidates):].strip()
-
-    # 3) Thử parse trực tiếp
-    try:
-        return json.loads(s)
-    except json.JSONDecodeError:
-        pass
-
-    # 4) Nếu bị cắt, cắt tới dấu đóng ngoặc cuối cùng
-    last = max(s.rfind("]"), s.rfind("}"))
-    if last != -1:
-        return json.loads(s[: last + 1])
-
-    raise
+import requests
 
+from .vinallama_service import init_vinallama, stream_response
+from .json_stream import IncrementalJSONArrayParser
+from .rate_limiter import PRIORITY_INTERACTIVE
+from .verdict_store import VerdictStore
+from .batcher import MicroBatcher
+from .metrics import observe
+from .answer_matching import AnswerKey, match_answer, strip_diacritics
+from .question_bank import CaDaoBank, CurriculumBank, HotReloadingFile, load_curriculum, read_ca_dao_rows
 
 # =========================
 # Dữ liệu
 # =========================
 
 CSV_PATH = Path(__file__).parent.parent.parent.parent / "server" / "uploads" / "ca_dao_tuc_ngu_dien_khuyet.csv"
+CURRICULUM_PATH = Path(__file__).parent.parent.parent.parent / "client" / "public" / "data" / "curriculum.json"
 
 DAILY_LIFE_QUESTIONS = [
     "Hôm nay trời ____",
@@ -87,20 +57,7 @@ DAILY_LIFE_QUESTIONS = [
 # =========================
 
 def remove_vietnamese_diacritics(text: str) -> str:
-    nfkd_form = unicodedata.normalize('NFD', text)
-    only_ascii = ''.join(c for c in nfkd_form if not unicodedata.combining(c))
-    replacements = {
-        'đ': 'd', 'Đ': 'D',
-        'ă': 'a', 'Ă': 'A',
-        'â': 'a', 'Â': 'A',
-        'ê': 'e', 'Ê': 'E',
-        'ô': 'o', 'Ô': 'O',
-        'ơ': 'o', 'Ơ': 'O',
-        'ư': 'u', 'Ư': 'U',
-    }
-    for viet, ascii_char in replacements.items():
-        only_ascii = only_ascii.replace(viet, ascii_char)
-    return only_ascii
+    return strip_diacritics(text)
 
 
 def normalize_answer(answer: str) -> str:
@@ -111,29 +68,48 @@ def normalize_answer(answer: str) -> str:
     return normalized
 
 
+# Kết quả chấm câu đời thường đã có (LLM chỉ chấm cặp chưa gặp).
+# VERDICT_STORE_PATH="" để chỉ giữ trong RAM.
+_DEFAULT_VERDICT_PATH = Path(__file__).parent.parent.parent / ".cache" / "verdicts.sqlite3"
+verdict_store = VerdictStore(
+    path=os.environ.get("VERDICT_STORE_PATH", str(_DEFAULT_VERDICT_PATH)),
+    normalize=normalize_answer,
+    max_memory_entries=int(os.environ.get("VERDICT_STORE_MAX_ENTRIES", "20000")),
+    max_disk_entries=int(os.environ.get("VERDICT_STORE_DISK_MAX_ENTRIES", "200000")),
+    ttl_s=float(os.environ.get("VERDICT_STORE_TTL_S", str(30 * 24 * 3600))),
+)
+
+
 # =========================
 # CSV + question generation
 # =========================
 
 def load_ca_dao_from_csv() -> List[Dict]:
-    ca_dao_list = []
-    try:
-        with open(CSV_PATH, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                ca_dao_list.append({
-                    "cau_trong": row.get("cau_trong", ""),
-                    "dap_an": row.get("dap_an", ""),
-                    "cau_goc": row.get("cau_goc", "")
-                })
-    except Exception as e:
-        print(f"❌ Lỗi đọc CSV: {e}")
-    return ca_dao_list
+    """Toàn bộ câu ca dao (lấy từ ca_dao_bank, không đọc lại file)."""
+    bank = ca_dao_bank.get()
+    return [bank.item(i) for i in range(len(bank))]
+
+
+# Nạp 1 lần, chỉ nạp lại khi mtime của file đổi (stat tối đa 1 lần / QUESTION_BANK_CHECK_S giây)
+QUESTION_BANK_CHECK_S = float(os.environ.get("QUESTION_BANK_CHECK_S", "2"))
+ca_dao_bank = HotReloadingFile(
+    CSV_PATH,
+    lambda path: CaDaoBank(read_ca_dao_rows(path)),
+    empty=lambda: CaDaoBank([]),
+    name="ca dao CSV",
+    check_interval_s=QUESTION_BANK_CHECK_S,
+)
+curriculum_bank = HotReloadingFile(
+    CURRICULUM_PATH,
+    load_curriculum,
+    empty=lambda: CurriculumBank({}),
+    name="curriculum.json",
+    check_interval_s=QUESTION_BANK_CHECK_S,
+)
 
 
 def get_random_ca_dao(count: int = 5) -> List[Dict]:
-    all_ca_dao = load_ca_dao_from_csv()
-    return random.sample(all_ca_dao, min(count, len(all_ca_dao)))
+    return ca_dao_bank.get().sample(count)
 
 
 def get_random_daily_life(count: int = 5) -> List[str]:
@@ -172,16 +148,29 @@ def generate_practice_questions() -> List[Dict]:
 # Check answers
 # =========================
 
-def check_ca_dao_answer(correct_answer: str, user_answer: str, strict: bool = False) -> Tuple[bool, str]:
-    normalized_correct = normalize_answer(correct_answer)
-    normalized_user = normalize_answer(user_answer)
+# Chấp nhận lỗi gõ: tối đa ANSWER_MAX_TYPOS lỗi (trên dạng bỏ dấu) với đáp án dài
+# ít nhất ANSWER_TYPO_MIN_LENGTH ký tự. Mặc định 0 (tắt, chấm như trước); bật bằng ANSWER_MAX_TYPOS=1.
+ANSWER_MAX_TYPOS = int(os.environ.get("ANSWER_MAX_TYPOS", "0"))
+ANSWER_TYPO_MIN_LENGTH = int(os.environ.get("ANSWER_TYPO_MIN_LENGTH", "4"))
 
-    if normalized_user == normalized_correct:
-        return True, f"Chính xác! Đáp án đúng là \"{correct_answer}\"."
 
-    if not strict:
-        if remove_vietnamese_diacritics(normalized_user) == remove_vietnamese_diacritics(normalized_correct):
-            return True, f"Đúng! Đáp án là \"{correct_answer}\". (Lưu ý: bạn nên viết đúng dấu)"
+def check_ca_dao_answer(correct_answer: str, user_answer: str, strict: bool = False) -> Tuple[bool, str]:
+    # key của đáp án đã được tính sẵn khi nạp CSV
+    key = ca_dao_bank.get().answer_key(correct_answer) or AnswerKey.build(correct_answer or "")
+    result = match_answer(
+        key,
+        user_answer,
+        allow_no_diacritics=not strict,
+        max_typos=0 if strict else ANSWER_MAX_TYPOS,
+        typo_min_length=ANSWER_TYPO_MIN_LENGTH,
+    )
+
+    if result.kind == "exact":
+        return True, f"Chính xác! Đáp án đúng là \"{correct_answer}\"."
+    if result.kind == "no_diacritics":
+        return True, f"Đúng! Đáp án là \"{correct_answer}\". (Lưu ý: bạn nên viết đúng dấu)"
+    if result.kind == "typo":
+        return True, f"Gần đúng! Đáp án là \"{correct_answer}\". (Lưu ý: bạn viết sai chính tả một chút)"
 
     return False, f"Sai rồi! Đáp án đúng là \"{correct_answer}\"."
 
@@ -190,15 +179,12 @@ def check_ca_dao_answer(correct_answer: str, user_answer: str, strict: bool = Fa
 # 🔥 FIX CHÍNH Ở ĐÂY
 # =========================
 
-def check_daily_life_answers_batch_with_llm(questions_data: List[Dict]) -> List[Dict]:
-    if not questions_data:
-        return []
-
+def _grading_prompt(items: List[Tuple[str, str]]) -> str:
     questions_text = ""
-    for idx, item in enumerate(questions_data, start=1):
-        questions_text += f'{idx}. "{item["question"]}" | Trả lời: "{item["user_answer"]}"\n'
+    for idx, (question, user_answer) in enumerate(items, start=1):
+        questions_text += f'{idx}. "{question}" | Trả lời: "{user_answer}"\n'
 
-    prompt = f"""Chỉ trả về JSON hợp lệ.
+    return f"""Chỉ trả về JSON hợp lệ.
 KHÔNG dùng ```json```.
 KHÔNG giải thích ngoài JSON.
 
@@ -212,51 +198,189 @@ JSON array format:
 ]
 """
 
-    try:
-        print("🔍 DEBUG: Gọi LLM batch", flush=True)
-
-        response = generate_response(
-            prompt=prompt,
-            max_new_tokens=2048,   # 🔥 tăng token
-            do_sample=False,
-            temperature=0.1
-        )
-
-        print(f"🤖 LLM Batch Response: {response}", flush=True)
-
-        results = robust_json_loads(response)
-
-        result_map = {r["id"]: r for r in results if "id" in r}
-
-        final_results = []
-        for item in questions_data:
-            item_id = item["id"]
-            r = result_map.get(item_id)
-            if r:
-                final_results.append({
-                    "id": item_id,
-                    "is_correct": bool(r.get("is_correct", True)),
-                    "explanation": r.get("explanation", "Câu trả lời phù hợp.")
-                })
-            else:
-                final_results.append({
-                    "id": item_id,
-                    "is_correct": True,
-                    "explanation": "Câu trả lời có thể chấp nhận."
-                })
-
-        return final_results
 
+# Số lần hỏi lại LLM các câu bị bỏ sót (output bị cắt) sau lần gọi đầu
+LLM_GRADE_MAX_RETRIES = int(os.environ.get("LLM_GRADE_MAX_RETRIES", "1"))
+
+
+def _grade_with_llm(items: List[Tuple[str, str]], on_verdict: Callable[[int, Dict], None]) -> int:
+    """
+    Chấm các cặp (question, user_answer) bằng LLM (streaming). Mỗi object trong JSON array
+    được parse ngay khi đóng ngoặc và báo qua on_verdict(vị trí trong items (từ 1), verdict).
+    Nếu output bị cắt hoặc stream đứt giữa chừng, chỉ các câu còn thiếu được hỏi lại
+    (tối đa LLM_GRADE_MAX_RETRIES lần).
+    Trả về số câu đã chấm được.
+    """
+    remaining = list(range(1, len(items) + 1))
+    graded = 0
+    for attempt in range(1 + max(0, LLM_GRADE_MAX_RETRIES)):
+        subset = [items[pos - 1] for pos in remaining]
+
+        parser = IncrementalJSONArrayParser()
+        parse_s = 0.0
+        got = set()
+        dropped = False
+        try:
+            for chunk in stream_response(
+                prompt=_grading_prompt(subset),
+                max_new_tokens=2048,   # 🔥 tăng token
+                do_sample=False,
+                temperature=0.1,
+                priority=PRIORITY_INTERACTIVE
+            ):
+                t0 = time.perf_counter()
+                parsed = parser.feed(chunk)
+                parse_s += time.perf_counter() - t0
+                for r in parsed:
+                    try:
+                        local_id = int(r.get("id"))
+                    except (TypeError, ValueError):
+                        continue
+                    if not 1 <= local_id <= len(subset) or local_id in got:
+                        continue
+                    got.add(local_id)
+                    on_verdict(remaining[local_id - 1], {
+                        "is_correct": bool(r.get("is_correct", True)),
+                        "explanation": r.get("explanation", "Câu trả lời phù hợp.")
+                    })
+        except requests.RequestException as e:
+            # stream đứt giữa chừng: giữ các câu đã chấm, hỏi lại phần còn thiếu như output bị cắt
+            print(f"❌ Stream Gemini bị ngắt: {e}", flush=True)
+            dropped = True
+
+        observe("json_parse", parse_s)
+        graded += len(got)
+        missing = [pos for i, pos in enumerate(remaining, start=1) if i not in got]
+        if dropped:
+            note = " (stream bị ngắt)"
+        elif not parser.started:
+            note = " (LLM không trả JSON array: lỗi / hết quota)"
+        elif not parser.finished:
+            note = " (output bị cắt)"
+        else:
+            note = ""
+        print(f"🤖 LLM Batch: {len(got)}/{len(subset)} câu{note}", flush=True)
+        # không có câu nào (trừ khi stream đứt) -> lỗi / fallback, hỏi lại cũng vô ích
+        if not missing or (not got and not dropped):
+            break
+        print(f"🔁 Hỏi lại {len(missing)} câu LLM bỏ sót", flush=True)
+        remaining = missing
+    return graded
+
+
+def _set_verdict(fut: Future, verdict: Optional[Dict]):
+    if not fut.done():
+        fut.set_result(verdict)
+
+
+def _grade_coalesced(items: List[Tuple[str, str, Future]]) -> List[Optional[Dict]]:
+    """
+    run_batch của grading_batcher: items (question, user_answer, future của item) đến từ
+    nhiều request đồng thời -> 1 lần gọi LLM. Future của từng item được resolve ngay khi
+    có verdict (để stream kết quả), None nếu LLM bỏ sót câu.
+    """
+    verdicts: List[Optional[Dict]] = [None] * len(items)
+    positions: Dict[Tuple[str, str], List[int]] = {}
+    for i, (question, user_answer, fut) in enumerate(items):
+        # request khác có thể vừa chấm xong cặp này trong lúc item nằm trong hàng đợi
+        verdicts[i] = verdict_store.get(question, user_answer)
+        if verdicts[i] is None:
+            positions.setdefault(verdict_store.key(question, user_answer), []).append(i)
+        else:
+            _set_verdict(fut, verdicts[i])
+
+    if positions:
+        keys = list(positions)
+        unique = [items[positions[k][0]][:2] for k in keys]
+
+        def on_verdict(pos: int, verdict: Dict):
+            question, user_answer = unique[pos - 1]
+            verdict_store.put(question, user_answer, verdict["is_correct"], verdict["explanation"])
+            for i in positions[keys[pos - 1]]:
+                verdicts[i] = verdict
+                _set_verdict(items[i][2], verdict)
+
+        try:
+            _grade_with_llm(unique, on_verdict)
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done():
+                    fut.set_exception(e)
+            raise
+
+    for _, _, fut in items:
+        _set_verdict(fut, None)
+    return verdicts
+
+
+# Gom các câu đời thường chưa có verdict từ nhiều request trong `LLM_COALESCE_WAIT_MS`
+# thành 1 prompt (tối đa `LLM_COALESCE_MAX_ITEMS` câu).
+LLM_COALESCE_MAX_ITEMS = int(os.environ.get("LLM_COALESCE_MAX_ITEMS", "20"))
+LLM_COALESCE_WAIT_MS = float(os.environ.get("LLM_COALESCE_WAIT_MS", "50"))
+LLM_COALESCE_TIMEOUT_S = float(os.environ.get("LLM_COALESCE_TIMEOUT_S", "60"))
+grading_batcher = MicroBatcher(
+    _grade_coalesced,
+    max_batch_size=LLM_COALESCE_MAX_ITEMS,
+    max_wait_ms=LLM_COALESCE_WAIT_MS,
+    name="llm-grader",
+    concurrency=int(os.environ.get("LLM_COALESCE_CONCURRENCY", "4")),
+)
+
+
+def submit_daily_life_answers(questions_data: List[Dict]) -> List[Future]:
+    """
+    Tra verdict store trước; các cặp (câu hỏi, câu trả lời) chưa từng chấm được đưa
+    vào grading_batcher (gộp với request khác), verdict mới được ghi vào store.
+
+    Trả về 1 Future / câu (các câu trùng cặp dùng chung Future), resolve với
+    {"is_correct", "explanation"} ngay khi có verdict, hoặc None nếu LLM bỏ sót.
+    """
+    futures: List[Optional[Future]] = [None] * len(questions_data)
+    pending: Dict[Tuple[str, str], Future] = {}
+    for i, item in enumerate(questions_data):
+        verdict = verdict_store.get(item["question"], item["user_answer"])
+        if verdict is not None:
+            futures[i] = Future()
+            futures[i].set_result(verdict)
+            continue
+        # mỗi cặp là 1 item của grading_batcher: gộp chung prompt với các request khác
+        key = verdict_store.key(item["question"], item["user_answer"])
+        if key not in pending:
+            pending[key] = Future()
+            grading_batcher.submit((item["question"], item["user_answer"], pending[key]))
+        futures[i] = pending[key]
+
+    if not pending and questions_data:
+        print(f"⚡ Verdict store: {len(questions_data)}/{len(questions_data)} câu đã có kết quả", flush=True)
+    return futures
+
+
+def resolve_verdict(fut: Future, timeout: Optional[float] = None) -> Dict:
+    """Kết quả của 1 Future từ submit_daily_life_answers, kèm verdict mặc định khi lỗi / bị bỏ sót."""
+    try:
+        verdict = fut.result(timeout=LLM_COALESCE_TIMEOUT_S if timeout is None else timeout)
     except Exception as e:
-        print(f"❌ Lỗi batch LLM: {e}", flush=True)
-        return [
-            {
-                "id": item["id"],
-                "is_correct": True,
-                "explanation": "Không thể đánh giá. Tạm chấp nhận."
-            }
-            for item in questions_data
-        ]
+        print(f"❌ Lỗi batch LLM: {e!r}", flush=True)
+        return {"is_correct": True, "explanation": "Không thể đánh giá. Tạm chấp nhận."}
+    if verdict is None:
+        return {"is_correct": True, "explanation": "Câu trả lời có thể chấp nhận."}
+    return verdict
+
+
+def check_daily_life_answers_batch_with_llm(questions_data: List[Dict]) -> List[Dict]:
+    if not questions_data:
+        return []
+
+    futures = submit_daily_life_answers(questions_data)
+    results = []
+    for item, fut in zip(questions_data, futures):
+        verdict = resolve_verdict(fut)
+        results.append({
+            "id": item["id"],
+            "is_correct": verdict["is_correct"],
+            "explanation": verdict["explanation"]
+        })
+    return results
 
 
 def check_daily_life_answer_with_llm(question: str, user_answer: str) -> Tuple[bool, str]:
@@ -1,6 +1,11 @@
+import io
+import math
+from typing import Tuple, Union
+
 from PIL import Image
 import numpy as np
-import cv2
+
+from .metrics import stage
 
 
 def ensure_white_bg(pil_img: Image.Image) -> Image.Image:
@@ -33,6 +38,7 @@ def crop_to_ink(pil_img: Image.Image, pad: int = 20) -> Image.Image:
 
 
 # def preprocess_for_paddle(pil_img: Image.Image) -> np.ndarray:
+#     import cv2
 #     pil_img = crop_to_ink(pil_img, pad=25)
 #     rgb = np.array(pil_img)
 
@@ -56,6 +62,7 @@ def preprocess_for_vietocr(pil_img: Image.Image) -> Image.Image:
 
 
 # def preprocess_for_trocr(pil_img: Image.Image) -> Image.Image:
+#     import cv2
 #     pil_img = crop_to_ink(pil_img, pad=30)
 #     gray = np.array(pil_img.convert("L"))
 
@@ -64,3 +71,114 @@ def preprocess_for_vietocr(pil_img: Image.Image) -> Image.Image:
 #     th = 255 - th
 
 #     return Image.fromarray(th).convert("RGB")
+
+
+# =========================
+# Single-pass pipeline (dùng cho /predict)
+# decode 1 lần -> uint8 array -> bbox mực -> resize thẳng về chiều cao của model
+# =========================
+
+def _cv2():
+    # import lazy để không làm chậm create_app()
+    import cv2
+    return cv2
+
+
+def decode_image(data: Union[bytes, Image.Image], max_side: int = 1600) -> np.ndarray:
+    """
+    Decode ảnh thành mảng RGB uint8 (nền trong suốt -> trắng).
+    Ảnh JPEG lớn (ảnh chụp điện thoại) được decode ở độ phân giải giảm
+    bằng Image.draft; định dạng khác thì dùng Image.reduce.
+    """
+    img = Image.open(io.BytesIO(data)) if isinstance(data, (bytes, bytearray)) else data
+    w, h = img.size
+    if max(w, h) > max_side:
+        scale = max_side / float(max(w, h))
+        if img.format == "JPEG":
+            img.draft("RGB", (max(1, int(w * scale)), max(1, int(h * scale))))
+        # làm tròn lên: cạnh dài sau reduce luôn <= max_side
+        factor = math.ceil(max(img.size) / max_side)
+        if factor > 1:
+            img = img.reduce(factor)
+
+    if img.mode == "P" and "transparency" in img.info:
+        img = img.convert("RGBA")
+    if img.mode in ("RGBA", "LA"):
+        rgba = img.convert("RGBA")
+        bg = Image.new("RGB", rgba.size, (255, 255, 255))
+        bg.paste(rgba, mask=rgba.getchannel("A"))
+        return np.asarray(bg)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+
+def find_ink_bbox(rgb: np.ndarray, thresh: int = 245, step: int = 4) -> Tuple[int, int, int, int]:
+    """
+    Tìm bbox (x0, y0, x1, y1) (x1/y1 exclusive) của vùng có mực.
+    Quét trên ảnh thu nhỏ `step` lần (INTER_AREA nên nét mảnh vẫn còn),
+    sau đó tinh chỉnh ở độ phân giải gốc chỉ trong vùng đã khoanh.
+    Trả về toàn ảnh nếu không có mực.
+    """
+    cv2 = _cv2()
+    h, w = rgb.shape[:2]
+    x0, y0, x1, y1 = 0, 0, w, h
+
+    if step > 1 and min(h, w) >= 4 * step:
+        small = cv2.resize(rgb, (w // step, h // step), interpolation=cv2.INTER_AREA)
+        small_mask = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) < thresh
+        cols = np.flatnonzero(small_mask.any(axis=0))
+        if cols.size == 0:
+            return 0, 0, w, h
+        rows = np.flatnonzero(small_mask.any(axis=1))
+        x0 = max(0, (cols[0] - 1) * step)
+        x1 = min(w, (cols[-1] + 2) * step)
+        y0 = max(0, (rows[0] - 1) * step)
+        y1 = min(h, (rows[-1] + 2) * step)
+
+    region = cv2.cvtColor(np.ascontiguousarray(rgb[y0:y1, x0:x1]), cv2.COLOR_RGB2GRAY) < thresh
+    cols = np.flatnonzero(region.any(axis=0))
+    if cols.size == 0:
+        return 0, 0, w, h
+    rows = np.flatnonzero(region.any(axis=1))
+    return x0 + cols[0], y0 + rows[0], x0 + cols[-1] + 1, y0 + rows[-1] + 1
+
+
+def target_width(w: int, h: int, image_height: int, image_min_width: int, image_max_width: int) -> int:
+    """
+    Như vietocr.tool.translate.resize (làm tròn lên bội số 10), nhưng làm tròn sau khi
+    kẹp image_min_width: resize lại ảnh rộng 32 sẽ ra 40, còn bội số của 10 (và
+    image_max_width) thì giữ nguyên, nên resize trong VietOCR luôn là no-op.
+    """
+    new_w = int(image_height * float(w) / float(h))
+    new_w = math.ceil(max(new_w, image_min_width) / 10) * 10
+    return min(new_w, image_max_width)
+
+
+def prepare_for_vietocr(
+    data: Union[bytes, Image.Image],
+    image_height: int = 32,
+    image_min_width: int = 32,
+    image_max_width: int = 512,
+    pad: int = 25,
+) -> Image.Image:
+    """
+    decode -> crop theo mực (+pad) -> resize thẳng về (target_width, image_height).
+    Ảnh trả về đã đúng kích thước model nên resize bên trong VietOCR là no-op.
+    """
+    cv2 = _cv2()
+    with stage("decode"):
+        rgb = decode_image(data)
+
+    with stage("preprocess"):
+        h, w = rgb.shape[:2]
+        x0, y0, x1, y1 = find_ink_bbox(rgb)
+        x0, y0 = max(0, x0 - pad), max(0, y0 - pad)
+        x1, y1 = min(w, x1 + pad), min(h, y1 + pad)
+        crop = rgb[y0:y1, x0:x1]
+
+        ch, cw = crop.shape[:2]
+        new_w = target_width(cw, ch, image_height, image_min_width, image_max_width)
+        interp = cv2.INTER_AREA if ch > image_height else cv2.INTER_CUBIC
+        resized = cv2.resize(np.ascontiguousarray(crop), (new_w, image_height), interpolation=interp)
+        return Image.fromarray(resized)
@@ -0,0 +1,185 @@
+# coding: utf-8
+"""
+Profiler - đo CPU / bộ nhớ trong process đang chạy, bật theo yêu cầu (không restart).
+
+- SamplingProfiler: thread gọi profile() đọc sys._current_frames() mỗi `interval_s`, đếm stack
+  theo định dạng "collapsed" (frame;frame;frame N) của flamegraph.pl / speedscope.
+  Không hook vào interpreter nên chi phí chỉ là 1 lần duyệt stack mỗi mẫu; chỉ chạy
+  trong N giây được yêu cầu
+- MemoryTracker: tracemalloc (top dòng cấp phát) + RSS sau mỗi request theo endpoint;
+  chỉ đo khi đã start() -> bình thường không tốn gì
+
+Chỉ thấy process hiện tại: với OCR_WORKERS > 1, run_vietocr chạy trong worker process
+(xem worker_pool.py), profile process chính chỉ thấy thread chờ kết quả.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# leaf frame của thread đang chờ (lock, queue, socket) -> bỏ khi include_idle=False
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("queue.py", "get"),
+    ("selectors.py", "select"), ("socket.py", "accept"), ("socket.py", "readinto"),
+    ("wasyncore.py", "poll"),
+}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_run: Optional[dict] = None
+
+    def profile(self, seconds: float, interval_s: float = 0.005, include_idle: bool = False) -> str:
+        """Lấy mẫu mọi thread (trừ thread gọi) trong `seconds` giây, trả về collapsed stacks."""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("Đang có 1 phiên profile khác")
+        try:
+            me = threading.get_ident()
+            names = {}
+            stacks = Counter()
+            samples = 0
+            start = time.perf_counter()
+            deadline = start + seconds
+            next_tick = start
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                next_tick += interval_s
+                samples += 1
+                frames = sys._current_frames()
+                if frames.keys() - names.keys():
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == me:
+                        continue
+                    code = frame.f_code
+                    if not include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    stacks[";".join(reversed(stack))] += 1
+                del frames
+            elapsed = time.perf_counter() - start
+        finally:
+            self._lock.release()
+
+        self.last_run = {
+            "seconds": elapsed,
+            "interval_ms": interval_s * 1000.0,
+            "samples": samples,
+            "stacks": len(stacks),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        print(f"🔥 Profile {elapsed:.1f}s: {samples} mẫu, {len(stacks)} stack", flush=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self._started_tracemalloc = False
+        self._endpoints: Dict[str, dict] = {}
+        self._started_at = None
+
+    def start(self, frames: int = 1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._endpoints = {}
+            self._started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self.enabled = True
+
+    def stop(self):
+        with self._lock:
+            self.enabled = False
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def record(self, endpoint: str, rss_before: Optional[int], rss_after: Optional[int]):
+        if rss_after is None:
+            return
+        growth = (rss_after - rss_before) if rss_before is not None else 0
+        with self._lock:
+            e = self._endpoints.get(endpoint)
+            if e is None:
+                e = self._endpoints[endpoint] = {"requests": 0, "peak_rss_bytes": 0, "max_growth_bytes": 0}
+            e["requests"] += 1
+            e["peak_rss_bytes"] = max(e["peak_rss_bytes"], rss_after)
+            e["max_growth_bytes"] = max(e["max_growth_bytes"], growth)
+
+    def snapshot(self, limit: int = 20, key_type: str = "lineno") -> dict:
+        top = []
+        traced = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            traced = {"current_bytes": current, "peak_bytes": peak}
+            snap = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ))
+            for stat in snap.statistics(key_type)[:limit]:
+                top.append({
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                    "traceback": [f"{f.filename}:{f.lineno}" for f in stat.traceback],
+                })
+        with self._lock:
+            endpoints = {k: dict(v) for k, v in self._endpoints.items()}
+        return {
+            "tracking": self.enabled,
+            "started_at": self._started_at,
+            "rss_bytes": current_rss_bytes(),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "tracemalloc": traced,
+            "top_allocations": top,
+            "endpoints": endpoints,
+        }
+
+
+profiler = SamplingProfiler()
+memory_tracker = MemoryTracker()
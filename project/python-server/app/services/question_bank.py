@@ -0,0 +1,148 @@
+# coding: utf-8
+"""
+Question bank - dữ liệu câu hỏi nạp 1 lần vào RAM, tự nạp lại khi file đổi.
+
+- HotReloadingFile: giữ 1 snapshot bất biến của file đã parse; chỉ stat() file tối đa
+  1 lần mỗi `check_interval_s` và chỉ parse lại khi mtime/size đổi (đổi snapshot
+  bằng 1 phép gán nên các request đang đọc không bị ảnh hưởng)
+- CaDaoBank: câu ca dao điền khuyết trong các tuple song song + AnswerKey của đáp án
+  (dạng chuẩn hoá / bỏ dấu) tính sẵn, random sample O(k)
+- CurriculumBank: curriculum.json của client, index bài học theo (topicId, lessonId)
+"""
+import csv
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .answer_matching import AnswerKey
+
+
+class HotReloadingFile:
+    def __init__(self, path: Path, parse: Callable[[Path], object], empty, name: str, check_interval_s: float = 2.0):
+        self.path = Path(path)
+        self.name = name
+        self.check_interval_s = max(0.0, float(check_interval_s))
+        self._parse = parse
+        self._empty = empty
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._signature = None
+        self._next_check = 0.0
+        self._loads = 0
+        self._load_ms = 0.0
+        self._loaded_at = None
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self):
+        now = time.monotonic()
+        if self._snapshot is not None and now < self._next_check:
+            return self._snapshot
+        with self._lock:
+            if self._snapshot is not None and now < self._next_check:
+                return self._snapshot
+            self._next_check = now + self.check_interval_s
+            signature = self._file_signature()
+            if self._snapshot is None or signature != self._signature:
+                self._reload(signature)
+            return self._snapshot
+
+    def _reload(self, signature):
+        # gọi khi đang giữ self._lock
+        t0 = time.perf_counter()
+        try:
+            snapshot = self._parse(self.path)
+        except Exception as e:
+            print(f"❌ Lỗi nạp {self.name} ({self.path}): {e}")
+            if self._snapshot is None:
+                self._snapshot = self._empty()
+            self._signature = signature
+            return
+        self._snapshot = snapshot
+        self._signature = signature
+        self._loads += 1
+        self._load_ms = (time.perf_counter() - t0) * 1000.0
+        self._loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        print(f"📚 Đã nạp {self.name}: {len(snapshot)} mục ({self._load_ms:.1f} ms)")
+
+    def stats(self) -> dict:
+        snapshot = self.get()
+        return {
+            "path": str(self.path),
+            "entries": len(snapshot),
+            "loads": self._loads,
+            "last_load_ms": self._load_ms,
+            "loaded_at": self._loaded_at,
+        }
+
+
+class CaDaoBank:
+    __slots__ = ("questions", "answers", "originals", "answer_keys", "_by_answer")
+
+    def __init__(self, rows: List[Tuple[str, str, str]]):
+        self.questions = tuple(r[0] for r in rows)
+        self.answers = tuple(r[1] for r in rows)
+        self.originals = tuple(r[2] for r in rows)
+        self.answer_keys = tuple(AnswerKey.build(a) for a in self.answers)
+        self._by_answer: Dict[str, int] = {}
+        for i, a in enumerate(self.answers):
+            self._by_answer.setdefault(a, i)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def item(self, i: int) -> Dict:
+        return {"cau_trong": self.questions[i], "dap_an": self.answers[i], "cau_goc": self.originals[i]}
+
+    def sample(self, count: int, rng: Optional[random.Random] = None) -> List[Dict]:
+        rng = rng or random
+        return [self.item(i) for i in rng.sample(range(len(self)), min(count, len(self)))]
+
+    def answer_key(self, correct_answer: str) -> Optional[AnswerKey]:
+        """AnswerKey đã tính sẵn của đáp án, None nếu đáp án không có trong bank."""
+        i = self._by_answer.get(correct_answer)
+        return self.answer_keys[i] if i is not None else None
+
+
+def read_ca_dao_rows(path: Path) -> List[Tuple[str, str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            (row.get("cau_trong", ""), row.get("dap_an", ""), row.get("cau_goc", ""))
+            for row in csv.DictReader(f)
+        ]
+
+
+class CurriculumBank:
+    __slots__ = ("data", "_lessons")
+
+    def __init__(self, data: dict):
+        self.data = data
+        self._lessons = {}
+        for topic in data.get("roadmap", []):
+            for lesson in topic.get("lessons", []):
+                self._lessons[(topic.get("topicId"), lesson.get("lessonId"))] = {
+                    **lesson, "topicId": topic.get("topicId"), "topicName": topic.get("name")
+                }
+
+    def __len__(self):
+        return len(self._lessons)
+
+    def roadmap(self) -> List[Dict]:
+        return self.data.get("roadmap", [])
+
+    def lesson(self, topic_id: int, lesson_id: int) -> Optional[Dict]:
+        return self._lessons.get((topic_id, lesson_id))
+
+
+def load_curriculum(path: Path) -> CurriculumBank:
+    with open(path, "r", encoding="utf-8") as f:
+        return CurriculumBank(json.load(f))
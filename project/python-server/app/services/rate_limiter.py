@@ -0,0 +1,179 @@
+# coding: utf-8
+"""
+Rate limiter cho Gemini theo quota: requests-per-minute và tokens-per-minute.
+
+- 2 token bucket (RPM, TPM), nạp lại liên tục theo thời gian
+- caller chờ trong hàng đợi ưu tiên tới tối đa `max_wait_s` thay vì nhận 429 ngay:
+  priority nhỏ hơn được phục vụ trước (chấm bài tương tác trước /llm/generate),
+  cùng priority thì FIFO; chỉ request đầu hàng được lấy token nên request lớn
+  không bị request nhỏ chen mãi
+- khi Gemini vẫn trả 429 (quota thật thấp hơn cấu hình), on_throttled() chặn
+  cả hàng đợi tới hết Retry-After
+- settle(): trừ / hoàn lại phần chênh giữa số token ước lượng và usageMetadata thật
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from .batcher import _percentile
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class _Bucket:
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Số giây cần chờ để có đủ `amount` (đã refill)."""
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class QuotaRateLimiter:
+    def __init__(self, rpm: float, tpm: float, max_wait_s: float = 15.0):
+        """rpm / tpm <= 0: không giới hạn chiều đó."""
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.max_wait_s = float(max_wait_s)
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+
+        self._admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._timeouts = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._waits = {name: deque(maxlen=1024) for name in PRIORITY_NAMES.values()}
+        self._throttled = 0
+        self._peak_depth = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._requests is not None or self._tokens is not None
+
+    def _wait_needed(self, tokens: float, now: float) -> float:
+        wait = max(0.0, self._blocked_until - now)
+        for bucket, amount in ((self._requests, 1.0), (self._tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_for(amount))
+        return wait
+
+    def acquire(self, tokens: float, priority: int = PRIORITY_BULK, max_wait_s: float = None) -> float:
+        """
+        Chờ tới lượt và lấy 1 request + `tokens` token khỏi bucket.
+        Trả về số giây đã chờ; raise RateLimitTimeout nếu quá max_wait_s.
+        """
+        if not self.enabled:
+            return 0.0
+        name = PRIORITY_NAMES.get(priority, "bulk")
+        max_wait_s = self.max_wait_s if max_wait_s is None else max_wait_s
+        start = time.monotonic()
+        deadline = start + max_wait_s
+        entry = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            self._peak_depth = max(self._peak_depth, len(self._heap))
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._heap[0] == entry:
+                        wait = self._wait_needed(tokens, now)
+                        if wait <= 0:
+                            if self._requests is not None:
+                                self._requests.level -= 1.0
+                            if self._tokens is not None:
+                                self._tokens.level -= min(tokens, self._tokens.capacity)
+                            waited = now - start
+                            self._admitted[name] += 1
+                            self._waits[name].append(waited)
+                            return waited
+                        # đầu hàng nhưng quota không kịp nạp trước deadline -> báo lỗi ngay
+                        timed_out = now + wait > deadline
+                    else:
+                        wait = deadline - now
+                        timed_out = wait <= 0
+                    if timed_out:
+                        self._timeouts[name] += 1
+                        raise RateLimitTimeout(
+                            f"Gemini quota: chờ quá {max_wait_s:.1f}s trong hàng đợi ({name})"
+                        )
+                    self._cond.wait(timeout=max(0.001, min(wait, deadline - now)))
+            finally:
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                self._cond.notify_all()
+
+    def settle(self, estimated_tokens: float, actual_tokens: float):
+        """Điều chỉnh TPM theo số token thật (usageMetadata) sau khi gọi xong."""
+        if self._tokens is None or actual_tokens is None:
+            return
+        with self._cond:
+            self._tokens.refill(time.monotonic())
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def on_throttled(self, retry_after_s: float = None):
+        """Gemini trả 429: chặn hàng đợi tới hết Retry-After (mặc định 1 lượt nạp RPM)."""
+        if not self.enabled:
+            return
+        with self._cond:
+            if retry_after_s is None:
+                retry_after_s = 60.0 / self.rpm if self.rpm > 0 else 1.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after_s)
+            if self._requests is not None:
+                self._requests.level = min(self._requests.level, 0.0)
+            self._throttled += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._heap:
+                depth[PRIORITY_NAMES.get(priority, "bulk")] += 1
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket.refill(now)
+            waits = {}
+            for name, values in self._waits.items():
+                values = sorted(values)
+                waits[name] = {
+                    "p50": _percentile(values, 50) * 1000.0,
+                    "p95": _percentile(values, 95) * 1000.0,
+                    "max": (values[-1] * 1000.0) if values else 0.0,
+                }
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "max_wait_s": self.max_wait_s,
+                "queue_depth": depth,
+                "peak_queue_depth": self._peak_depth,
+                "admitted": dict(self._admitted),
+                "timeouts": dict(self._timeouts),
+                "throttled_429": self._throttled,
+                "blocked_for_s": max(0.0, self._blocked_until - now),
+                "requests_available": self._requests.level if self._requests is not None else None,
+                "tokens_available": self._tokens.level if self._tokens is not None else None,
+                "wait_ms": waits,
+            }
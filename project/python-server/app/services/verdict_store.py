@@ -0,0 +1,176 @@
+# coding: utf-8
+"""
+Verdict store - lưu kết quả chấm từng cặp (câu hỏi đời thường, câu trả lời).
+
+DAILY_LIFE_QUESTIONS chỉ có ~20 mẫu câu và học sinh thường trả lời bằng một nhóm
+nhỏ từ ("nắng", "ăn", "đọc"...), nên phần lớn các cặp đã từng được LLM chấm.
+
+- key = (câu hỏi, câu trả lời) sau NFC + normalize_answer, nên "Nắng", " nắng "
+  và "nắng" viết bằng dấu tổ hợp (NFD) là cùng 1 key; "nang" (không dấu) thì khác
+- tier 1: LRU trong RAM, tier 2 (tuỳ chọn): bảng SQLite (TTL + giới hạn số entry), giữ được qua restart
+"""
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class VerdictStore:
+    def __init__(
+        self,
+        path: Optional[str],
+        normalize: Callable[[str], str],
+        max_memory_entries: int = 20000,
+        max_disk_entries: int = 200000,
+        ttl_s: float = 30 * 24 * 3600.0,
+    ):
+        self.path = path or None
+        self.max_memory_entries = max(0, int(max_memory_entries))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+        self.ttl_s = float(ttl_s)
+        self._normalize = normalize
+
+        self._lock = threading.Lock()
+        # key -> (expires_at (wall clock), verdict)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self._db = None
+        self._puts_since_trim = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+        if self.path and self.max_disk_entries > 0:
+            try:
+                self._open_db()
+            except sqlite3.Error as e:
+                print(f"⚠️ Không mở được verdict store SQLite ({self.path}): {e}")
+                self._db = None
+
+    def _open_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " question TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " is_correct INTEGER NOT NULL,"
+            " explanation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (question, answer))"
+        )
+        # file tạo từ bản cũ chưa có cột last_access
+        columns = {row[1] for row in db.execute("PRAGMA table_info(verdicts)")}
+        if "last_access" not in columns:
+            db.execute("ALTER TABLE verdicts ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+            db.execute("UPDATE verdicts SET last_access = created_at")
+        db.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_last_access ON verdicts(last_access)")
+        db.execute("DELETE FROM verdicts WHERE created_at < ?", (time.time() - self.ttl_s,))
+        self._db = db
+
+    def key(self, question: str, user_answer: str) -> Tuple[str, str]:
+        return (
+            self._normalize(unicodedata.normalize("NFC", question or "")),
+            self._normalize(unicodedata.normalize("NFC", user_answer or "")),
+        )
+
+    def _remember(self, key, entry: Tuple[float, Dict]):
+        # gọi khi đang giữ self._lock
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, question: str, user_answer: str) -> Optional[Dict]:
+        """Trả về {"is_correct", "explanation"} hoặc None nếu chưa từng chấm."""
+        key = self.key(question, user_answer)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return dict(entry[1])
+                del self._memory[key]
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT is_correct, explanation, created_at FROM verdicts WHERE question = ? AND answer = ?",
+                        key,
+                    ).fetchone()
+                    if row is not None and row[2] + self.ttl_s >= now:
+                        self._db.execute(
+                            "UPDATE verdicts SET last_access = ? WHERE question = ? AND answer = ?", (now, *key)
+                        )
+                        verdict = {"is_correct": bool(row[0]), "explanation": row[1]}
+                        self._remember(key, (row[2] + self.ttl_s, verdict))
+                        self._hits += 1
+                        return dict(verdict)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Verdict store SQLite lỗi khi đọc: {e}")
+            self._misses += 1
+            return None
+
+    def put(self, question: str, user_answer: str, is_correct: bool, explanation: str):
+        key = self.key(question, user_answer)
+        verdict = {"is_correct": bool(is_correct), "explanation": explanation}
+        now = time.time()
+        with self._lock:
+            self._remember(key, (now + self.ttl_s, verdict))
+            self._stores += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO verdicts (question, answer, is_correct, explanation, created_at, last_access)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, int(verdict["is_correct"]), explanation, now, now),
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 100:
+                    self._trim_disk(now)
+            except sqlite3.Error as e:
+                print(f"⚠️ Verdict store SQLite lỗi khi ghi: {e}")
+
+    def _trim_disk(self, now: float):
+        # gọi khi đang giữ self._lock: xoá verdict hết hạn rồi cắt bớt verdict ít dùng nhất
+        self._puts_since_trim = 0
+        self._db.execute("DELETE FROM verdicts WHERE created_at < ?", (now - self.ttl_s,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM verdicts WHERE rowid IN ("
+                " SELECT rowid FROM verdicts ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+            self._evictions += count - self.max_disk_entries
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            disk_entries = None
+            if self._db is not None:
+                try:
+                    (disk_entries,) = self._db.execute("SELECT COUNT(*) FROM verdicts").fetchone()
+                except sqlite3.Error:
+                    pass
+            return {
+                "path": self.path if self._db is not None else None,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
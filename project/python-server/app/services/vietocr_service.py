@@ -1,9 +1,110 @@
+import os
+import threading
+from collections import deque
+from typing import List, Tuple, Union
+
 from PIL import Image
 
-from .preprocess import preprocess_for_vietocr
+from .bucketing import pad_batch, plan_buckets
+from .preprocess import prepare_for_vietocr
 #from .models import init_model
 
+# "incremental": greedy decode có KV-cache (fast_decode.py); "vietocr": translate() gốc
+OCR_DECODER = os.environ.get("OCR_DECODER", "incremental")
+# Độ rộng bucket (px, sau khi resize về chiều cao model). 0 (mặc định) = chỉ gom ảnh cùng chiều
+# rộng, không pad: output giống hệt chạy từng ảnh. > 0 = pad trong bucket (phần pad được mask
+# nhưng CNN vẫn nhìn thấy nền pad ở mép phải, kiểm tra CER bằng benchmarks/bench_decode.py trước khi bật)
+OCR_BUCKET_WIDTH = int(os.environ.get("OCR_BUCKET_WIDTH", "0"))
+
+_decode_lock = threading.Lock()
+_decode_stats = {"batches": 0, "steps": 0, "tokens": 0, "decode_s": 0.0}
+_padding_efficiency = deque(maxlen=1024)
+
+
+def vietocr_input_size(model) -> Tuple[int, int, int]:
+    """(image_height, image_min_width, image_max_width) theo config của Predictor."""
+    dataset = model.config["dataset"]
+    return dataset["image_height"], dataset["image_min_width"], dataset["image_max_width"]
+
+
+def preprocess_image(model, data: Union[bytes, Image.Image]) -> Image.Image:
+    """
+    Decode + crop theo mực + resize về đúng kích thước input của model (1 lần duy nhất).
+    """
+    return prepare_for_vietocr(data, *vietocr_input_size(model))
+
 
 def run_vietocr(model, pil_img: Image.Image) -> str:
     text = model.predict(pil_img)
     return (text or "").strip()
+
+
+def _use_incremental(model) -> bool:
+    return (
+        OCR_DECODER == "incremental"
+        and not model.config["predictor"]["beamsearch"]
+        and model.config.get("seq_modeling", "transformer") == "transformer"
+    )
+
+
+def _predict_batch_incremental(model, pil_imgs: List[Image.Image], max_batch_size: int = None) -> List[str]:
+    from vietocr.tool.translate import process_input
+
+    from .fast_decode import translate_incremental
+
+    height, min_w, max_w = vietocr_input_size(model)
+    tensors = [process_input(img, height, min_w, max_w) for img in pil_imgs]
+    plan = plan_buckets(
+        [t.shape[-1] for t in tensors], OCR_BUCKET_WIDTH, max_batch_size or len(tensors)
+    )
+
+    texts = [""] * len(pil_imgs)
+    stats = {}
+    efficiencies = []
+    for idx in plan:
+        widths = [tensors[i].shape[-1] for i in idx]
+        batch, efficiency = pad_batch([tensors[i] for i in idx])
+        efficiencies.append(efficiency)
+        tokens, _ = translate_incremental(batch.to(model.device), model.model, stats=stats, widths=widths)
+        for i, sent in zip(idx, model.vocab.batch_decode(tokens.tolist())):
+            texts[i] = sent
+
+    with _decode_lock:
+        _decode_stats["batches"] += len(plan)
+        for k in ("steps", "tokens", "decode_s"):
+            _decode_stats[k] += stats.get(k, 0)
+        _padding_efficiency.extend(efficiencies)
+    return texts
+
+
+def run_vietocr_batch(model, pil_imgs: List[Image.Image], max_batch_size: int = None) -> List[str]:
+    """
+    Chạy forward theo batch, ảnh được gom theo bucket chiều rộng (xem bucketing.py).
+    """
+    if not pil_imgs:
+        return []
+    if _use_incremental(model):
+        texts = _predict_batch_incremental(model, pil_imgs, max_batch_size)
+    else:
+        texts = model.predict_batch(pil_imgs)
+    return [(t or "").strip() for t in texts]
+
+
+def decode_stats() -> dict:
+    """
+    Thống kê decoder (trong process hiện tại): thời gian trung bình mỗi token
+    và padding efficiency của các batch gần đây.
+    """
+    with _decode_lock:
+        stats = dict(_decode_stats)
+        efficiencies = list(_padding_efficiency)
+    stats["decoder"] = OCR_DECODER
+    stats["bucket_width"] = OCR_BUCKET_WIDTH
+    stats["padding_efficiency"] = {
+        "avg": sum(efficiencies) / len(efficiencies) if efficiencies else 1.0,
+        "min": min(efficiencies) if efficiencies else 1.0,
+        "last": efficiencies[-1] if efficiencies else 1.0,
+    }
+    stats["ms_per_token"] = stats["decode_s"] * 1000.0 / stats["tokens"] if stats["tokens"] else 0.0
+    stats["ms_per_step"] = stats["decode_s"] * 1000.0 / stats["steps"] if stats["steps"] else 0.0
+    return stats
@@ -5,13 +5,24 @@ LLM Service - Google Gemini (REST API)
 Giữ nguyên interface cũ:
 - init_vinallama()
 - generate_response(...)
+- stream_response(...)  (streaming, yield từng đoạn text)
 - get_model_info()
 """
 
 import os
 import json
+import threading
 import requests
 import time
+from collections import deque
+from typing import Iterator, Optional
+
+from .gemini_client import GeminiHTTPClient
+from .llm_cache import LLMResponseCache, llm_cache_key
+from .batcher import _percentile
+from .bulkhead import BULKHEADS, BulkheadFull
+from .metrics import observe
+from .rate_limiter import PRIORITY_BULK, QuotaRateLimiter, RateLimitTimeout
 
 # =========================
 # Global config
@@ -24,7 +35,36 @@ try:
 except UnicodeEncodeError:
     print(f"GEMINI_API_KEY set: {GEMINI_API_KEY}")
 _MODEL = "models/gemini-2.5-flash"
-_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta"
+_ENDPOINT = os.environ.get("GEMINI_ENDPOINT", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+
+# Quota Gemini (free tier gemini-2.5-flash: 10 RPM, 250k TPM). <= 0 để bỏ giới hạn.
+# Hết quota thì request chờ trong hàng đợi ưu tiên tối đa LLM_QUEUE_MAX_WAIT_S giây.
+_limiter = QuotaRateLimiter(
+    rpm=float(os.environ.get("GEMINI_RPM", "10")),
+    tpm=float(os.environ.get("GEMINI_TPM", "250000")),
+    max_wait_s=float(os.environ.get("LLM_QUEUE_MAX_WAIT_S", "15")),
+)
+
+# Session dùng chung (keep-alive) + retry/backoff cho 429 / 5xx
+_client = GeminiHTTPClient(
+    pool_size=int(os.environ.get("GEMINI_POOL_SIZE", "16")),
+    max_retries=int(os.environ.get("GEMINI_MAX_RETRIES", "4")),
+    backoff_base_s=float(os.environ.get("GEMINI_BACKOFF_BASE_S", "0.5")),
+    backoff_max_s=float(os.environ.get("GEMINI_BACKOFF_MAX_S", "8")),
+    budget_s=float(os.environ.get("GEMINI_RETRY_BUDGET_S", "20")),
+    timeout_s=float(os.environ.get("GEMINI_TIMEOUT_S", "30")),
+    on_throttled=_limiter.on_throttled,
+)
+
+# Cache cho lời gọi deterministic (do_sample=False): LRU trong RAM + SQLite trên đĩa.
+# LLM_CACHE_PATH="" để tắt tier SQLite.
+_DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "llm_cache.sqlite3")
+_cache = LLMResponseCache(
+    path=os.environ.get("LLM_CACHE_PATH", _DEFAULT_CACHE_PATH),
+    max_memory_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "1024")),
+    max_disk_entries=int(os.environ.get("LLM_CACHE_DISK_MAX_ENTRIES", "50000")),
+    ttl_s=float(os.environ.get("LLM_CACHE_TTL_S", str(7 * 24 * 3600))),
+)
 
 # =========================
 # Helpers
@@ -42,10 +82,102 @@ def _headers():
 def _url():
     return f"{_ENDPOINT}/{_MODEL}:generateContent?key={GEMINI_API_KEY}"
 
+def _stream_url():
+    return f"{_ENDPOINT}/{_MODEL}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+
+def _payload(prompt: str, max_new_tokens: int, do_sample: bool, temperature: float, top_p: float) -> dict:
+    return {
+        "contents": [
+            {"parts": [{"text": prompt}]}
+        ],
+        "generationConfig": {
+            "temperature": temperature if do_sample else 0.1,
+            "topP": top_p,
+            "maxOutputTokens": max_new_tokens
+        }
+    }
+
+def _estimate_tokens(prompt: str, max_new_tokens: int) -> int:
+    # tiếng Việt ~3 ký tự / token; tính cả số token output tối đa
+    return len(prompt) // 3 + int(max_new_tokens)
+
+def _acquire_llm(estimated_tokens: int, priority: int):
+    """
+    Lấy quota trước (hàng đợi ưu tiên của _limiter), rồi mới lấy slot bulkhead "llm":
+    request đang xếp hàng chờ quota không giữ slot, nên request bulk không chặn được
+    request tương tác vào hàng đợi. Slot chờ tối đa phần còn lại của LLM_QUEUE_MAX_WAIT_S.
+    Caller phải BULKHEADS["llm"].release() sau khi gọi HTTP xong.
+    """
+    waited = _limiter.acquire(estimated_tokens, priority)
+    observe("llm_queue", waited)
+    BULKHEADS["llm"].acquire(timeout=max(0.0, _limiter.max_wait_s - waited))
+
+
+def _requota(estimated_tokens: int, priority: int):
+    """
+    before_retry cho _client.post_json: mỗi lần thử lại (kể cả sau 429) cũng tính 1 request
+    + estimated_tokens vào RPM/TPM, chờ quota tối đa phần budget retry còn lại.
+    """
+    def before_retry(remaining_s: float) -> bool:
+        try:
+            observe("llm_queue", _limiter.acquire(estimated_tokens, priority, max_wait_s=remaining_s))
+            return True
+        except RateLimitTimeout as e:
+            print(f"⏳ {e}")
+            return False
+    return before_retry
+
+def _chunk_text(data: dict) -> str:
+    parts = data.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+    return "".join(p.get("text", "") for p in parts)
+
+def _finish_reason(data: dict) -> Optional[str]:
+    # "STOP" = kết thúc tự nhiên; MAX_TOKENS / SAFETY / ... = câu trả lời bị cắt / chặn
+    return data.get("candidates", [{}])[0].get("finishReason")
+
+
+class _StreamStats:
+    """TTFB (tới chunk text đầu tiên) so với tổng thời gian của các lời gọi streaming."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.errors = 0
+        self.ttfb_ms = deque(maxlen=1024)
+        self.total_ms = deque(maxlen=1024)
+
+    def record(self, ttfb_ms, total_ms, failed: bool):
+        with self._lock:
+            self.streams += 1
+            self.errors += int(failed)
+            if ttfb_ms is not None:
+                self.ttfb_ms.append(ttfb_ms)
+            self.total_ms.append(total_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            ttfb, total = sorted(self.ttfb_ms), sorted(self.total_ms)
+            return {
+                "streams": self.streams,
+                "errors": self.errors,
+                "ttfb_ms": {"p50": _percentile(ttfb, 50), "p95": _percentile(ttfb, 95)},
+                "total_ms": {"p50": _percentile(total, 50), "p95": _percentile(total, 95)},
+            }
+
+
+_stream_stats = _StreamStats()
+
 # =========================
 # Public APIs (GIỮ NGUYÊN)
 # =========================
 
+def _observe_llm(connect_ms: float, ttfb_ms: Optional[float], total_ms: float):
+    observe("llm_connect", connect_ms / 1000.0)
+    if ttfb_ms is not None:
+        observe("llm_ttfb", ttfb_ms / 1000.0)
+    observe("llm_total", total_ms / 1000.0)
+
+
 def init_vinallama():
     """
     Kiểm tra cấu hình API key.
@@ -62,34 +194,49 @@ def generate_response(
     do_sample: bool = True,
     temperature: float = 0.7,
     top_p: float = 0.9,
+    priority: int = PRIORITY_BULK,
 ) -> str:
     """
     Gọi Gemini REST API để sinh response.
+    priority: PRIORITY_INTERACTIVE (chấm bài) được xếp trước PRIORITY_BULK khi hết quota.
     """
     if not GEMINI_API_KEY:
         return _fallback_json("Gemini API chưa được cấu hình.")
 
-    payload = {
-        "contents": [
-            {"parts": [{"text": prompt}]}
-        ],
-        "generationConfig": {
-            "temperature": temperature if do_sample else 0.1,
-            "topP": top_p,
-            "maxOutputTokens": max_new_tokens
-        }
-    }
+    payload = _payload(prompt, max_new_tokens, do_sample, temperature, top_p)
+
+    # Cùng prompt + cùng tham số, không sampling -> dùng lại câu trả lời cũ
+    cache_key = None
+    if not do_sample:
+        cache_key = llm_cache_key(_MODEL, prompt, payload["generationConfig"])
+        cached = _cache.get(cache_key)
+        if cached is not None:
+            print("⚡ Gemini cache hit")
+            return cached
+
+    estimated_tokens = _estimate_tokens(prompt, max_new_tokens)
+    try:
+        _acquire_llm(estimated_tokens, priority)
+    except (RateLimitTimeout, BulkheadFull) as e:
+        print(f"⏳ {e}")
+        return _fallback_json("Hệ thống đang quá tải. Tạm chấp nhận câu trả lời.")
 
     try:
         print("🤖 Gọi Gemini API (REST)...")
-        res = requests.post(_url(), headers=_headers(), json=payload, timeout=30)
+        res, timings = _client.post_json(
+            _url(), payload, headers=_headers(), before_retry=_requota(estimated_tokens, priority)
+        )
+        print(f"⏱️ Gemini: {timings['attempts']} lần gọi, connect {timings['connect_ms']:.0f}ms, "
+              f"TTFB {timings['ttfb_ms']:.0f}ms, total {timings['total_ms']:.0f}ms")
+        _observe_llm(timings["connect_ms"], timings["ttfb_ms"], timings["total_ms"])
 
-        # Xử lý quota
+        # Xử lý quota (đã retry hết budget mà vẫn 429)
         if res.status_code == 429:
             return _fallback_json("Gemini API hết quota tạm thời. Vui lòng thử lại sau.")
 
         res.raise_for_status()
         data = res.json()
+        _limiter.settle(estimated_tokens, data.get("usageMetadata", {}).get("totalTokenCount"))
 
         # Lấy text an toàn
         text = (
@@ -102,11 +249,130 @@ def generate_response(
         if not text:
             return _fallback_json("Gemini không trả nội dung.")
 
+        # Chỉ cache câu trả lời thật và trọn vẹn, không cache fallback / output bị cắt
+        if cache_key is not None and _finish_reason(data) == "STOP":
+            _cache.put(cache_key, text, timings["total_ms"])
         return text
 
     except requests.RequestException as e:
         print(f"❌ Lỗi Gemini REST: {e}")
         return _fallback_json("Lỗi gọi Gemini API. Tạm chấp nhận câu trả lời.")
+    finally:
+        BULKHEADS["llm"].release()
+
+def stream_response(
+    prompt: str,
+    max_new_tokens: int = 256,
+    do_sample: bool = True,
+    temperature: float = 0.7,
+    top_p: float = 0.9,
+    timings: Optional[dict] = None,
+    priority: int = PRIORITY_BULK,
+) -> Iterator[str]:
+    """
+    Giống generate_response nhưng yield từng đoạn text ngay khi Gemini trả về
+    (streamGenerateContent, SSE). Lỗi trước khi có chunk đầu tiên -> yield 1 fallback;
+    lỗi giữa chừng -> raise để route báo lỗi cho client.
+
+    timings (nếu truyền vào) được điền: ttfb_ms (tới chunk đầu tiên), total_ms, chunks.
+    """
+    timings = timings if timings is not None else {}
+    start = time.perf_counter()
+    ttfb_ms, failed = None, False
+    connect_ms = None   # None: không gọi Gemini (cache hit / fallback) -> không vào metrics
+    holds_slot = False  # slot bulkhead "llm" giữ tới khi đọc xong stream
+
+    def first_chunk():
+        nonlocal ttfb_ms
+        if ttfb_ms is None:
+            ttfb_ms = (time.perf_counter() - start) * 1000.0
+            timings["ttfb_ms"] = ttfb_ms
+
+    try:
+        if not GEMINI_API_KEY:
+            first_chunk()
+            yield _fallback_json("Gemini API chưa được cấu hình.")
+            return
+
+        payload = _payload(prompt, max_new_tokens, do_sample, temperature, top_p)
+        cache_key = None
+        if not do_sample:
+            cache_key = llm_cache_key(_MODEL, prompt, payload["generationConfig"])
+            cached = _cache.get(cache_key)
+            if cached is not None:
+                first_chunk()
+                yield cached
+                return
+
+        estimated_tokens = _estimate_tokens(prompt, max_new_tokens)
+        try:
+            _acquire_llm(estimated_tokens, priority)
+            holds_slot = True
+        except (RateLimitTimeout, BulkheadFull) as e:
+            print(f"⏳ {e}")
+            failed = True
+            first_chunk()
+            yield _fallback_json("Hệ thống đang quá tải. Vui lòng thử lại sau.")
+            return
+
+        print("🤖 Gọi Gemini API (REST, streaming)...")
+        try:
+            res, http_timings = _client.post_json(
+                _stream_url(), payload, headers=_headers(), stream=True,
+                before_retry=_requota(estimated_tokens, priority),
+            )
+            connect_ms = http_timings["connect_ms"]
+        except requests.RequestException as e:
+            print(f"❌ Lỗi Gemini REST: {e}")
+            failed = True
+            first_chunk()
+            yield _fallback_json("Lỗi gọi Gemini API. Tạm chấp nhận câu trả lời.")
+            return
+
+        if res.status_code >= 400:
+            failed = True
+            first_chunk()
+            if res.status_code == 429:
+                yield _fallback_json("Gemini API hết quota tạm thời. Vui lòng thử lại sau.")
+            else:
+                yield _fallback_json("Lỗi gọi Gemini API. Tạm chấp nhận câu trả lời.")
+            return
+
+        pieces = []
+        finish_reason = None   # chỉ chunk cuối có finishReason
+        total_tokens = None    # usageMetadata (chunk cuối có tổng số token)
+        # SSE không khai báo charset -> requests mặc định ISO-8859-1, làm hỏng tiếng Việt
+        res.encoding = "utf-8"
+        try:
+            for line in res.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:].strip())
+                finish_reason = _finish_reason(data) or finish_reason
+                total_tokens = data.get("usageMetadata", {}).get("totalTokenCount") or total_tokens
+                text = _chunk_text(data)
+                if text:
+                    first_chunk()
+                    pieces.append(text)
+                    timings["chunks"] = timings.get("chunks", 0) + 1
+                    yield text
+        except Exception:
+            failed = True
+            raise
+        finally:
+            res.close()
+
+        _limiter.settle(estimated_tokens, total_tokens)
+        if cache_key is not None and pieces and finish_reason == "STOP":
+            _cache.put(cache_key, "".join(pieces), (time.perf_counter() - start) * 1000.0)
+    finally:
+        if holds_slot:
+            BULKHEADS["llm"].release()
+        timings["total_ms"] = (time.perf_counter() - start) * 1000.0
+        _stream_stats.record(ttfb_ms, timings["total_ms"], failed)
+        if connect_ms is not None:
+            _observe_llm(connect_ms, ttfb_ms, timings["total_ms"])
+
 
 def get_model_info() -> dict:
     """
@@ -119,6 +385,10 @@ def get_model_info() -> dict:
             "model": _MODEL,
             "transport": "REST",
             "free": True,
+            "http": _client.stats(),
+            "cache": _cache.stats(),
+            "streaming": _stream_stats.stats(),
+            "rate_limit": _limiter.stats(),
         }
     return {
         "status": "not_configured",
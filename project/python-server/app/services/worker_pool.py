@@ -0,0 +1,265 @@
+# coding: utf-8
+"""
+OCR worker pool - pre-fork N process inference sau khi load weights 1 lần.
+
+Weights được đưa vào shared memory (model.share_memory()) trước khi fork,
+nên các worker dùng chung 1 bản tham số thay vì N bản. Mỗi worker có
+torch thread budget riêng; request được gửi qua multiprocessing.Queue.
+
+Worker chết (OOM kill, segfault): batch đang chạy trên worker đó bị fail ngay,
+worker được fork lại (tối đa max_respawns lần); hết lượt thì pool unhealthy và
+/readyz trả 503. run_batch / wait_ready luôn có timeout.
+
+Mỗi worker (kể cả worker được fork lại) tự chạy 1 batch ảnh trắng trước khi báo
+"ready", nên wait_ready() == True nghĩa là mọi worker đã warm-up.
+
+Lưu ý: pool phải được fork TRƯỚC khi process cha chạy inference lần nào
+(OpenMP/torch thread pool không an toàn sau fork).
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from typing import Any, List, Optional
+
+_STOP = None
+_IDLE = -1
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+def _worker_main(worker_id: int, model, tasks, results, current, num_threads: int):
+    import torch
+    from PIL import Image
+
+    from .vietocr_service import run_vietocr_batch
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    # warm-up trong chính worker này (kernel / allocator) trước khi nhận batch thật
+    with torch.inference_mode():
+        run_vietocr_batch(model, [Image.new("RGB", (128, 32), (255, 255, 255))])
+    results.put(("ready", worker_id, os.getpid()))
+
+    while True:
+        task = tasks.get()
+        if task is _STOP:
+            break
+        task_id, imgs = task
+        # ghi đồng bộ (shared memory) để process cha biết batch nào mất khi worker chết
+        current[worker_id] = task_id
+        try:
+            with torch.inference_mode():
+                texts = run_vietocr_batch(model, imgs)
+            results.put((task_id, True, texts))
+        except Exception as e:
+            results.put((task_id, False, f"{type(e).__name__}: {e}"))
+
+
+class OCRWorkerPool:
+    def __init__(
+        self,
+        model,
+        num_workers: int,
+        threads_per_worker: int = None,
+        task_timeout_s: float = 60.0,
+        max_respawns: int = 3,
+        health_check_s: float = 0.5,
+    ):
+        import multiprocessing
+
+        self.num_workers = max(1, int(num_workers))
+        cpu = os.cpu_count() or 1
+        self.threads_per_worker = max(1, int(threads_per_worker or cpu // self.num_workers))
+
+        # Weights -> shared memory, các worker fork ra map cùng 1 vùng nhớ
+        model.model.eval()
+        model.model.share_memory()
+
+        self.task_timeout_s = float(task_timeout_s)
+        self.max_respawns = max(0, int(max_respawns))
+        self.health_check_s = float(health_check_s)
+
+        self._model = model
+        self._ctx = multiprocessing.get_context("fork")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # task_id đang chạy trên từng worker (_IDLE nếu chưa nhận batch nào)
+        self._current = self._ctx.Array("q", [_IDLE] * self.num_workers, lock=False)
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._ready_count = 0
+        self._worker_pids = {}
+        self._completed = 0
+        self._failed = 0
+        self._respawns = 0
+        self._lost = set()   # worker chết và không được fork lại
+        self._error = None
+        self._closed = False
+        self._started_at = time.perf_counter()
+
+        self._processes = [self._spawn(i) for i in range(self.num_workers)]
+
+        self._collector = threading.Thread(target=self._collect, name="ocr-pool-collector", daemon=True)
+        self._collector.start()
+
+    # =========================
+    # Public APIs
+    # =========================
+
+    def submit_batch(self, imgs: List[Any]) -> Future:
+        return self._submit(next(self._ids), imgs)
+
+    def run_batch(self, imgs: List[Any], timeout: Optional[float] = None) -> List[str]:
+        """Chờ kết quả tối đa `timeout` giây (mặc định task_timeout_s), quá hạn -> TimeoutError."""
+        if self._error is not None:
+            raise RuntimeError(f"OCR worker pool unhealthy: {self._error}")
+        timeout = self.task_timeout_s if timeout is None else timeout
+        task_id = next(self._ids)
+        fut = self._submit(task_id, imgs)
+        try:
+            return fut.result(timeout=timeout)
+        except FuturesTimeout:
+            # kết quả đến muộn sẽ bị bỏ qua
+            with self._lock:
+                self._pending.pop(task_id, None)
+                self._failed += 1
+            raise TimeoutError(f"OCR worker pool: batch quá {timeout:g}s")
+
+    def wait_ready(self, timeout: Optional[float] = 120.0) -> bool:
+        """True khi mọi worker đã sẵn sàng; False nếu quá `timeout` giây hoặc có worker chết."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready.wait(self.health_check_s):
+            if self._error is not None or (deadline is not None and time.monotonic() >= deadline):
+                return False
+        return True
+
+    def healthy(self) -> bool:
+        return self._error is None and self._ready.is_set()
+
+    def shutdown(self):
+        self._closed = True
+        for _ in self._processes:
+            self._tasks.put(_STOP)
+        for p in self._processes:
+            p.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._lock:
+            uptime = time.perf_counter() - self._started_at
+            return {
+                "workers": self.num_workers,
+                "threads_per_worker": self.threads_per_worker,
+                "alive": sum(p.is_alive() for p in self._processes),
+                "healthy": self._error is None,
+                "error": self._error,
+                "respawns": self._respawns,
+                "worker_pids": [self._worker_pids.get(i) for i in range(self.num_workers)],
+                "pending_batches": len(self._pending),
+                "completed_batches": self._completed,
+                "failed_batches": self._failed,
+                "batches_per_s": self._completed / uptime if uptime > 0 else 0.0,
+            }
+
+    def _submit(self, task_id: int, imgs: List[Any]) -> Future:
+        fut = Future()
+        with self._lock:
+            self._pending[task_id] = fut
+        self._tasks.put((task_id, list(imgs)))
+        return fut
+
+    def _spawn(self, worker_id: int):
+        p = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._model, self._tasks, self._results, self._current, self.threads_per_worker),
+            name=f"ocr-worker-{worker_id}",
+            daemon=True,
+        )
+        p.start()
+        return p
+
+    # =========================
+    # Collector
+    # =========================
+
+    def _collect(self):
+        while not self._closed:
+            try:
+                self._handle(self._results.get(timeout=self.health_check_s))
+            except queue.Empty:
+                pass
+            self._check_workers()
+
+    def _handle(self, message):
+        if message[0] == "ready":
+            _, worker_id, pid = message
+            with self._lock:
+                if worker_id not in self._worker_pids:
+                    self._ready_count += 1
+                self._worker_pids[worker_id] = pid
+                if self._ready_count == self.num_workers:
+                    self._ready.set()
+            return
+
+        task_id, ok, payload = message
+
+        with self._lock:
+            fut = self._pending.pop(task_id, None)
+            self._completed += 1
+        if fut is None:
+            return
+        if ok:
+            fut.set_result(payload)
+        else:
+            fut.set_exception(RuntimeError(payload))
+
+    def _check_workers(self):
+        dead = [i for i, p in enumerate(self._processes) if i not in self._lost and not p.is_alive()]
+        if not dead or self._closed:
+            return
+        # kết quả worker gửi trước khi chết có thể còn trong queue
+        while True:
+            try:
+                self._handle(self._results.get_nowait())
+            except queue.Empty:
+                break
+
+        for i in dead:
+            p = self._processes[i]
+            p.join(timeout=0)
+            task_id = self._current[i]
+            self._current[i] = _IDLE
+            with self._lock:
+                fut = self._pending.pop(task_id, None)
+                if fut is not None:
+                    self._failed += 1
+            reason = f"ocr-worker-{i} (pid {p.pid}) chết, exitcode {p.exitcode}"
+            print(f"❌ {reason}", flush=True)
+            if fut is not None:
+                fut.set_exception(WorkerDied(reason))
+
+            if self._respawns >= self.max_respawns:
+                # không fork lại nữa: /readyz báo unhealthy, run_batch từ chối batch mới
+                self._error = f"{reason}; đã fork lại {self._respawns} lần"
+                self._lost.add(i)
+                continue
+            self._respawns += 1
+            self._processes[i] = self._spawn(i)
+            print(f"🔁 Fork lại ocr-worker-{i} (lần {self._respawns}/{self.max_respawns})", flush=True)
+
+        if not any(p.is_alive() for p in self._processes):
+            # không còn worker nào lấy batch trong queue
+            self._fail_pending(WorkerDied(self._error or "không còn OCR worker nào"))
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._failed += len(pending)
+        for fut in pending.values():
+            fut.set_exception(error)
@@ -0,0 +1,109 @@
+# coding: utf-8
+"""
+Micro-benchmark chấm đáp án ca dao: cách cũ (NFD + 8 lần replace cho cả 2 phía mỗi lần so)
+so với answer_matching (bảng translate + AnswerKey tính sẵn + Levenshtein có ngưỡng).
+
+Sinh N câu trả lời từ CSV ca dao: đúng, đúng nhưng thiếu dấu, sai 1 lỗi gõ, sai hẳn.
+Kiểm tra 2 cách cho cùng kết quả ở các trường hợp exact / thiếu dấu, báo số câu / giây.
+
+Chạy từ thư mục project/python-server:
+    python benchmarks/bench_answer_matching.py --n 20000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.answer_matching import AnswerKey, match_answer, strip_diacritics  # noqa: E402
+from app.services.practice_service import CSV_PATH  # noqa: E402
+from app.services.question_bank import read_ca_dao_rows  # noqa: E402
+
+
+def _old_remove_diacritics(text: str) -> str:
+    nfkd_form = unicodedata.normalize('NFD', text)
+    only_ascii = ''.join(c for c in nfkd_form if not unicodedata.combining(c))
+    replacements = {
+        'đ': 'd', 'Đ': 'D', 'ă': 'a', 'Ă': 'A', 'â': 'a', 'Â': 'A', 'ê': 'e', 'Ê': 'E',
+        'ô': 'o', 'Ô': 'O', 'ơ': 'o', 'Ơ': 'O', 'ư': 'u', 'Ư': 'U',
+    }
+    for viet, ascii_char in replacements.items():
+        only_ascii = only_ascii.replace(viet, ascii_char)
+    return only_ascii
+
+
+def _old_normalize(answer: str) -> str:
+    if not answer:
+        return ""
+    return re.sub(r'\s+', ' ', answer.lower().strip())
+
+
+def old_check(correct_answer: str, user_answer: str) -> str:
+    normalized_correct = _old_normalize(correct_answer)
+    normalized_user = _old_normalize(user_answer)
+    if normalized_user == normalized_correct:
+        return "exact"
+    if _old_remove_diacritics(normalized_user) == _old_remove_diacritics(normalized_correct):
+        return "no_diacritics"
+    return "wrong"
+
+
+def make_answers(answers, n: int, seed: int):
+    rng = random.Random(seed)
+    letters = "abcdeghiklmnopqrstuvxy"
+    out = []
+    for _ in range(n):
+        correct = rng.choice(answers)
+        kind = rng.random()
+        if kind < 0.5:
+            user = correct if rng.random() < 0.8 else f"  {correct.upper()} "
+        elif kind < 0.7:
+            user = strip_diacritics(correct)
+        elif kind < 0.85 and len(correct) > 1:
+            i = rng.randrange(len(correct))
+            user = correct[:i] + rng.choice(letters) + correct[i + 1:]
+        else:
+            user = rng.choice(answers)
+        out.append((correct, user))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--max-typos", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    answers = [r[1] for r in read_ca_dao_rows(CSV_PATH)]
+    keys = {a: AnswerKey.build(a) for a in answers}
+    pairs = make_answers(answers, args.n, args.seed)
+
+    t0 = time.perf_counter()
+    old = [old_check(c, u) for c, u in pairs]
+    old_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_strict = [match_answer(keys[c], u).kind for c, u in pairs]
+    new_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new_typo = [match_answer(keys[c], u, max_typos=args.max_typos).kind for c, u in pairs]
+    typo_s = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(old, new_strict))
+    print(f"{len(pairs)} câu trả lời, {len(keys)} đáp án khác nhau")
+    print(f"khác kết quả (cũ vs mới, không typo): {mismatches}")
+    for name, kinds, elapsed in (("cũ (NFD + replace)", old, old_s),
+                                 ("mới (translate + key)", new_strict, new_s),
+                                 (f"mới + typo<={args.max_typos}", new_typo, typo_s)):
+        counts = {k: kinds.count(k) for k in ("exact", "no_diacritics", "typo", "wrong")}
+        print(f"  {name:<24}{len(pairs) / elapsed:>12,.0f} câu/s   {counts}")
+
+
+if __name__ == "__main__":
+    main()
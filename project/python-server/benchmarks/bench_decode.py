@@ -0,0 +1,111 @@
+# coding: utf-8
+"""
+So sánh greedy decode gốc của vietocr (translate: chạy lại cả prefix mỗi bước)
+với translate_incremental (KV-cache + dừng từng sequence khi gặp EOS).
+
+Kiểm tra chuỗi output giống hệt nhau trên file annotation và báo thời gian / token
+(2 decoder chạy trên cùng các batch gom đúng chiều rộng, không pad).
+
+Với --bucket-width > 0: chạy thêm translate_incremental trên batch đã pad theo bucket
+(như OCR_BUCKET_WIDTH > 0 khi serve) và so với kết quả không pad: số chuỗi giống hệt và
+CER (so với nhãn) của padded vs unpadded.
+
+Chạy từ thư mục project/python-server:
+    python benchmarks/bench_decode.py --image-root /path/to/data --limit 500
+    python benchmarks/bench_decode.py --image-root /path/to/data --limit 500 --bucket-width 32
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from eval_engines import REPO_ROOT, cer, load_samples  # noqa: E402
+from app.services.bucketing import pad_batch, plan_buckets  # noqa: E402
+from app.services.fast_decode import translate_incremental  # noqa: E402
+from app.services.models import init_model  # noqa: E402
+from app.services.vietocr_service import OCR_BUCKET_WIDTH, preprocess_image, vietocr_input_size  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--annotation", type=Path, default=REPO_ROOT / "vietocr_test_annotation.txt")
+    parser.add_argument("--image-root", type=Path, default=REPO_ROOT)
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--engine", default="eager")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--bucket-width", type=int, default=OCR_BUCKET_WIDTH or 32, help="0 = bỏ qua phần so với batch đã pad")
+    args = parser.parse_args()
+
+    from vietocr.tool.translate import process_input, translate
+
+    model = init_model(args.weights, args.engine)
+    size = vietocr_input_size(model)
+    samples = load_samples(args.annotation, args.image_root, args.limit)
+    tensors = [process_input(preprocess_image(model, p.read_bytes()), *size) for p, _ in samples]
+
+    widths = [t.shape[-1] for t in tensors]
+    labels = [label for _, label in samples]
+
+    def batches_for(bucket_width):
+        # gom theo bucket chiều rộng như run_vietocr_batch
+        out = []
+        for idx in plan_buckets(widths, bucket_width, args.batch_size):
+            batch, efficiency = pad_batch([tensors[i] for i in idx])
+            out.append((idx, batch.to(model.device), efficiency))
+        return out
+
+    exact = batches_for(0)
+    translate(exact[0][1][:1], model.model)  # warm-up
+
+    old_texts, old_tokens, old_time = [""] * len(tensors), 0, 0.0
+    new_texts, new_stats = [""] * len(tensors), {}
+    new_time = 0.0
+    for idx, batch, _ in exact:
+        t0 = time.perf_counter()
+        sent, _ = translate(batch, model.model)
+        old_time += time.perf_counter() - t0
+        old_tokens += sent.shape[0] * (sent.shape[1] - 1)
+        for i, text in zip(idx, model.vocab.batch_decode(sent.tolist())):
+            old_texts[i] = text
+
+        t0 = time.perf_counter()
+        sent, _ = translate_incremental(batch, model.model, stats=new_stats)
+        new_time += time.perf_counter() - t0
+        for i, text in zip(idx, model.vocab.batch_decode(sent.tolist())):
+            new_texts[i] = text
+
+    mismatches = [(a, b) for a, b in zip(old_texts, new_texts) if a != b]
+    print(f"{len(old_texts)} images, {len(exact)} exact-width batches")
+    print(f"identical strings: {len(old_texts) - len(mismatches)}/{len(old_texts)}")
+    for a, b in mismatches[:10]:
+        print(f"  MISMATCH vietocr={a!r} incremental={b!r}")
+    print(f"vietocr translate   : {old_time:8.2f}s total, {old_time * 1000 / max(1, old_tokens):7.3f} ms/token ({old_tokens} tokens)")
+    print(f"incremental KV-cache: {new_time:8.2f}s total, "
+          f"{new_stats['decode_s'] * 1000 / max(1, new_stats['tokens']):7.3f} ms/token decode "
+          f"({new_stats['tokens']} tokens)")
+    print(f"speedup: {old_time / new_time:.2f}x")
+
+    if args.bucket_width > 0:
+        padded = batches_for(args.bucket_width)
+        padded_texts, padded_time = [""] * len(tensors), 0.0
+        for idx, batch, _ in padded:
+            t0 = time.perf_counter()
+            sent, _ = translate_incremental(batch, model.model, widths=[widths[i] for i in idx])
+            padded_time += time.perf_counter() - t0
+            for i, text in zip(idx, model.vocab.batch_decode(sent.tolist())):
+                padded_texts[i] = text
+        efficiencies = [e for _, _, e in padded]
+        same = sum(a == b for a, b in zip(new_texts, padded_texts))
+        cer_unpadded, cer_padded = cer(new_texts, labels), cer(padded_texts, labels)
+        print(f"\nbucket width {args.bucket_width}px: {len(padded)} batches, padding efficiency "
+              f"avg={sum(efficiencies) / len(efficiencies):.3f} min={min(efficiencies):.3f}")
+        print(f"padded vs unpadded identical strings: {same}/{len(tensors)}")
+        print(f"CER unpadded={cer_unpadded:.4f} padded={cer_padded:.4f} (delta {cer_padded - cer_unpadded:+.4f})")
+        print(f"time: unpadded {new_time:.2f}s, padded {padded_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
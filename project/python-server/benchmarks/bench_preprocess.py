@@ -0,0 +1,126 @@
+# coding: utf-8
+"""
+Micro-benchmark: pipeline preprocess cũ (PIL: crop_to_ink + upscale 2x +
+resize LANCZOS trong VietOCR) so với prepare_for_vietocr (decode 1 lần,
+bbox trên ảnh thu nhỏ, resize thẳng về chiều cao model).
+
+Chạy từ thư mục project/python-server:
+    python benchmarks/bench_preprocess.py --repeat 30
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.preprocess import (  # noqa: E402
+    crop_to_ink,
+    decode_image,
+    find_ink_bbox,
+    prepare_for_vietocr,
+    preprocess_for_vietocr,
+    target_width,
+)
+
+IMAGE_HEIGHT, MIN_W, MAX_W = 32, 32, 512
+
+
+def _draw_word(draw: ImageDraw.ImageDraw, x: int, y: int, scale: float, fill):
+    rng = np.random.default_rng(0)
+    pts = [(x, y)]
+    for _ in range(40):
+        px, py = pts[-1]
+        pts.append((px + int(rng.integers(2, 12) * scale), y + int(rng.normal(0, 25) * scale)))
+    draw.line(pts, fill=fill, width=max(2, int(6 * scale)))
+
+
+def make_samples() -> dict:
+    samples = {}
+
+    # Canvas DrawingBoard: PNG nền trong suốt
+    canvas = Image.new("RGBA", (800, 300), (0, 0, 0, 0))
+    _draw_word(ImageDraw.Draw(canvas), 150, 150, 1.0, (0, 0, 0, 255))
+    buf = io.BytesIO()
+    canvas.save(buf, format="PNG")
+    samples["canvas_png_800x300"] = buf.getvalue()
+
+    # Ảnh chụp điện thoại: JPEG 12MP, giấy hơi xám + nhiễu
+    rng = np.random.default_rng(1)
+    paper = np.clip(rng.normal(250, 2, (3024, 4032, 3)), 0, 255).astype(np.uint8)
+    photo = Image.fromarray(paper)
+    _draw_word(ImageDraw.Draw(photo), 1400, 1500, 4.0, (30, 30, 60))
+    buf = io.BytesIO()
+    photo.save(buf, format="JPEG", quality=90)
+    samples["photo_jpeg_4032x3024"] = buf.getvalue()
+
+    # Ảnh crop nhỏ đã có sẵn
+    small = Image.new("RGB", (300, 120), (255, 255, 255))
+    _draw_word(ImageDraw.Draw(small), 40, 60, 0.5, (0, 0, 0))
+    buf = io.BytesIO()
+    small.save(buf, format="PNG")
+    samples["word_png_300x120"] = buf.getvalue()
+    return samples
+
+
+def old_pipeline(data: bytes, timings: dict):
+    t0 = time.perf_counter()
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    t1 = time.perf_counter()
+    cropped = crop_to_ink(img, pad=25)
+    t2 = time.perf_counter()
+    up = preprocess_for_vietocr(cropped)  # crop lần 2 + upscale 2x như code cũ
+    t3 = time.perf_counter()
+    # resize mà vietocr.tool.translate.process_image làm bên trong Predictor
+    w, h = up.size
+    out = up.convert("RGB").resize((target_width(w, h, IMAGE_HEIGHT, MIN_W, MAX_W), IMAGE_HEIGHT), Image.LANCZOS)
+    t4 = time.perf_counter()
+    for k, v in (("decode", t1 - t0), ("crop", t2 - t1), ("upscale", t3 - t2), ("resize", t4 - t3), ("total", t4 - t0)):
+        timings.setdefault(k, []).append(v)
+    return out
+
+
+def new_pipeline(data: bytes, timings: dict):
+    t0 = time.perf_counter()
+    rgb = decode_image(data)
+    t1 = time.perf_counter()
+    find_ink_bbox(rgb)
+    t2 = time.perf_counter()
+    out = prepare_for_vietocr(data, IMAGE_HEIGHT, MIN_W, MAX_W)
+    t3 = time.perf_counter()
+    for k, v in (("decode", t1 - t0), ("bbox", t2 - t1), ("total", t3 - t2)):
+        timings.setdefault(k, []).append(v)
+    return out
+
+
+def _fmt(values) -> str:
+    values = sorted(values)
+    med = values[len(values) // 2]
+    return f"{med * 1000:8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for name, data in make_samples().items():
+        old_t, new_t = {}, {}
+        for _ in range(args.repeat):
+            old_out = old_pipeline(data, old_t)
+            new_out = new_pipeline(data, new_t)
+
+        print(f"\n== {name} ({len(data) / 1024:.0f} KiB) -> old {old_out.size}, new {new_out.size}")
+        print("  old (ms, median): " + "  ".join(f"{k}={_fmt(v)}" for k, v in old_t.items()))
+        print("  new (ms, median): " + "  ".join(f"{k}={_fmt(v)}" for k, v in new_t.items()))
+        speedup = sorted(old_t["total"])[len(old_t["total"]) // 2] / sorted(new_t["total"])[len(new_t["total"]) // 2]
+        print(f"  speedup total: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
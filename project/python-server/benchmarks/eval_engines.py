@@ -0,0 +1,157 @@
+# coding: utf-8
+"""
+So sánh các OCR engine (eager / torchscript / int8 / torchscript_int8) trên CPU:
+- độ chính xác: CER trên vietocr_test_annotation.txt và CER delta so với eager
+- tốc độ: latency 1 ảnh (median, p95) và throughput khi chạy batch
+- padding efficiency của batch theo bucket chiều rộng so với batch tuần tự
+
+Chạy từ thư mục project/python-server:
+    python benchmarks/eval_engines.py --image-root /path/to/data --limit 500
+(`--image-root` là thư mục chứa `vietocr_images/` được liệt kê trong file annotation)
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.bucketing import padding_efficiency, plan_buckets  # noqa: E402
+from app.services.models import init_model  # noqa: E402
+from app.services.ocr_engines import ENGINES  # noqa: E402
+from app.services.vietocr_service import (  # noqa: E402
+    OCR_BUCKET_WIDTH,
+    preprocess_image,
+    run_vietocr,
+    run_vietocr_batch,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def cer(preds, refs) -> float:
+    errors = sum(edit_distance(p, r) for p, r in zip(preds, refs))
+    return errors / max(1, sum(len(r) for r in refs))
+
+
+def load_samples(annotation: Path, image_root: Path, limit: int):
+    samples = []
+    with open(annotation, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rel, label = line.rstrip("\n").split("\t", 1)
+            samples.append((image_root / rel, label))
+            if limit and len(samples) >= limit:
+                break
+    return samples
+
+
+def evaluate(engine: str, samples, weights: str, batch_size: int, latency_n: int) -> dict:
+    model = init_model(weights, engine)
+    imgs = [preprocess_image(model, path.read_bytes()) for path, _ in samples]
+    refs = [label for _, label in samples]
+
+    # warm-up
+    run_vietocr(model, imgs[0])
+
+    latencies = []
+    for img in imgs[:latency_n]:
+        t0 = time.perf_counter()
+        run_vietocr(model, img)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    t0 = time.perf_counter()
+    preds = run_vietocr_batch(model, imgs, max_batch_size=batch_size)
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "engine": engine,
+        "n": len(imgs),
+        "cer": cer(preds, refs),
+        "latency_ms_p50": latencies[len(latencies) // 2] * 1000.0,
+        "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000.0,
+        "throughput_img_per_s": len(imgs) / elapsed,
+        "preds": preds,
+        "widths": [img.size[0] for img in imgs],
+    }
+
+
+def report_padding(samples_widths, batch_size: int, bucket_width: int):
+    """In padding efficiency theo batch: bucket chiều rộng vs chia batch tuần tự."""
+    naive = [
+        padding_efficiency(samples_widths[i:i + batch_size])
+        for i in range(0, len(samples_widths), batch_size)
+    ]
+    plan = plan_buckets(samples_widths, bucket_width, batch_size)
+    bucketed = [padding_efficiency([samples_widths[i] for i in idx]) for idx in plan]
+
+    def summary(values):
+        values = sorted(values)
+        return f"{len(values):4d} batches  avg={sum(values) / len(values):.3f}  min={values[0]:.3f}"
+
+    print(f"padding efficiency (real px / padded px), batch_size={batch_size}")
+    print(f"  sequential batches        : {summary(naive)}")
+    label = f"width {bucket_width:3d} px" if bucket_width > 0 else "exact width "
+    print(f"  bucketed ({label}) : {summary(bucketed)}")
+    for idx, eff in list(zip(plan, bucketed))[:20]:
+        widths = [samples_widths[i] for i in idx]
+        print(f"    batch n={len(idx):2d} widths {min(widths):3d}-{max(widths):3d}px  efficiency={eff:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--annotation", type=Path, default=REPO_ROOT / "vietocr_test_annotation.txt")
+    parser.add_argument("--image-root", type=Path, default=REPO_ROOT)
+    parser.add_argument("--weights", default=None, help="file .pth (mặc định: weights của vietocr)")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--latency-n", type=int, default=50)
+    parser.add_argument("--bucket-width", type=int, default=OCR_BUCKET_WIDTH)
+    parser.add_argument("--json", type=Path, default=None, help="lưu report ra file JSON")
+    args = parser.parse_args()
+
+    samples = load_samples(args.annotation, args.image_root, args.limit)
+    print(f"{len(samples)} samples từ {args.annotation}")
+
+    reports = [
+        evaluate(engine, samples, args.weights, args.batch_size, args.latency_n)
+        for engine in args.engines.split(",")
+    ]
+    base = reports[0]
+    report_padding(base["widths"], args.batch_size, args.bucket_width)
+
+    print(f"\n{'engine':<18}{'CER':>8}{'ΔCER':>9}{'agree':>8}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'speedup':>9}")
+    for r in reports:
+        agree = sum(a == b for a, b in zip(r["preds"], base["preds"])) / max(1, r["n"])
+        r["cer_delta"] = r["cer"] - base["cer"]
+        r["agreement_with_" + base["engine"]] = agree
+        r["speedup"] = r["throughput_img_per_s"] / base["throughput_img_per_s"]
+        print(f"{r['engine']:<18}{r['cer']:>8.4f}{r['cer_delta']:>+9.4f}{agree:>8.1%}"
+              f"{r['latency_ms_p50']:>9.1f}{r['latency_ms_p95']:>9.1f}"
+              f"{r['throughput_img_per_s']:>9.1f}{r['speedup']:>8.2f}x")
+
+    if args.json:
+        for r in reports:
+            r.pop("preds")
+            r.pop("widths")
+        args.json.write_text(json.dumps(reports, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# coding: utf-8
+"""
+Gemini REST giả lập cho load test / benchmark (không cần API key, không tốn quota).
+
+Hỗ trợ:
+- POST .../models/<model>:generateContent          -> JSON như Gemini
+- POST .../models/<model>:streamGenerateContent    -> SSE (alt=sse), mỗi chunk vài từ
+- GET  /stats                                      -> số request theo status
+
+Prompt chấm đời thường (các dòng `N. "câu hỏi" | Trả lời: "..."`) được trả lời bằng
+JSON array đúng format practice_service mong đợi; prompt khác nhận 1 đoạn text.
+Độ trễ, tỉ lệ lỗi 500 và tỉ lệ 429 cấu hình được; finishReason của câu trả lời
+(chunk cuối khi streaming) là `finish_reason` ("STOP", hoặc vd. "MAX_TOKENS" để giả lập output bị cắt).
+
+Chạy riêng:
+    python benchmarks/fake_gemini.py --port 8765 --latency-ms 300 --rate-429 0.05
+    GEMINI_ENDPOINT=http://127.0.0.1:8765/v1beta GEMINI_API_KEY=fake python app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GRADING_LINE = re.compile(r'^(\d+)\. "(.*?)" \| Trả lời: "(.*?)"', re.MULTILINE)
+WORDS = "xin chào bạn hôm nay trời đẹp quá chúng ta cùng học tiếng việt nhé".split()
+
+
+class FakeGemini:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        error_rate: float = 0.0,
+        rate_429: float = 0.0,
+        stream_chunk_ms: float = 50.0,
+        seed: int = 0,
+        finish_reason: str = "STOP",
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.stream_chunk_ms = stream_chunk_ms
+        self.finish_reason = finish_reason
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.server = None
+
+    # =========================
+    # Nội dung trả về
+    # =========================
+
+    def _roll(self):
+        with self._lock:
+            return self._rng.random(), self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    @staticmethod
+    def answer(prompt: str) -> str:
+        items = GRADING_LINE.findall(prompt)
+        if items:
+            return json.dumps([
+                {
+                    "id": int(idx),
+                    # câu trả lời rất ngắn / có số coi như sai để có cả 2 loại verdict
+                    "is_correct": len(ans.strip()) > 1 and not any(c.isdigit() for c in ans),
+                    "explanation": f"Từ \"{ans}\" {'phù hợp' if len(ans.strip()) > 1 else 'không phù hợp'} với câu.",
+                }
+                for idx, _, ans in items
+            ], ensure_ascii=False)
+        n = 20 + len(prompt) % 40
+        return " ".join(WORDS[(i * 7 + len(prompt)) % len(WORDS)] for i in range(n))
+
+    # =========================
+    # HTTP server
+    # =========================
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.startswith("/stats"):
+                    with fake._lock:
+                        body = json.dumps(fake.counts).encode()
+                    self._send(200, body)
+                else:
+                    self._send(404, b"{}")
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                try:
+                    prompt = json.loads(raw)["contents"][0]["parts"][0]["text"]
+                except (ValueError, KeyError, IndexError):
+                    fake._count("400")
+                    self._send(400, b'{"error": {"message": "bad request"}}')
+                    return
+
+                roll, jitter = fake._roll()
+                if roll < fake.rate_429:
+                    fake._count("429")
+                    self._send(429, b'{"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}',
+                               headers={"Retry-After": "1"})
+                    return
+                if roll < fake.rate_429 + fake.error_rate:
+                    time.sleep(max(0.0, fake.latency_ms + jitter) / 1000.0)
+                    fake._count("500")
+                    self._send(500, b'{"error": {"code": 500, "status": "INTERNAL"}}')
+                    return
+
+                text = fake.answer(prompt)
+                if ":streamGenerateContent" in self.path:
+                    fake._count("200_stream")
+                    self._stream(text, max(0.0, fake.latency_ms / 2 + jitter) / 1000.0)
+                    return
+
+                time.sleep(max(0.0, fake.latency_ms + jitter) / 1000.0)
+                fake._count("200")
+                body = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"},
+                                        "finishReason": fake.finish_reason}]}
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+            def _stream(self, text: str, first_delay_s: float):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                time.sleep(first_delay_s)
+                words = text.split(" ")
+                for i in range(0, len(words), 4):
+                    piece = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+                    candidate = {"content": {"parts": [{"text": piece}], "role": "model"}}
+                    if i + 4 >= len(words):
+                        candidate["finishReason"] = fake.finish_reason
+                    event = {"candidates": [candidate]}
+                    data = ("data: " + json.dumps(event, ensure_ascii=False) + "\r\n\r\n").encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                    time.sleep(fake.stream_chunk_ms / 1000.0)
+                self.wfile.write(b"0\r\n\r\n")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="fake-gemini", daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/v1beta"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeGemini(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_429)
+    endpoint = fake.start(args.host, args.port)
+    print(f"Fake Gemini: GEMINI_ENDPOINT={endpoint}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# coding: utf-8
+"""
+Load test end-to-end cho python-server với Gemini giả lập (benchmarks/fake_gemini.py).
+
+- chạy create_app() thật trong waitress (như serve.py) trên 1 port local
+- Gemini được thay bằng FakeGemini (độ trễ / tỉ lệ lỗi 500 / tỉ lệ 429 cấu hình được)
+- mỗi mức concurrency: N client chạy vòng kín trong `--duration` giây, chọn ngẫu nhiên
+  scenario theo `--mix`: /predict (ảnh chữ viết tay giả lập), /practice/questions,
+  /practice/check-batch, /llm/generate
+- báo RPS, latency p50 / p95 / p99, tỉ lệ lỗi và tỉ lệ 503 (bulkhead đầy) theo scenario
+- lưu JSON (`--out`) và so sánh với baseline cũ (`--baseline`) để thấy regression
+
+Chạy từ thư mục project/python-server:
+    python benchmarks/load_test.py --levels 1,8,32 --duration 10 --out benchmarks/baselines/local.json
+    python benchmarks/load_test.py --levels 1,8,32 --duration 10 --baseline benchmarks/baselines/local.json
+(`--skip-ocr` nếu máy không có weights VietOCR)
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_gemini import FakeGemini  # noqa: E402
+
+COMMON_ANSWERS = ["nắng", "ăn", "đọc", "học", "chơi", "uống", "ngủ", "đẹp", "xem", "nấu", "sống", "giảng", "đi", "mặc", "nói"]
+PROMPTS = [
+    "Giải thích nghĩa câu tục ngữ: Uống nước nhớ nguồn",
+    "Đặt 1 câu với từ 'chăm chỉ'",
+    "Kể tên 3 loại trái cây ở Việt Nam",
+    "Viết 1 câu chào buổi sáng bằng tiếng Việt",
+]
+
+
+# =========================
+# Dữ liệu giả lập
+# =========================
+
+def make_handwriting_images(n: int, seed: int = 0) -> list:
+    """PNG nền trong suốt giống canvas DrawingBoard, nét bút ngẫu nhiên, chiều rộng khác nhau."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        w, h = int(rng.integers(300, 900)), int(rng.integers(150, 300))
+        canvas = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(canvas)
+        x = int(rng.integers(20, 60))
+        while x < w - 80:
+            pts = [(x, h // 2)]
+            for _ in range(int(rng.integers(6, 16))):
+                px, _ = pts[-1]
+                pts.append((px + int(rng.integers(3, 10)), h // 2 + int(rng.normal(0, h / 8))))
+            draw.line(pts, fill=(0, 0, 0, 255), width=int(rng.integers(3, 8)))
+            x = pts[-1][0] + int(rng.integers(15, 40))
+        buf = io.BytesIO()
+        canvas.save(buf, format="PNG")
+        images.append(buf.getvalue())
+    return images
+
+
+class Scenarios:
+    def __init__(self, base_url: str, images: list, rare_answer_rate: float):
+        self.base_url = base_url
+        self.images = images
+        self.rare_answer_rate = rare_answer_rate
+        self.question_sets = []
+
+    def prime(self, session: requests.Session, n: int = 20):
+        """Lấy vài bộ câu hỏi thật từ /practice/questions để dựng payload check-batch."""
+        for _ in range(n):
+            res = session.get(f"{self.base_url}/practice/questions", timeout=30)
+            res.raise_for_status()
+            self.question_sets.append(res.json()["questions"])
+
+    def predict(self, session, rng):
+        img = self.images[rng.randrange(len(self.images))]
+        return session.post(f"{self.base_url}/predict", files={"image": ("canvas.png", img, "image/png")}, timeout=60)
+
+    def questions(self, session, rng):
+        return session.get(f"{self.base_url}/practice/questions", timeout=30)
+
+    def check_batch(self, session, rng):
+        answers = []
+        for q in self.question_sets[rng.randrange(len(self.question_sets))]:
+            if q["type"] == "ca_dao":
+                user_answer = q["answer"] if rng.random() < 0.7 else rng.choice(COMMON_ANSWERS)
+                answers.append({**q, "user_answer": user_answer, "correct_answer": q["answer"]})
+            else:
+                if rng.random() < self.rare_answer_rate:
+                    user_answer = f"từ{rng.randrange(10 ** 6)}"
+                else:
+                    user_answer = rng.choice(COMMON_ANSWERS)
+                answers.append({**q, "user_answer": user_answer})
+        return session.post(f"{self.base_url}/practice/check-batch", json={"answers": answers}, timeout=90)
+
+    def generate(self, session, rng):
+        return session.post(
+            f"{self.base_url}/llm/generate",
+            json={"prompt": rng.choice(PROMPTS), "max_new_tokens": 128},
+            timeout=90,
+        )
+
+
+# =========================
+# Chạy tải
+# =========================
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    arr = np.asarray(values) * 1000.0
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "max": float(arr.max()),
+    }
+
+
+def run_level(scenarios: Scenarios, mix: dict, concurrency: int, duration: float, seed: int) -> dict:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    records = {n: [] for n in names}  # (latency_s, status)
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(idx: int):
+        rng = random.Random(seed * 1000 + idx)
+        session = requests.Session()
+        local = {n: [] for n in names}
+        while time.perf_counter() < stop_at:
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                status = getattr(scenarios, name)(session, rng).status_code
+            except requests.RequestException:
+                status = 0
+            local[name].append((time.perf_counter() - t0, status))
+        with lock:
+            for n in names:
+                records[n].extend(local[n])
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    def summarize(recs):
+        ok = [lat for lat, st in recs if 200 <= st < 400]
+        busy = sum(1 for _, st in recs if st == 503)
+        errors = sum(1 for _, st in recs if not (200 <= st < 400) and st != 503)
+        return {
+            "requests": len(recs),
+            "rps": len(ok) / elapsed,
+            "error_rate": errors / len(recs) if recs else 0.0,
+            "busy_rate": busy / len(recs) if recs else 0.0,
+            "latency_ms": _percentiles(ok),
+        }
+
+    result = {"concurrency": concurrency, "elapsed_s": elapsed, "scenarios": {}}
+    for n in names:
+        result["scenarios"][n] = summarize(records[n])
+    result["total"] = summarize([r for n in names for r in records[n]])
+    return result
+
+
+def print_level(level: dict):
+    print(f"\nconcurrency={level['concurrency']}  ({level['elapsed_s']:.1f}s)")
+    print(f"  {'scenario':<14}{'n':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err':>8}{'503':>8}")
+    for name, s in list(level["scenarios"].items()) + [("TOTAL", level["total"])]:
+        lat = s["latency_ms"]
+
+        def fmt(v):
+            return f"{v:>10.1f}" if v is not None else f"{'-':>10}"
+        print(f"  {name:<14}{s['requests']:>7}{s['rps']:>9.1f}{fmt(lat['p50'])}{fmt(lat['p95'])}{fmt(lat['p99'])}"
+              f"{s['error_rate']:>8.1%}{s['busy_rate']:>8.1%}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """So với baseline: p95 tăng / rps giảm quá `tolerance`, hoặc error rate tăng > 1 điểm %."""
+    regressions = []
+    old_levels = {lv["concurrency"]: lv for lv in baseline.get("levels", [])}
+    for level in report["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        for name, cur in list(level["scenarios"].items()) + [("TOTAL", level["total"])]:
+            prev = old["total"] if name == "TOTAL" else old["scenarios"].get(name)
+            if not prev or not prev["requests"] or not cur["requests"]:
+                continue
+            tag = f"c={level['concurrency']} {name}"
+            p95, old_p95 = cur["latency_ms"]["p95"], prev["latency_ms"]["p95"]
+            if p95 is not None and old_p95 and p95 > old_p95 * (1 + tolerance):
+                regressions.append(f"{tag}: p95 {old_p95:.1f} -> {p95:.1f} ms")
+            if prev["rps"] > 0 and cur["rps"] < prev["rps"] * (1 - tolerance):
+                regressions.append(f"{tag}: rps {prev['rps']:.1f} -> {cur['rps']:.1f}")
+            if cur["error_rate"] > prev["error_rate"] + 0.01:
+                regressions.append(f"{tag}: error rate {prev['error_rate']:.1%} -> {cur['error_rate']:.1%}")
+    return regressions
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", default="1,4,16,32", help="các mức concurrency, cách nhau bởi dấu phẩy")
+    parser.add_argument("--duration", type=float, default=10.0, help="số giây mỗi mức")
+    parser.add_argument("--mix", default="predict=3,questions=2,check_batch=4,generate=1")
+    parser.add_argument("--skip-ocr", action="store_true", help="bỏ /predict (không load VietOCR)")
+    parser.add_argument("--images", type=int, default=200, help="số ảnh giả lập khác nhau cho /predict")
+    parser.add_argument("--rare-answer-rate", type=float, default=0.1,
+                        help="tỉ lệ câu trả lời đời thường lạ (buộc phải gọi LLM)")
+    parser.add_argument("--fake-latency-ms", type=float, default=300.0)
+    parser.add_argument("--fake-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-429-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=0, help="GEMINI_RPM của server (0 = không giới hạn)")
+    parser.add_argument("--tpm", type=float, default=0, help="GEMINI_TPM của server (0 = không giới hạn)")
+    parser.add_argument("--threads", type=int, default=64, help="số thread của waitress")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="lưu report JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="report JSON cũ để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    if args.skip_ocr:
+        mix.pop("predict", None)
+
+    fake = FakeGemini(args.fake_latency_ms, args.fake_jitter_ms, args.fake_error_rate, args.fake_429_rate, seed=args.seed)
+    # Cấu hình phải có trước khi import app (đọc env lúc import); cache trên đĩa tắt để các lần chạy so sánh được
+    os.environ.update({
+        "GEMINI_ENDPOINT": fake.start(),
+        "GEMINI_API_KEY": "fake-key",
+        "LLM_CACHE_PATH": "",
+        "VERDICT_STORE_PATH": "",
+        "GEMINI_RPM": str(args.rpm),
+        "GEMINI_TPM": str(args.tpm),
+    })
+
+    from waitress.server import create_server
+    from app import create_app
+
+    server = create_server(create_app(), host="127.0.0.1", port=0, threads=args.threads)
+    threading.Thread(target=server.run, name="waitress", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.effective_port}"
+
+    session = requests.Session()
+    if "predict" in mix:
+        print("⏳ Chờ VietOCR sẵn sàng (/readyz)...")
+        deadline = time.time() + 600
+        while session.get(f"{base_url}/readyz", timeout=10).status_code != 200:
+            if time.time() > deadline:
+                raise SystemExit("VietOCR chưa sẵn sàng sau 600s (dùng --skip-ocr?)")
+            time.sleep(1)
+
+    scenarios = Scenarios(base_url, make_handwriting_images(args.images, args.seed), args.rare_answer_rate)
+    scenarios.prime(session)
+
+    report = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "mix": mix,
+        },
+        "levels": [],
+    }
+    for concurrency in [int(c) for c in args.levels.split(",")]:
+        level = run_level(scenarios, mix, concurrency, args.duration, args.seed)
+        print_level(level)
+        report["levels"].append(level)
+
+    report["fake_gemini"] = dict(fake.counts)
+    report["server_stats"] = {
+        "llm": session.get(f"{base_url}/llm/info", timeout=10).json(),
+        "practice": session.get(f"{base_url}/practice/stats", timeout=10).json(),
+    }
+    print(f"\nfake Gemini requests: {report['fake_gemini']}")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Đã lưu {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"\nSo với baseline {args.baseline} ({baseline['meta'].get('git_rev')}):")
+        for r in regressions:
+            print(f"  ⚠️ {r}")
+        if not regressions:
+            print("  ✅ không có regression")
+        server.close()
+        fake.stop()
+        sys.exit(1 if regressions else 0)
+
+    server.close()
+    fake.stop()
+
+
+if __name__ == "__main__":
+    main()
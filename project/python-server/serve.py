@@ -0,0 +1,30 @@
+"""
+Production entrypoint: chạy app bằng waitress (WSGI đa luồng) thay vì dev server.
+
+Các request LLM chờ Gemini (I/O) nên cần nhiều thread; số request đồng thời cho
+từng loại công việc được giới hạn bởi bulkhead (app/services/bulkhead.py), còn
+inference OCR luôn chạy trên thread batcher / worker process riêng.
+
+    python serve.py            # SERVER_THREADS=64, PORT=5000
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    serve(
+        app,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "5000")),
+        threads=int(os.environ.get("SERVER_THREADS", "64")),
+        connection_limit=int(os.environ.get("SERVER_CONNECTION_LIMIT", "1000")),
+        channel_timeout=int(os.environ.get("SERVER_CHANNEL_TIMEOUT", "120")),
+    )
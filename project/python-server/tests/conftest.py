@@ -0,0 +1,31 @@
+# coding: utf-8
+"""Fixture dùng chung: Gemini giả lập (benchmarks/fake_gemini.py), không cần API key."""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+# env được đọc lúc import: không ghi cache / verdict ra đĩa khi chạy test
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("VERDICT_STORE_PATH", "")
+
+from fake_gemini import FakeGemini  # noqa: E402
+from app.services import vinallama_service  # noqa: E402
+from app.services.llm_cache import LLMResponseCache  # noqa: E402
+from app.services.rate_limiter import QuotaRateLimiter  # noqa: E402
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    fake = FakeGemini(latency_ms=0, jitter_ms=0, stream_chunk_ms=0)
+    endpoint = fake.start()
+    monkeypatch.setattr(vinallama_service, "_ENDPOINT", endpoint)
+    monkeypatch.setattr(vinallama_service, "GEMINI_API_KEY", "fake")
+    monkeypatch.setattr(vinallama_service, "_cache", LLMResponseCache(path=None))
+    monkeypatch.setattr(vinallama_service, "_limiter", QuotaRateLimiter(rpm=0, tpm=0))
+    yield fake
+    fake.stop()
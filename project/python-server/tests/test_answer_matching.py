@@ -0,0 +1,71 @@
+# coding: utf-8
+"""
+bounded_levenshtein (cắt ở k + 1) và chấm ca dao: lỗi gõ chỉ được chấp nhận khi bật
+ANSWER_MAX_TYPOS (mặc định 0).
+
+    python -m pytest -q tests
+"""
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.services import practice_service
+from app.services.answer_matching import bounded_levenshtein
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i]
+        for j, cb in enumerate(b, start=1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+@pytest.mark.parametrize("a, b, k, expected", [
+    ("kitten", "sitting", 3, 3),
+    ("kitten", "sitting", 2, 3),      # khoảng cách thật 3 > k -> k + 1
+    ("con co", "con co", 0, 0),
+    ("con co", "con cp", 0, 1),
+    ("", "ab", 1, 2),
+    ("ab", "abcdef", 2, 3),           # chênh độ dài > k -> cắt ngay
+])
+def test_bound_cutoff(a, b, k, expected):
+    assert bounded_levenshtein(a, b, k) == expected
+    assert bounded_levenshtein(b, a, k) == expected
+
+
+def test_matches_full_levenshtein_within_the_bound():
+    rng = random.Random(0)
+    for _ in range(2000):
+        a = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 8)))
+        k = rng.randint(0, 3)
+        assert bounded_levenshtein(a, b, k) == min(_levenshtein(a, b), k + 1)
+
+
+def test_typos_are_rejected_unless_enabled(monkeypatch):
+    monkeypatch.setattr(practice_service, "ANSWER_MAX_TYPOS", 0)
+    assert practice_service.check_ca_dao_answer("con cò", "con cp")[0] is False
+    assert practice_service.check_ca_dao_answer("con cò", "con co")[0] is True
+
+    monkeypatch.setattr(practice_service, "ANSWER_MAX_TYPOS", 1)
+    ok, message = practice_service.check_ca_dao_answer("con cò", "con cp")
+    assert ok is True and message.startswith("Gần đúng")
+
+
+def test_answer_max_typos_defaults_to_zero():
+    env = {k: v for k, v in os.environ.items() if k != "ANSWER_MAX_TYPOS"}
+    env.update(LLM_CACHE_PATH="", VERDICT_STORE_PATH="")
+    out = subprocess.run(
+        [sys.executable, "-c", "from app.services import practice_service as p; print(p.ANSWER_MAX_TYPOS)"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60, check=True,
+    ).stdout
+    assert out.strip().splitlines()[-1] == "0"
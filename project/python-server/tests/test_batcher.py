@@ -0,0 +1,61 @@
+# coding: utf-8
+"""
+MicroBatcher: batch được chạy khi đủ max_batch_size hoặc hết max_wait_ms,
+và lỗi của run_batch đến được Future của mọi item trong batch.
+
+    python -m pytest -q tests
+"""
+import time
+
+import pytest
+
+from app.services.batcher import MicroBatcher
+
+
+def _recording(fn=None):
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        return fn(items) if fn else [x * 2 for x in items]
+    return run_batch, batches
+
+
+def test_flushes_as_soon_as_the_batch_is_full():
+    run_batch, batches = _recording()
+    batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=10000, name="test-full").start()
+
+    t0 = time.perf_counter()
+    futures = [batcher.submit(i) for i in range(4)]
+
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6]
+    assert time.perf_counter() - t0 < 2
+    assert batches == [[0, 1, 2, 3]]
+
+
+def test_flushes_a_partial_batch_after_max_wait():
+    run_batch, batches = _recording()
+    batcher = MicroBatcher(run_batch, max_batch_size=100, max_wait_ms=100, name="test-wait").start()
+
+    t0 = time.perf_counter()
+    futures = [batcher.submit(i) for i in range(3)]
+
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4]
+    assert time.perf_counter() - t0 >= 0.09
+    assert batches == [[0, 1, 2]]
+
+
+def test_run_batch_exception_reaches_every_future():
+    def boom(items):
+        raise RuntimeError("forward lỗi")
+
+    run_batch, batches = _recording(boom)
+    batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=10000, name="test-error").start()
+
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="forward lỗi"):
+            fut.result(timeout=2)
+    assert batches == [[0, 1, 2]]
+    assert batcher.stats()["total_errors"] == 3
@@ -0,0 +1,60 @@
+# coding: utf-8
+"""
+IncrementalJSONArrayParser: object trong array được trả về ngay khi đóng ngoặc,
+bất kể output của LLM bị chia thành chunk ở đâu.
+
+    python -m pytest -q tests
+"""
+import json
+
+from app.services.json_stream import IncrementalJSONArrayParser
+
+ITEMS = [
+    {"id": 1, "is_correct": True, "explanation": "Đúng, \"nắng\" hợp ngữ cảnh {thời tiết}]"},
+    {"id": 2, "is_correct": False, "explanation": "Sai: [thiếu] dấu \\ và }"},
+]
+TEXT = "```json\n" + json.dumps(ITEMS, ensure_ascii=False) + "\n```"
+
+
+def _feed_all(parser, chunks):
+    out = []
+    for chunk in chunks:
+        out.extend(parser.feed(chunk))
+    return out
+
+
+def test_every_chunk_split_gives_the_same_objects():
+    for size in (1, 2, 3, 7, len(TEXT)):
+        parser = IncrementalJSONArrayParser()
+        chunks = [TEXT[i:i + size] for i in range(0, len(TEXT), size)]
+        assert _feed_all(parser, chunks) == ITEMS
+        assert parser.finished
+
+
+def test_brackets_and_escaped_quotes_inside_strings():
+    parser = IncrementalJSONArrayParser()
+    text = json.dumps(ITEMS, ensure_ascii=False)
+    split = text.index("{thời") + 1  # cắt ngay sau "{" nằm trong string
+    assert parser.feed(text[:split]) == []
+    assert parser.feed(text[split:]) == ITEMS
+    assert parser.skipped == 0
+
+
+def test_truncated_trailing_object_is_dropped():
+    parser = IncrementalJSONArrayParser()
+    text = json.dumps(ITEMS, ensure_ascii=False)
+    cut = text[:text.index('"id": 2') + 12]
+    assert parser.feed(cut) == ITEMS[:1]
+    assert parser.started
+    assert not parser.finished
+    assert parser.items == 1
+
+
+def test_finished_ignores_text_after_closing_bracket():
+    parser = IncrementalJSONArrayParser()
+    assert not parser.started
+    assert parser.feed("Kết quả: ") == []
+    assert not parser.started
+    assert parser.feed('[{"id": 1}]') == [{"id": 1}]
+    assert parser.finished
+    assert parser.feed('[{"id": 2}]') == []
@@ -0,0 +1,41 @@
+# coding: utf-8
+"""
+stream_response qua Gemini giả lập: text tiếng Việt phải giữ nguyên UTF-8 cả ở chunk
+trả về lẫn trong cache.
+
+    python -m pytest -q tests
+"""
+from fake_gemini import FakeGemini
+from app.services import vinallama_service
+from app.services.llm_cache import llm_cache_key
+
+
+def _cache_key(prompt):
+    payload = vinallama_service._payload(prompt, 256, False, 0.7, 0.9)
+    return llm_cache_key(vinallama_service._MODEL, prompt, payload["generationConfig"])
+
+
+def test_stream_keeps_vietnamese_utf8(fake_gemini):
+    prompt = "Viết một câu chào bằng tiếng Việt"
+    expected = FakeGemini.answer(prompt)
+    assert any(ord(c) > 127 for c in expected)
+
+    pieces = list(vinallama_service.stream_response(prompt, do_sample=False))
+
+    assert len(pieces) > 1
+    assert "".join(pieces) == expected
+    assert vinallama_service._cache.get(_cache_key(prompt)) == expected
+
+
+def test_only_finished_responses_are_cached(fake_gemini):
+    fake_gemini.finish_reason = "MAX_TOKENS"
+    streamed, plain = "Câu trả lời bị cắt (stream)", "Câu trả lời bị cắt"
+
+    assert "".join(vinallama_service.stream_response(streamed, do_sample=False)) == FakeGemini.answer(streamed)
+    assert vinallama_service.generate_response(plain, do_sample=False) == FakeGemini.answer(plain)
+    assert vinallama_service._cache.get(_cache_key(streamed)) is None
+    assert vinallama_service._cache.get(_cache_key(plain)) is None
+
+    fake_gemini.finish_reason = "STOP"
+    vinallama_service.generate_response(plain, do_sample=False)
+    assert vinallama_service._cache.get(_cache_key(plain)) == FakeGemini.answer(plain)
@@ -0,0 +1,72 @@
+# coding: utf-8
+"""
+/predict/batch: giới hạn số ảnh, và ảnh được decode + đưa vào batcher lần lượt
+(dòng NDJSON đầu tiên không chờ decode hết các ảnh sau).
+
+    python -m pytest -q tests
+"""
+import io
+import json
+from concurrent.futures import Future
+
+import pytest
+
+from app import create_app
+from app.routes import ocr
+
+
+class _DoneBatcher:
+    def submit(self, img):
+        fut = Future()
+        fut.set_result(img.decode("utf-8"))
+        return fut
+
+
+@pytest.fixture
+def client(monkeypatch):
+    decoded = []
+
+    def preprocess(model, img_bytes):
+        if img_bytes == b"hong":
+            raise ValueError("Ảnh hỏng")
+        decoded.append(img_bytes)
+        return img_bytes
+
+    monkeypatch.setattr(ocr, "is_loaded", lambda: True)
+    monkeypatch.setattr(ocr, "get_model", lambda: None)
+    monkeypatch.setattr(ocr, "preprocess_image", preprocess)
+    monkeypatch.setattr(ocr, "batcher", _DoneBatcher())
+    monkeypatch.setattr(ocr, "MAX_BATCH_IMAGES", 3)
+    client = create_app().test_client()
+    client.decoded = decoded
+    return client
+
+
+def _images(*payloads):
+    return {"images": [(io.BytesIO(p), f"{i}.png") for i, p in enumerate(payloads)]}
+
+
+def test_too_many_images_is_rejected(client):
+    res = client.post("/predict/batch", data=_images(b"a", b"b", b"c", b"d"), content_type="multipart/form-data")
+
+    assert res.status_code == 413
+    assert client.decoded == []
+
+
+def test_lines_stream_while_later_images_are_decoded(client):
+    res = client.post(
+        "/predict/batch", data=_images("chữ".encode("utf-8"), b"hong", b"c"),
+        content_type="multipart/form-data", buffered=False,
+    )
+    lines = iter(res.response)
+
+    first = json.loads(next(lines))
+    assert first == {"index": 0, "filename": "0.png", "ocr_text": "chữ"}
+    assert client.decoded == ["chữ".encode("utf-8")]
+
+    rest = [json.loads(line) for line in lines]
+    assert rest == [
+        {"index": 1, "filename": "1.png", "error": "Ảnh hỏng"},
+        {"index": 2, "filename": "2.png", "ocr_text": "c"},
+    ]
+    res.close()
@@ -0,0 +1,64 @@
+# coding: utf-8
+"""
+OCRResultCache: TTL, LRU eviction và single-flight (2 request cùng ảnh đến cùng lúc
+chỉ chạy 1 lần inference).
+
+    python -m pytest -q tests
+"""
+import threading
+
+from app.services import ocr_cache as ocr_cache_module
+from app.services.ocr_cache import OCRResultCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ocr_cache_module.time, "monotonic", lambda: now[0])
+    cache = OCRResultCache(max_entries=8, ttl_s=10)
+
+    assert cache.get_or_compute("a", lambda: "chữ") == ("chữ", "miss")
+    now[0] += 10
+    assert cache.get_or_compute("a", lambda: "khác") == ("chữ", "hit")
+    now[0] += 1
+    assert cache.get_or_compute("a", lambda: "mới") == ("mới", "miss")
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = OCRResultCache(max_entries=2, ttl_s=3600)
+    cache.get_or_compute("a", lambda: "A")
+    cache.get_or_compute("b", lambda: "B")
+    cache.get_or_compute("a", lambda: "A2")   # "a" vừa dùng -> "b" cũ nhất
+    cache.get_or_compute("c", lambda: "C")
+
+    assert cache.get_or_compute("a", lambda: "A3") == ("A", "hit")
+    assert cache.get_or_compute("b", lambda: "B2") == ("B2", "miss")
+    assert cache.stats()["evictions"] == 2
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = OCRResultCache(max_entries=8, ttl_s=3600)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "chữ"
+
+    results = {}
+    owner = threading.Thread(target=lambda: results.__setitem__("owner", cache.get_or_compute("k", slow_compute)))
+    owner.start()
+    assert started.wait(timeout=5)
+    follower = threading.Thread(target=lambda: results.__setitem__("follower", cache.get_or_compute("k", slow_compute)))
+    follower.start()
+    while cache.stats()["coalesced"] == 0:
+        follower.join(timeout=0.01)
+    release.set()
+    owner.join(timeout=5)
+    follower.join(timeout=5)
+
+    assert calls == [1]
+    assert results == {"owner": ("chữ", "miss"), "follower": ("chữ", "coalesced")}
+    assert cache.stats()["inflight"] == 0
@@ -0,0 +1,102 @@
+# coding: utf-8
+"""Chấm câu đời thường qua Gemini giả lập: verdict lưu trong verdict store giữ nguyên UTF-8."""
+import json
+
+from fake_gemini import FakeGemini
+from app.services import practice_service
+from app.services.verdict_store import VerdictStore
+
+
+def test_verdict_store_explanation_round_trips_utf8(fake_gemini, monkeypatch, tmp_path):
+    path = str(tmp_path / "verdicts.sqlite3")
+    monkeypatch.setattr(practice_service, "verdict_store", VerdictStore(path, normalize=practice_service.normalize_answer))
+    items = [
+        {"id": 1, "question": "Bạn thường làm gì vào buổi sáng?", "user_answer": "Tôi tập thể dục"},
+        {"id": 2, "question": "Món ăn yêu thích của bạn là gì?", "user_answer": "Phở bò"},
+    ]
+    expected = {
+        v["id"]: v["explanation"]
+        for v in json.loads(FakeGemini.answer(practice_service._grading_prompt(
+            [(it["question"], it["user_answer"]) for it in items])))
+    }
+
+    results = practice_service.check_daily_life_answers_batch_with_llm(items)
+
+    assert {r["id"]: r["explanation"] for r in results} == expected
+    # đọc lại từ SQLite (store mới, không qua RAM)
+    reopened = VerdictStore(path, normalize=practice_service.normalize_answer)
+    for it in items:
+        assert reopened.get(it["question"], it["user_answer"])["explanation"] == expected[it["id"]]
+
+
+
+def test_verdict_store_expires_and_trims_disk(tmp_path, monkeypatch):
+    from app.services import verdict_store as verdict_store_module
+
+    path = str(tmp_path / "verdicts.sqlite3")
+    now = [1000.0]
+    monkeypatch.setattr(verdict_store_module.time, "time", lambda: now[0])
+    store = VerdictStore(path, normalize=practice_service.normalize_answer, max_disk_entries=50, ttl_s=60)
+
+    store.put("Trời hôm nay thế nào?", "nắng", True, "Đúng")
+    now[0] += 30
+    assert VerdictStore(path, normalize=practice_service.normalize_answer, ttl_s=60).get("Trời hôm nay thế nào?", "Nắng")
+    now[0] += 31
+    assert store.get("Trời hôm nay thế nào?", "nắng") is None
+    assert VerdictStore(path, normalize=practice_service.normalize_answer, ttl_s=60).get("Trời hôm nay thế nào?", "nắng") is None
+
+    for i in range(99):  # lần put thứ 100 cắt bảng về max_disk_entries
+        now[0] += 1
+        store.put("Bạn thích ăn gì?", f"món {i}", True, "Đúng")
+    assert store.stats()["disk_entries"] == 50
+    reopened = VerdictStore(path, normalize=practice_service.normalize_answer, max_memory_entries=0, ttl_s=3600)
+    assert reopened.get("Bạn thích ăn gì?", "món 98") is not None
+    assert reopened.get("Bạn thích ăn gì?", "món 0") is None
+
+def test_waiting_requests_do_not_hold_llm_slots(fake_gemini, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app import create_app
+    from app.services.bulkhead import BULKHEADS, Bulkhead
+
+    fake_gemini.latency_ms = 200
+    llm = Bulkhead("llm", max_concurrent=2, max_wait_s=0.1)
+    monkeypatch.setitem(BULKHEADS, "llm", llm)
+    client = create_app().test_client()
+
+    def check(k):
+        answers = [{"id": i, "type": "doi_thuong", "question": f"Câu hỏi {i}?", "user_answer": f"trả lời {k}-{i}"}
+                   for i in range(3)]
+        return client.post("/practice/check-batch", json={"answers": answers}).status_code
+
+    with ThreadPoolExecutor(16) as ex:
+        statuses = list(ex.map(check, range(16)))
+
+    assert statuses == [200] * 16
+    stats = llm.stats()
+    assert stats["rejected"] == 0
+    # 16 request nhưng chỉ các lời gọi Gemini của grading batcher chiếm slot
+    assert 0 < stats["admitted"] < 16
+
+
+def test_dropped_stream_keeps_verdicts_and_retries_missing(monkeypatch):
+    import requests
+
+    items = [("Bạn thường làm gì vào buổi sáng?", "Tôi tập thể dục"), ("Món ăn yêu thích của bạn là gì?", "Phở bò")]
+    prompts = []
+
+    def flaky_stream(prompt, **kwargs):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            yield '[{"id": 1, "is_correct": true, "explanation": "Đúng"}, {"id": 2, "is_'
+            raise requests.exceptions.ChunkedEncodingError("connection reset")
+        yield '[{"id": 1, "is_correct": false, "explanation": "Sai"}]'
+
+    monkeypatch.setattr(practice_service, "stream_response", flaky_stream)
+    verdicts = {}
+
+    graded = practice_service._grade_with_llm(items, lambda pos, v: verdicts.setdefault(pos, v))
+
+    assert graded == 2
+    assert prompts[1] == practice_service._grading_prompt(items[1:])
+    assert verdicts == {1: {"is_correct": True, "explanation": "Đúng"}, 2: {"is_correct": False, "explanation": "Sai"}}
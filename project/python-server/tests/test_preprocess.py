@@ -0,0 +1,23 @@
+# coding: utf-8
+"""
+target_width: ảnh đã resize về target_width phải giữ nguyên kích thước khi qua
+vietocr.tool.translate.resize (kể cả khi bị kẹp về image_min_width / image_max_width).
+
+    python -m pytest -q tests
+"""
+import pytest
+from vietocr.tool import translate
+
+from app.services.preprocess import target_width
+
+
+@pytest.mark.parametrize("h", [10, 32, 57, 100])
+def test_vietocr_resize_is_a_no_op_on_target_width(h):
+    for w in range(1, 3000, 7):
+        new_w = target_width(w, h, 32, 32, 512)
+        assert translate.resize(new_w, 32, 32, 32, 512) == (new_w, 32)
+
+
+def test_narrow_images_are_clamped_to_the_rounded_minimum():
+    assert target_width(5, 100, 32, 32, 512) == 40
+    assert target_width(5000, 10, 32, 32, 512) == 512
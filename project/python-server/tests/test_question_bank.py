@@ -0,0 +1,44 @@
+# coding: utf-8
+"""
+HotReloadingFile: nạp lại khi file đổi; file mới lỗi thì giữ snapshot cũ.
+
+    python -m pytest -q tests
+"""
+import json
+
+from app.services.question_bank import HotReloadingFile
+
+
+def _bank(path):
+    return HotReloadingFile(path, lambda p: json.loads(p.read_text(encoding="utf-8")), list, "test bank",
+                            check_interval_s=0)
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "bank.json"
+    path.write_text(json.dumps(["Hôm nay trời ____"], ensure_ascii=False), encoding="utf-8")
+    bank = _bank(path)
+    assert bank.get() == ["Hôm nay trời ____"]
+    assert bank.get() is bank.get()   # file không đổi -> không parse lại
+
+    path.write_text(json.dumps(["Hôm nay trời ____", "Tôi đang ____ cơm"], ensure_ascii=False), encoding="utf-8")
+
+    assert bank.get() == ["Hôm nay trời ____", "Tôi đang ____ cơm"]
+    assert bank.stats()["loads"] == 2
+
+
+def test_keeps_the_old_snapshot_when_the_new_file_fails_to_parse(tmp_path):
+    path = tmp_path / "bank.json"
+    path.write_text('["Hôm nay trời ____"]', encoding="utf-8")
+    bank = _bank(path)
+    old = bank.get()
+
+    path.write_text('["Hôm nay trời ____", "Tôi đang', encoding="utf-8")
+    assert bank.get() is old
+
+    path.write_text('["Tôi đang ____ cơm"]', encoding="utf-8")
+    assert bank.get() == ["Tôi đang ____ cơm"]
+
+
+def test_missing_file_gives_the_empty_value(tmp_path):
+    assert _bank(tmp_path / "missing.json").get() == []
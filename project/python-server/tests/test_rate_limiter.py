@@ -0,0 +1,92 @@
+# coding: utf-8
+"""
+QuotaRateLimiter: hàng đợi ưu tiên cho quota Gemini.
+
+    python -m pytest -q tests
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.rate_limiter import PRIORITY_BULK, PRIORITY_INTERACTIVE, QuotaRateLimiter, RateLimitTimeout
+
+
+def _drained(rpm=600, tpm=0, max_wait_s=5.0):
+    limiter = QuotaRateLimiter(rpm=rpm, tpm=tpm, max_wait_s=max_wait_s)
+    if limiter._requests is not None:
+        limiter._requests.level = 0.0
+    if limiter._tokens is not None:
+        limiter._tokens.level = 0.0
+    return limiter
+
+
+def _queue_depth(limiter):
+    return sum(limiter.stats()["queue_depth"].values())
+
+
+def test_interactive_acquire_beats_queued_bulk_callers():
+    limiter = _drained(rpm=600)  # 1 request mỗi 0.1s
+    order, lock = [], threading.Lock()
+
+    def caller(name, priority):
+        limiter.acquire(1, priority)
+        with lock:
+            order.append(name)
+
+    threads = [threading.Thread(target=caller, args=(f"bulk{i}", PRIORITY_BULK)) for i in range(3)]
+    for t in threads:
+        t.start()
+    while _queue_depth(limiter) < 3:
+        time.sleep(0.005)
+
+    interactive = threading.Thread(target=caller, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+    threads.append(interactive)
+    for t in threads:
+        t.join(timeout=5)
+
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["bulk0", "bulk1", "bulk2"]
+
+
+def test_acquire_times_out_when_quota_does_not_refill_in_time():
+    limiter = _drained(rpm=6)  # 1 request mỗi 10s
+
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(1, PRIORITY_INTERACTIVE, max_wait_s=0.2)
+
+    assert limiter.stats()["timeouts"]["interactive"] == 1
+    assert _queue_depth(limiter) == 0
+
+
+def test_settle_refunds_and_charges_tpm():
+    limiter = QuotaRateLimiter(rpm=0, tpm=6000)
+    limiter.acquire(1000)
+    assert limiter.stats()["tokens_available"] == pytest.approx(5000, abs=5)
+
+    limiter.settle(1000, 200)  # dùng ít hơn ước lượng -> hoàn lại 800
+    assert limiter.stats()["tokens_available"] == pytest.approx(5800, abs=5)
+
+    limiter.settle(1000, 3000)  # dùng nhiều hơn -> trừ thêm 2000
+    assert limiter.stats()["tokens_available"] == pytest.approx(3800, abs=5)
+
+    limiter.settle(1000, None)  # không có usageMetadata -> giữ nguyên ước lượng
+    assert limiter.stats()["tokens_available"] == pytest.approx(3800, abs=5)
+
+
+def test_every_gemini_retry_is_charged_to_the_quota(fake_gemini, monkeypatch):
+    from app.services import vinallama_service
+    from app.services.gemini_client import GeminiHTTPClient
+
+    limiter = QuotaRateLimiter(rpm=600, tpm=0)
+    client = GeminiHTTPClient(max_retries=2, backoff_base_s=0.01, budget_s=5, on_throttled=limiter.on_throttled)
+    monkeypatch.setattr(vinallama_service, "_limiter", limiter)
+    monkeypatch.setattr(vinallama_service, "_client", client)
+    fake_gemini.error_rate = 1.0
+
+    vinallama_service.generate_response("Câu hỏi", do_sample=False)
+    list(vinallama_service.stream_response("Câu hỏi (stream)", do_sample=False))
+
+    assert client.stats()["attempts"] == 6
+    assert limiter.stats()["admitted"]["bulk"] == 6
@@ -1,3 +1,5 @@
+import { Readable } from "node:stream";
+
 const FLASK_SERVER_URL = "http://localhost:5000";
 
 export const uploadPic = async (req, res) => {
@@ -113,4 +115,55 @@ export const recognize = async (req, res) => {
       ocr_text: "",
     });
   }
-};
\ No newline at end of file
+};
+
+// Recognize many images (e.g. every blank on a worksheet) in one round trip.
+// Flask streams NDJSON (one line per image) and we pipe it straight through.
+export const recognizeBatch = async (req, res) => {
+  const files = req.files || [];
+
+  if (files.length === 0) {
+    return res.json({
+      success: false,
+      message: "Không có tệp tin được tải lên.",
+      results: [],
+    });
+  }
+
+  try {
+    const formData = new FormData();
+    for (const file of files) {
+      formData.append(
+        "images",
+        new Blob([file.buffer], { type: file.mimetype }),
+        file.originalname
+      );
+    }
+
+    console.log(`Gửi ${files.length} ảnh tới: ${FLASK_SERVER_URL}/predict/batch`);
+
+    const flaskResponse = await fetch(`${FLASK_SERVER_URL}/predict/batch`, {
+      method: "POST",
+      body: formData,
+    });
+
+    if (!flaskResponse.ok) {
+      const errorData = await flaskResponse.json().catch(() => ({}));
+      return res.json({
+        success: false,
+        message: errorData.error || "Đã xảy ra lỗi từ dịch vụ xử lý ảnh.",
+        results: [],
+      });
+    }
+
+    res.setHeader("Content-Type", "application/x-ndjson; charset=utf-8");
+    Readable.fromWeb(flaskResponse.body).pipe(res);
+  } catch (error) {
+    console.error("Error in recognizeBatch:", error);
+    return res.json({
+      success: false,
+      message: "Đã xảy ra lỗi khi nhận dạng văn bản.",
+      results: [],
+    });
+  }
+};
@@ -8,5 +8,6 @@ const upload = multer();
 
 router.post('/upload', upload.single('image'), picController.uploadPic);
 router.post('/recognize', upload.single('image'), picController.recognize);
+router.post('/recognize-batch', upload.array('images'), picController.recognizeBatch);
 
 export default router;
\ No newline at end of file